@@ -0,0 +1,90 @@
+"""
+Per-call overhead of the cyclic cifX calls, bare CDLL vs. the CifXDriver facade.
+
+Declared argtypes make every call convert its arguments in ctypes, which is slower
+than the untyped call; the facade therefore uses the declared signatures for setup
+calls and prebound, pre-checked untyped aliases for the cyclic calls.
+
+Run: uv run python benchmarks/bench_driver.py
+"""
+import ctypes
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cifx_stub import build_stub, load_stub
+from hilscher.Definitions import PbBufInWic, SIZE_BUFFER_IN, CIFX_HOST_STATE_READY
+from hilscher.driver import CifXDriver
+from hilscher.session import ChannelSession
+
+NUMBER = 200_000
+
+
+def bench(label, stmt):
+    best = min(timeit.repeat(stmt, number=NUMBER, repeat=5))
+    print(f"{label:<55} {best / NUMBER * 1e9:8.0f} ns/call")
+    return best
+
+
+def main():
+    library = build_stub()
+    if library is None:
+        print("No C compiler found, cannot build the cifX stub library.")
+        return 1
+
+    # Before: bare CDLL, arguments converted and byref() objects built on every call
+    raw = load_stub(library)
+    hDriver = ctypes.c_void_p(None)
+    raw.xDriverOpen(ctypes.byref(hDriver))
+    hDevice = ctypes.c_void_p(None)
+    raw.xChannelOpen(hDriver, ctypes.create_string_buffer(b"cifX0"), 0, ctypes.byref(hDevice))
+    abReadIOBuffer = (ctypes.c_byte * (SIZE_BUFFER_IN * 2))()
+    ulState = ctypes.c_uint32(0)
+
+    def before_read():
+        raw.xChannelIORead(hDevice, 0, 0, SIZE_BUFFER_IN, ctypes.byref(abReadIOBuffer), 10)
+
+    def before_read_copy():
+        slave = PbBufInWic()
+        raw.xChannelIORead(hDevice, 0, 0, SIZE_BUFFER_IN, ctypes.byref(abReadIOBuffer), 10)
+        ctypes.memmove(ctypes.addressof(slave), abReadIOBuffer, ctypes.sizeof(slave))
+
+    def before_host_state():
+        raw.xChannelHostState(hDevice, CIFX_HOST_STATE_READY, ctypes.byref(ulState), 1000)
+
+    # After: typed facade with prebound IO calls
+    driver = CifXDriver(load_stub(library))
+    driver.open()
+    session = ChannelSession(driver, "cifX0").open()
+    typed_read = driver.dll.xChannelIORead
+    prebound_read = session._io_read[0]
+    typed_host_state = driver.dll.xChannelHostState
+    prebound_host_state = driver.bind("xChannelHostState", session.hDevice, CIFX_HOST_STATE_READY, ctypes.byref(ulState), 1000)
+    read_buffer = session.input_image.buffers[0]
+
+    def typed_read_call():
+        typed_read(session.hDevice, 0, 0, SIZE_BUFFER_IN, read_buffer, 10)
+
+    def typed_host_state_call():
+        typed_host_state(session.hDevice, CIFX_HOST_STATE_READY, ctypes.byref(ulState), 1000)
+
+    print(f"cifX stub: {library}\n")
+    t_before = bench("before: xChannelIORead, untyped + byref per call", before_read)
+    bench("        xChannelIORead, argtypes declared", typed_read_call)
+    t_after = bench("after:  xChannelIORead, prebound", prebound_read)
+    bench("before: xChannelIORead + new PbBufInWic + memmove", before_read_copy)
+    bench("after:  ChannelSession.read_input()", session.read_input)
+    bench("before: xChannelHostState, untyped + byref per call", before_host_state)
+    bench("        xChannelHostState, argtypes declared", typed_host_state_call)
+    bench("after:  xChannelHostState, prebound + cached byref", prebound_host_state)
+    print(f"\nxChannelIORead speedup: {t_before / t_after:.2f}x")
+
+    session.close()
+    driver.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+End-to-end cycles per second of the read -> process -> write stack against the
+simulated cifX backend and a loopback Profibus master.
+
+Run: uv run python benchmarks/bench_loopback.py --rate 0 --seconds 3
+"""
+import argparse
+import sys
+import time
+
+from hilscher import CIFX70E_DP
+from hilscher.change import ChangeDetector
+from hilscher.driver import CifXDriver
+from hilscher.session import ChannelSession
+from hilscher.simulator import SimulatedCifX, LoopbackMaster
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=0, help="Master frames per second, 0 for as fast as possible")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Duration of the measurement")
+    parser.add_argument("--gate", action="store_true", help="Only process images whose setpoints, intervals or state changed")
+    args = parser.parse_args()
+
+    detector = ChangeDetector()
+    process = detector.gate(CIFX70E_DP.fill_pb_buf_in_wic_data) if args.gate else CIFX70E_DP.fill_pb_buf_in_wic_data
+
+    sim = SimulatedCifX(synchronous=True)
+    master = LoopbackMaster(sim.channel("cifX0"), rate_hz=args.rate).start()
+    cycles = 0
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=100) as session:
+        start = time.perf_counter()
+        end = start + args.seconds
+        while time.perf_counter() < end:
+            slave = CIFX70E_DP.WIC_ReadIOData(driver.hDriver, "cifX0", 100, session=session)
+            process(slave)
+            CIFX70E_DP.WIC_SendToMaster(driver.hDriver, "cifX0", 100, slave, session=session)
+            cycles += 1
+        elapsed = time.perf_counter() - start
+    master.stop()
+
+    print(f"host cycles      : {cycles} in {elapsed:.2f} s = {cycles / elapsed:,.0f} cycles/s")
+    print(f"master frames    : {master.frames_sent}")
+    print(f"round trips      : {master.round_trips} = {master.round_trips / elapsed:,.0f} per second")
+    if args.gate:
+        print(f"processed        : {detector.processed}, skipped unchanged: {detector.skipped}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Replays a process-image recording through the read -> process -> write stack and
+compares the answers with the recorded outputs.
+
+Run: uv run python benchmarks/bench_replay.py line1.pbrec --speed 0
+"""
+import argparse
+import sys
+
+from hilscher import CIFX70E_DP
+from hilscher.driver import CifXDriver
+from hilscher.replay import ReplayCifX
+from hilscher.session import ChannelSession
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("recording", help="Ring file written by hilscher.recorder.Recorder")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="1 for the recorded timing, 2 for twice as fast, 0 for as fast as possible")
+    parser.add_argument("--timeout", type=float, default=0.1, help="Seconds to wait for each answer")
+    parser.add_argument("--differences", type=int, default=10, help="Number of differing fields to print")
+    args = parser.parse_args()
+
+    sim = ReplayCifX(args.recording, speed=args.speed, answer_timeout=args.timeout)
+    cycles = 0
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=100) as session:
+        while not sim.master.finished.is_set():
+            slave = session.read_input()
+            if slave is None:
+                continue
+            CIFX70E_DP.fill_pb_buf_in_wic_data(slave)
+            CIFX70E_DP.WIC_SendToMaster(driver.hDriver, "cifX0", 100, slave, session=session)
+            cycles += 1
+    sim.master.stop()
+    report = sim.master.report()
+
+    print(f"recorded frames  : {report['frames']}")
+    print(f"host cycles      : {cycles}")
+    print(f"round trips      : {report['round_trips']} in {report['elapsed']:.2f} s = {report['throughput_hz']:,.0f} per second, missed {report['missed']}")
+    print(f"compared outputs : {report['compared']}, differing {report['mismatches']}")
+    for name, count in sorted(report["field_mismatches"].items()):
+        print(f"  {name:<10} {count}")
+    for index, name, expected, actual in report["differences"][:args.differences]:
+        print(f"  frame {index} {name}: recorded {expected}, now {actual}")
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
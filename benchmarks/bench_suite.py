@@ -0,0 +1,361 @@
+"""
+Microbenchmarks of the process-image and logging hot paths, with stored baselines.
+
+Run:
+    uv run python benchmarks/bench_suite.py                  # measure and print
+    uv run python benchmarks/bench_suite.py --save           # store as new baseline
+    uv run python benchmarks/bench_suite.py --compare -t 30  # fail on >30 % regression
+
+Timings are machine specific: record the baseline on the machine the comparison runs on.
+Each benchmark is warmed up and sampled in several interleaved rounds. Every sample is
+paired with a sample of a fixed pure Python workload (calibration) taken right next to
+it, and the median ratio of the two is the result, so a machine that runs faster or
+slower than when the baseline was recorded moves both alike; --compare scales the
+baseline by the calibration. The spread of the ratios is stored per benchmark and widens
+its threshold, so a benchmark that is noisy on this machine does not fail the gate.
+"""
+import argparse
+import contextlib
+import ctypes
+import inspect
+import io
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from hilscher import CIFX70E_DP
+from hilscher.Definitions import PbBufInWic, PbBufOutWic, SIZE_BUFFER_IN, SIZE_BUFFER_OUT
+from hilscher.recorder import Recorder
+from hilscher.response import PvBlock, ResponseBuilder
+from hilscher.simulator import LoopbackMaster, SimulatedCifX
+from utils import text_logger
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+DEFAULT_THRESHOLD = 25.0
+DEFAULT_ROUNDS = 5
+# A benchmark's threshold is at least this multiple of its spread between rounds
+SPREAD_FACTOR = 2.0
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registers a setup function returning the zero-argument callable to time.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _frame():
+    master = LoopbackMaster(SimulatedCifX().channel("cifX0"), setpoint_period=1)
+    return master.next_frame()
+
+
+# --- process image encode/decode ---
+
+@benchmark("fill_pb_buf_in_wic_data")
+def _():
+    frame = _frame()
+    return lambda: CIFX70E_DP.fill_pb_buf_in_wic_data(frame)
+
+
+@benchmark("copy_struct")
+def _():
+    frame = _frame()
+    master = PbBufOutWic()
+    return lambda: CIFX70E_DP.copy_struct(master, frame)
+
+
+@benchmark("ResponseBuilder.build")
+def _():
+    frame = _frame()
+    raw = (ctypes.c_ubyte * SIZE_BUFFER_OUT)()
+    values = PvBlock()
+    builder = ResponseBuilder()
+    return lambda: builder.build(raw, frame, values)
+
+
+@benchmark("raw_to_PbBufInWic")
+def _():
+    raw = (ctypes.c_ubyte * SIZE_BUFFER_IN).from_buffer_copy(bytes(_frame()).ljust(SIZE_BUFFER_IN, b"\0"))
+    return lambda: PbBufInWic.from_buffer_copy(raw)
+
+
+@benchmark("raw_to_PbBufInWic_memmove")
+def _():
+    raw = (ctypes.c_byte * SIZE_BUFFER_IN)()
+    size = ctypes.sizeof(PbBufInWic)
+
+    def convert():
+        slave = PbBufInWic()
+        ctypes.memmove(ctypes.addressof(slave), raw, size)
+        return slave
+    return convert
+
+
+@benchmark("PbBufOutWic_to_raw")
+def _():
+    master = PbBufOutWic(value_16=1)
+    raw = (ctypes.c_byte * SIZE_BUFFER_OUT)()
+    size = ctypes.sizeof(master)
+    return lambda: ctypes.memmove(raw, ctypes.byref(master), size)
+
+
+@benchmark("PbBufOutWic_to_bytes")
+def _():
+    master = PbBufOutWic(value_16=1)
+    return lambda: bytes(master)
+
+
+# --- console formatting ---
+
+@benchmark("WIC_PrintPBStruct")
+def _():
+    frame = _frame()
+    sink = io.StringIO()
+
+    def print_struct():
+        sink.seek(0)
+        with contextlib.redirect_stdout(sink):
+            CIFX70E_DP.WIC_PrintPBStruct(frame)
+    return print_struct
+
+
+@benchmark("print_PbBufOutWic")
+def _():
+    master = PbBufOutWic(value_16=1)
+    sink = io.StringIO()
+
+    def print_struct():
+        sink.seek(0)
+        with contextlib.redirect_stdout(sink):
+            CIFX70E_DP.print_PbBufOutWic(master)
+    return print_struct
+
+
+@benchmark("Recorder.record_input")
+def _():
+    recorder = Recorder(os.path.join(_tempdir(), "bench.pbrec"), size=1024 * 1024)
+    slave = PbBufInWic(year=2025, value_16=1)
+
+    def record():
+        slave.value_16 += 1
+        recorder.record_input(slave)
+    return record
+
+
+# --- logging ---
+
+@benchmark("get_logger")
+def _():
+    # A handler on the caller's logger keeps get_logger() from creating its log file
+    logging.getLogger(__name__).addHandler(logging.NullHandler())
+    return lambda: text_logger.get_logger()
+
+
+@benchmark("get_logger(name)")
+def _():
+    logging.getLogger("bench.named").addHandler(logging.NullHandler())
+    return lambda: text_logger.get_logger(name="bench.named")
+
+
+@benchmark("inspect.stack lookup")
+def _():
+    # The caller lookup get_logger() used before, kept as a reference for the cost above
+    return lambda: inspect.getmodule(inspect.stack()[1][0])
+
+
+@benchmark("RotatingTextFileHandler.emit")
+def _():
+    handler = text_logger.RotatingTextFileHandler(os.path.join(_tempdir(), "bench.log"), max_lines=1_000_000)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    record = logging.LogRecord("bench", logging.INFO, __file__, 0, "cycle %d finished", (42,), None)
+    return lambda: handler.emit(record)
+
+
+def _bench_logger(name, wrap=None):
+    # Same target for the synchronous and the asynchronous benchmark, so both are comparable
+    target = text_logger.RotatingTextFileHandler(os.path.join(_tempdir(), f"{name}.log"), max_lines=1_000_000)
+    target.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers[:] = [target if wrap is None else wrap(target)]
+    return lambda: logger.info("cycle %d finished", 42)
+
+
+@benchmark("logger.info")
+def _():
+    return _bench_logger("bench.sync")
+
+
+@benchmark("logger.info_async")
+def _():
+    return _bench_logger("bench.async", lambda target: text_logger.QueueLogHandler([target], maxsize=100_000))
+
+
+_tempdirs = []
+
+
+def _tempdir():
+    directory = tempfile.TemporaryDirectory(prefix="bench_log_")
+    _tempdirs.append(directory)
+    return directory.name
+
+
+def _calibration():
+    # Fixed pure Python workload: measures the speed of the machine, not of the code under test
+    data = list(range(512))
+    return lambda: sorted(data, key=lambda x: (x * 7919) % 512)
+
+
+def _timer(func, min_time):
+    # A few calls first, so caches and lazily created objects do not count
+    for _ in range(3):
+        func()
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    return timer, max(1, int(number * min_time / elapsed))
+
+
+def _upper_quartile(values):
+    return statistics.quantiles(values, n=4)[2]
+
+
+def measure(funcs, calibration, rounds=DEFAULT_ROUNDS, repeat=5, min_time=0.02):
+    """
+    Times several callables in interleaved rounds, relative to a calibration workload.
+
+    Every sample of a benchmark is paired with a sample of the calibration taken right
+    next to it, so a change in the speed of the machine affects both alike.
+
+    Returns:
+        tuple: ({name: time per call in ns}, {name: spread in percent}, calibration_ns),
+            the time being the best ratio to the calibration times the fastest calibration,
+            the spread how much worse the median ratio was than the best one.
+    """
+    reference = _timer(calibration, min_time)
+    timers = {name: _timer(func, min_time) for name, func in funcs.items()}
+    ratios = {name: [] for name in funcs}
+    fastest = float("inf")
+    for _ in range(rounds):
+        for name, (timer, number) in timers.items():
+            for _ in range(repeat):
+                ns = timer.timeit(number) / number
+                calibration_ns = reference[0].timeit(reference[1]) / reference[1]
+                fastest = min(fastest, calibration_ns)
+                ratios[name].append(ns / calibration_ns)
+    fastest *= 1e9
+    results = {name: statistics.median(values) * fastest for name, values in ratios.items()}
+    spread = {name: (_upper_quartile(values) / statistics.median(values) - 1) * 100 for name, values in ratios.items()}
+    return results, spread, fastest
+
+
+def run(pattern=None, rounds=DEFAULT_ROUNDS):
+    """
+    Returns:
+        tuple: (results, spread, calibration_ns), see measure().
+    """
+    funcs = {name: setup() for name, setup in BENCHMARKS.items() if not pattern or re.search(pattern, name)}
+    return measure(funcs, _calibration(), rounds)
+
+
+def compare(results, baseline, threshold, spread=None, scale=1.0):
+    """
+    Compares results against a baseline.
+
+    Args:
+        results (dict): Current times in ns.
+        baseline (dict): Baseline as returned by load_baseline().
+        threshold (float): Allowed slowdown in percent.
+        spread (dict): Current spread per benchmark in percent.
+        scale (float): Speed of the machine now relative to the baseline (calibration ratio).
+
+    Returns:
+        list: (name, baseline_ns, result_ns, change_percent, allowed_percent, regressed) for
+            every benchmark in results; baseline_ns is already scaled.
+    """
+    spread = spread or {}
+    rows = []
+    for name, ns in results.items():
+        base = baseline["results"].get(name)
+        if base:
+            base *= scale
+        change = None if not base else (ns - base) / base * 100
+        noise = max(baseline.get("spread", {}).get(name, 0.0), spread.get(name, 0.0))
+        allowed = max(threshold, SPREAD_FACTOR * noise)
+        rows.append((name, base, ns, change, allowed, change is not None and change > allowed))
+    return rows
+
+
+def load_baseline(path=BASELINE_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results, spread, calibration, path=BASELINE_FILE):
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "calibration": round(calibration, 1),
+        "results": {name: round(ns, 1) for name, ns in results.items()},
+        "spread": {name: round(percent, 1) for name, percent in spread.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process-image and logging microbenchmarks.")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name matches this regex")
+    parser.add_argument("--save", action="store_true", help=f"Store the results as baseline ({BASELINE_FILE.name})")
+    parser.add_argument("--compare", action="store_true", help="Compare against the stored baseline")
+    parser.add_argument("-t", "--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed slowdown in percent for --compare (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="Baseline file")
+    parser.add_argument("-r", "--rounds", type=int, default=DEFAULT_ROUNDS, help="Interleaved measuring rounds")
+    args = parser.parse_args()
+
+    results, spread, calibration = run(args.filter, args.rounds)
+
+    if not args.compare:
+        for name, ns in results.items():
+            print(f"{name:<32} {ns:10.0f} ns  spread {spread[name]:5.1f}%")
+        print(f"{'calibration':<32} {calibration:10.0f} ns")
+    else:
+        baseline = load_baseline(args.baseline)
+        base_calibration = baseline.get("calibration")
+        scale = calibration / base_calibration if base_calibration else 1.0
+        print(f"Machine speed vs. baseline: x{scale:.2f} (baseline scaled accordingly)\n")
+        regressions = 0
+        print(f"{'benchmark':<32} {'baseline':>10} {'now':>10} {'change':>8} {'allowed':>8}")
+        for name, base, ns, change, allowed, regressed in compare(results, baseline, args.threshold, spread, scale):
+            base_text = "-" if base is None else f"{base:.0f}"
+            change_text = "-" if change is None else f"{change:+.1f}%"
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:<32} {base_text:>10} {ns:10.0f} {change_text:>8} {allowed:7.0f}%{flag}")
+            regressions += regressed
+        if regressions:
+            print(f"\n{regressions} benchmark(s) regressed by more than their allowed change")
+            return 1
+
+    if args.save:
+        save_baseline(results, spread, calibration, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
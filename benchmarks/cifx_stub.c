@@ -0,0 +1,87 @@
+/*
+ * Minimal stand-in for cifX32dll used to measure the ctypes call overhead on Linux.
+ *
+ * Build: cc -O2 -shared -fPIC -o libcifx_stub.so cifx_stub.c
+ *
+ * One board "cifX0" with one channel. xChannelIOWrite stores the output image and
+ * xChannelIORead returns it again (loopback), so round trips can be checked.
+ */
+#include <stdint.h>
+#include <string.h>
+
+#define CIFX_NO_ERROR           0
+#define CIFX_NO_MORE_ENTRIES    ((int32_t)0x800A0014)
+#define CIFX_INVALID_PARAMETER  ((int32_t)0x800A0001)
+#define DPM_IO_SIZE             5760
+
+static uint8_t abIOArea[DPM_IO_SIZE];
+static int iDriver = 1;
+static int iChannel = 2;
+
+int32_t xDriverOpen(void** phDriver) { *phDriver = &iDriver; return CIFX_NO_ERROR; }
+int32_t xDriverClose(void* hDriver) { (void)hDriver; return CIFX_NO_ERROR; }
+
+int32_t xDriverGetErrorDescription(int32_t lError, char* szBuffer, uint32_t ulBufferLen)
+{
+  (void)lError;
+  strncpy(szBuffer, "stub error", ulBufferLen);
+  return CIFX_NO_ERROR;
+}
+
+int32_t xDriverEnumBoards(void* hDriver, uint32_t ulBoard, uint32_t ulSize, void* pvBoardInfo)
+{
+  (void)hDriver;
+  if (ulBoard > 0) return CIFX_NO_MORE_ENTRIES;
+  memset(pvBoardInfo, 0, ulSize);
+  /* lBoardError (4 bytes) is followed by abBoardName[16] */
+  memcpy((uint8_t*)pvBoardInfo + 4, "cifX0", 5);
+  return CIFX_NO_ERROR;
+}
+
+int32_t xDriverEnumChannels(void* hDriver, uint32_t ulBoard, uint32_t ulChannel, uint32_t ulSize, void* pvChannelInfo)
+{
+  (void)hDriver;
+  if (ulBoard > 0 || ulChannel > 0) return CIFX_NO_MORE_ENTRIES;
+  memset(pvChannelInfo, 0, ulSize);
+  memcpy(pvChannelInfo, "cifX0", 5);
+  return CIFX_NO_ERROR;
+}
+
+int32_t xChannelOpen(void* hDriver, char* szBoard, uint32_t ulChannel, void** phChannel)
+{
+  if (hDriver != &iDriver || strcmp(szBoard, "cifX0") != 0 || ulChannel != 0) return CIFX_INVALID_PARAMETER;
+  *phChannel = &iChannel;
+  return CIFX_NO_ERROR;
+}
+
+int32_t xChannelClose(void* hChannel) { (void)hChannel; return CIFX_NO_ERROR; }
+
+int32_t xChannelHostState(void* hChannel, uint32_t ulCmd, uint32_t* pulState, uint32_t ulTimeout)
+{
+  (void)hChannel; (void)ulTimeout;
+  *pulState = ulCmd;
+  return CIFX_NO_ERROR;
+}
+
+int32_t xChannelBusState(void* hChannel, uint32_t ulCmd, uint32_t* pulState, uint32_t ulTimeout)
+{
+  (void)hChannel; (void)ulTimeout;
+  *pulState = ulCmd;
+  return CIFX_NO_ERROR;
+}
+
+int32_t xChannelIORead(void* hChannel, uint32_t ulArea, uint32_t ulOffset, uint32_t ulDataLen, void* pvData, uint32_t ulTimeout)
+{
+  (void)ulArea; (void)ulTimeout;
+  if (hChannel != &iChannel || ulOffset + ulDataLen > DPM_IO_SIZE) return CIFX_INVALID_PARAMETER;
+  memcpy(pvData, abIOArea + ulOffset, ulDataLen);
+  return CIFX_NO_ERROR;
+}
+
+int32_t xChannelIOWrite(void* hChannel, uint32_t ulArea, uint32_t ulOffset, uint32_t ulDataLen, void* pvData, uint32_t ulTimeout)
+{
+  (void)ulArea; (void)ulTimeout;
+  if (hChannel != &iChannel || ulOffset + ulDataLen > DPM_IO_SIZE) return CIFX_INVALID_PARAMETER;
+  memcpy(abIOArea + ulOffset, pvData, ulDataLen);
+  return CIFX_NO_ERROR;
+}
@@ -0,0 +1,35 @@
+import ctypes
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+STUB_SOURCE = Path(__file__).with_name("cifx_stub.c")
+
+
+def build_stub(directory=None):
+    """
+    Compiles cifx_stub.c into a shared library.
+
+    Args:
+        directory: Output directory, defaults to a new temporary directory.
+
+    Returns:
+        Path: Path to the built library, or None if no C compiler is available.
+    """
+    compiler = os.getenv("CC") or shutil.which("cc") or shutil.which("gcc")
+    if compiler is None:
+        return None
+
+    directory = Path(directory or tempfile.mkdtemp(prefix="cifx_stub_"))
+    library = directory / "libcifx_stub.so"
+    subprocess.run([compiler, "-O2", "-shared", "-fPIC", "-o", str(library), str(STUB_SOURCE)], check=True)
+    return library
+
+
+def load_stub(library):
+    """
+    Loads a separate instance of the stub library, so ctypes function objects are not shared.
+    """
+    return ctypes.CDLL(str(library))
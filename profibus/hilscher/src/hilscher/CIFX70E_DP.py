@@ -1,17 +1,33 @@
 import ctypes
-from ctypes import POINTER, c_char_p, c_int, c_ulong, c_char, c_uint16, Structure, create_string_buffer, ARRAY, Array
+from ctypes import POINTER, c_char_p, c_int, c_char, c_uint16, Structure, create_string_buffer, ARRAY, Array
 import json
-import msvcrt
 import os
 import sys
 import time
 from .Definitions import SystemChannelSystemInfoBlock, DriverInformation, BoardInformation, ChannelInformation, PbBufInWic, PbBufOutWic
-
-
-
-# Load the DLL
-wic_dll = ctypes.CDLL('C:/Windows/System32/cifX32dll.dll')
-#C:/Windows/SysWOW64/cifX32dll.dll
+from .Definitions import (
+    CIFX_NO_ERROR, CIFX_NO_MORE_ENTRIES, CIFX_HOST_STATE_READY, CIFX_BUS_STATE_ON,
+    SIZE_BUFFER_IN, SIZE_BUFFER_OUT,
+)
+from .backend import get_backend
+from .driver import CifXDriver, CifXError
+from .enum_cache import EnumerationCache
+from .session import ChannelSession
+from .response import ResponseBuilder
+from .errors import ErrorDescriptions, ErrorReporter
+
+
+
+# Load the cifX API: the real DLL or the simulator, see backend.load_backend()
+wic_dll = get_backend()
+response_builder = ResponseBuilder()
+error_reporter = ErrorReporter(ErrorDescriptions(wic_dll).describe)
+
+# Console helpers only exist on Windows
+if sys.platform == "win32":
+    import msvcrt
+else:
+    msvcrt = None
 
 """
  ------------------------------------------------------------------------------------ */
@@ -24,12 +40,13 @@ MAX_PATH = 260  # Maximum path length, similar to the C definition of MAX_PATH
 TIMERR_NOERROR = 0  # Placeholder, adjust as necessary
 TIMECAPS = ctypes.Structure
 
-winmm = ctypes.WinDLL('winmm.dll')
+if sys.platform == "win32":
+    winmm = ctypes.WinDLL('winmm.dll')
 
-# Define the timer functions (timeGetDevCaps, timeBeginPeriod, timeEndPeriod)
-timeGetDevCaps = winmm.timeGetDevCaps
-timeBeginPeriod = winmm.timeBeginPeriod
-timeEndPeriod = winmm.timeEndPeriod
+    # Define the timer functions (timeGetDevCaps, timeBeginPeriod, timeEndPeriod)
+    timeGetDevCaps = winmm.timeGetDevCaps
+    timeBeginPeriod = winmm.timeBeginPeriod
+    timeEndPeriod = winmm.timeEndPeriod
 
 # Define system time resolution handling
 class TIMECAPS(ctypes.Structure):
@@ -38,8 +55,8 @@ class TIMECAPS(ctypes.Structure):
         ("wPeriodMax", ctypes.c_uint32),
     ]
 
-g_ulTimerResolution = ctypes.c_ulong(1)  # Default timer resolution = 1 ms
-g_ulIOTimeout = ctypes.c_ulong(10)       # Default IO timeout = 10 ms
+g_ulTimerResolution = ctypes.c_uint32(1)  # Default timer resolution = 1 ms
+g_ulIOTimeout = ctypes.c_uint32(10)      # Default IO timeout = 10 ms
 
 # Board name as a string of length 10
 g_szBoard = create_string_buffer(10)  # Buffer for char array
@@ -55,19 +72,10 @@ g_szConfigFile.value = b"\\Windows\\config.nxd"  # Assign the string
 
 # definitions
 CIFX_MAX_INFO_NAME_LENGTH = 16
-CIFX_HOST_STATE_READY = 1
-CIFX_BUS_STATE_ON = 1
 
 # Read definitions
 TRACKS_PER_VIEW_MAX = 8
-SIZE_BUFFER_IN = 244 #we need to multiply by 2
-SIZE_BUFFER_OUT = 244
 
-# Define constants
-CIFX_NO_ERROR = ctypes.c_int32(0x00000000).value
-CIFX_NO_MORE_ENTRIES = ctypes.c_int32(0x800A0014).value
-
-slave_result = PbBufInWic()
 
 def fill_pb_buf_in_wic_data(data_read):
     """
@@ -125,19 +133,14 @@ def fill_pb_buf_in_wic_data(data_read):
 
 
 
-def show_error(lError):
-    if lError != CIFX_NO_ERROR:
-        # Create a buffer to hold the error description
-        szError = create_string_buffer(1024)  # Buffer size matches 1024 in the C code
-
-        # Call the DLL function to retrieve the error description
-        wic_dll.xDriverGetErrorDescription(
-            lError, szError, ctypes.sizeof(szError)
-        )
+def show_error(lError, context=""):
+    """
+    Prints a cifX error with its description.
 
-        # Print the error code and description
-        error_description = szError.value.decode('ascii').rstrip(chr(0))
-        print(f"Error: 0x{lError:X}, <{error_description}>")
+    Descriptions are cached per code, and a code that was already printed within the
+    last error_reporter.interval seconds is only counted and printed as a summary line.
+    """
+    error_reporter.report(lError, context)
 
 
 
@@ -166,29 +169,14 @@ def WIC_RunCifXConsoleTest( szBoard, szFirmwareFile, szConfigFile, ulTimerResolu
         driver_version = driver_info.abDriverVersion.decode('ascii').rstrip(chr(0))
         print(f"Driver Version: {driver_version}\n")
 
-    # Initialize variables for board enumeration
-    fBoardFound = False  # Equivalent to bool
-    ulBoardIdx = c_ulong(0)  # Unsigned long for board index
-    ulBoardCount = c_ulong(0)  # Unsigned long for board count
-    lBoardRet = CIFX_NO_ERROR  # Error code, initialized to CIFX_NO_ERROR
-    
-    while lBoardRet == CIFX_NO_ERROR:
-        board_info = BoardInformation()  # Assuming a class representing board information
-        lBoardRet = wic_dll.xDriverEnumBoards(hDriver, ulBoardIdx, ctypes.sizeof(board_info), ctypes.byref(board_info))
-
-        if lBoardRet != CIFX_NO_ERROR:
-            # No more boards
-            break
-
-        # Increment board counter
-        ulBoardCount.value += 1
+    # Boards and channels are printed from the enumeration cache; the full walk through
+    # xDriverEnumBoards / xDriverEnumChannels is refreshed in the background
+    enumeration = EnumerationCache().start(CifXDriver(wic_dll, hDriver=hDriver))
+    boards = enumeration.boards()
+    fBoardFound = bool(boards)
 
-        # Board found
-        ulChannelIdx = c_ulong(0)
-        ulChannelCount = c_ulong(0)
-        lChannelRet = CIFX_NO_ERROR
-
-        print(f"Board{ulBoardIdx.value} Information:")
+    for ulBoardIdx, board_info in enumerate(boards):
+        print(f"Board{ulBoardIdx} Information:")
         print(f" Name : {board_info.abBoardName.decode('ascii').rstrip(chr(0))}")
         print(f" Alias: {board_info.abBoardAlias.decode('ascii').rstrip(chr(0))}")
         print(f" DevNr: {board_info.tSystemInfo.ulDeviceNumber}")
@@ -201,48 +189,30 @@ def WIC_RunCifXConsoleTest( szBoard, szFirmwareFile, szConfigFile, ulTimerResolu
             szBoardName = board_info.abBoardName.decode('ascii')
             szBoard = szBoardName
 
-        fBoardFound = True
-
-        # Enumerate channels
-        while lChannelRet == CIFX_NO_ERROR:
-            # Read all channel information
-            channel_info = ChannelInformation()  # Assuming a class representing channel information
-            lChannelRet = wic_dll.xDriverEnumChannels(hDriver, ulBoardIdx, ulChannelIdx, ctypes.sizeof(channel_info), ctypes.byref(channel_info))
-
-            if lChannelRet != CIFX_NO_ERROR:
-                if lChannelRet != CIFX_NO_MORE_ENTRIES:
-                    # Show information about the error
-                    print(f"Error during xDriverEnumChannels(): Channel {ulChannelIdx.value}")
-                    show_error(lChannelRet)
-            else:
-                # Increment channel counter
-                ulChannelCount.value += 1
-
-                # Print channel information
-                print(f" Channel#{ulChannelIdx.value} Information:")
-                print(f"   Channel Error            : 0x{channel_info.ulChannelError:08X}")
-                print(f"   Board Name               : {bytes(channel_info.abBoardName).decode('ascii').rstrip(chr(0))}")
-                print(f"   Alias Name               : {bytes(channel_info.abBoardAlias).decode('ascii').rstrip(chr(0))}")
-                print(f"   Device Nr.               : {channel_info.ulDeviceNumber}")
-                print(f"   Serial Nr.               : {channel_info.ulSerialNumber}")
-                print(f"   MBX Size                 : {channel_info.ulMailboxSize}")
-                print(f"   Firmware Name            : {bytes(channel_info.abFWName).decode('ascii').rstrip(chr(0))}")
-                print(f"   Firmware Version         : {channel_info.usFWMajor}.{channel_info.usFWMinor}.{channel_info.usFWRevision} Build {channel_info.usFWBuild}")
-                print(f"   Open Counter             : {channel_info.ulOpenCnt}")
-                print(f"   Put Packet Counter       : {channel_info.ulPutPacketCnt}")
-                print(f"   Get Packet Counter       : {channel_info.ulGetPacketCnt}")
-                print(f"   Number of IO Input Areas : {channel_info.ulIOInAreaCnt}")
-                print(f"   Number of IO Output Areas: {channel_info.ulIOOutAreaCnt}")
-                print(f"   Size of handshake cells  : {channel_info.ulHskSize}")
-                print(f"   Actual netX Flags        : 0x{channel_info.ulNetxFlags:08X}")
-                print(f"   Actual host Flags        : 0x{channel_info.ulHostFlags:08X}")
-
-            ulChannelIdx.value += 1  # Next channel
-
-        print(f"Total channels on Board{ulBoardIdx.value}: {ulChannelCount.value}\n")
-        ulBoardIdx.value += 1  # Next board
-
-    print(f"Total number of boards found: {ulBoardCount.value}\n")
+        channels = enumeration.channels(board_info.abBoardName.decode('ascii').rstrip(chr(0)))
+        for ulChannelIdx, channel_info in enumerate(channels):
+            # Print channel information (counters and flags as of the last enumeration)
+            print(f" Channel#{ulChannelIdx} Information:")
+            print(f"   Channel Error            : 0x{channel_info.ulChannelError:08X}")
+            print(f"   Board Name               : {bytes(channel_info.abBoardName).decode('ascii').rstrip(chr(0))}")
+            print(f"   Alias Name               : {bytes(channel_info.abBoardAlias).decode('ascii').rstrip(chr(0))}")
+            print(f"   Device Nr.               : {channel_info.ulDeviceNumber}")
+            print(f"   Serial Nr.               : {channel_info.ulSerialNumber}")
+            print(f"   MBX Size                 : {channel_info.ulMailboxSize}")
+            print(f"   Firmware Name            : {bytes(channel_info.abFWName).decode('ascii').rstrip(chr(0))}")
+            print(f"   Firmware Version         : {channel_info.usFWMajor}.{channel_info.usFWMinor}.{channel_info.usFWRevision} Build {channel_info.usFWBuild}")
+            print(f"   Open Counter             : {channel_info.ulOpenCnt}")
+            print(f"   Put Packet Counter       : {channel_info.ulPutPacketCnt}")
+            print(f"   Get Packet Counter       : {channel_info.ulGetPacketCnt}")
+            print(f"   Number of IO Input Areas : {channel_info.ulIOInAreaCnt}")
+            print(f"   Number of IO Output Areas: {channel_info.ulIOOutAreaCnt}")
+            print(f"   Size of handshake cells  : {channel_info.ulHskSize}")
+            print(f"   Actual netX Flags        : 0x{channel_info.ulNetxFlags:08X}")
+            print(f"   Actual host Flags        : 0x{channel_info.ulHostFlags:08X}")
+
+        print(f"Total channels on Board{ulBoardIdx}: {len(channels)}\n")
+
+    print(f"Total number of boards found: {len(boards)}\n")
     print("\n************************************************")
     print(f"*** Running tests on device <{szBoard}>")
     print("************************************************\n")
@@ -259,93 +229,82 @@ def WIC_RunCifXConsoleTest( szBoard, szFirmwareFile, szConfigFile, ulTimerResolu
         else:
             print("\n*** TERMINATING Communication to Profibus MASTER ... ***")
 
+    # The background refresh uses the driver handle
+    enumeration.wait()
 
-def WIC_ReadIOData(hDriver, szBoard, ulWaitTimeout):
-
-    # Buffers to hold data
-    lRet = CIFX_NO_ERROR
-    abReadIOBuffer = (ctypes.c_byte * (SIZE_BUFFER_IN * 2))()
-    #abLastValidIOBuffer = (ctypes.c_byte * (SIZE_BUFFER_IN *2))()
 
-    # Initialize structures
-    slave = PbBufInWic()
-    #master = pb_buf_out()1
-    # Open the channel
-
-    szBoard_ctypes = ctypes.create_string_buffer(szBoard.encode('utf-8'))
+def WIC_ReadIOData(hDriver, szBoard, ulWaitTimeout, session=None, notifier=None):
+    """
+    Reads one input image from the Profibus master.
 
-    CIFXHANDLE = ctypes.c_void_p
-    hDevice = CIFXHANDLE(None)
+    Args:
+        hDriver: Driver handle returned by xDriverOpen.
+        szBoard (str): Board name, e.g. "cifX0".
+        ulWaitTimeout (int): IO timeout in milliseconds.
+        session (ChannelSession): Already opened channel to read from. If None, a
+            channel is opened for this call and closed again afterwards.
+        notifier (InputNotifier): Started notifier of the session. Waits for the input
+            notification instead of polling with ulWaitTimeout.
 
-    lRet = wic_dll.xChannelOpen(ctypes.byref(hDriver), szBoard_ctypes, 0, ctypes.byref(hDevice))
-    if lRet != CIFX_NO_ERROR:
-        print("Error in xChannelOpen:")
-        show_error(lRet)
-        return
-    else:
+    Returns:
+        PbBufInWic: The received image, or None if reading was aborted.
+    """
+    own_session = session is None
+    if own_session:
+        session = ChannelSession(hDriver, szBoard, ulWaitTimeout=ulWaitTimeout, dll=wic_dll)
+        session.reporter = error_reporter
+        try:
+            session.open()
+        except CifXError as e:
+            print(f"Error in {e.function}:")
+            show_error(e.lError)
+            return
         print("Channel opened successfully.")
+        print("\nContinuously reading I/O data from Profibus ...")
 
-    # Ensure hDevice is valid
-    if not hDevice:
-        print("Invalid device handle.")
-        return
-
-    # Set device states
-    ulState = ctypes.c_uint32(0)
-    print("Setting host state to CIFX_HOST_STATE_READY...")
-    lRet = wic_dll.xChannelHostState(hDevice, CIFX_HOST_STATE_READY, ctypes.byref(ulState), 1000)
-    if lRet != CIFX_NO_ERROR:
-        print(f"Error in xChannelHostState: {hex(lRet)}")
-        show_error(lRet)
-        wic_dll.xChannelClose(hDevice)
-        return
-
-    print("Setting bus state to CIFX_BUS_STATE_ON...")
-    lRet = wic_dll.xChannelBusState(hDevice, CIFX_BUS_STATE_ON, ctypes.byref(ulState), 1000)
-    if lRet != CIFX_NO_ERROR:
-        print(f"Error in xChannelBusState: {hex(lRet)}")
-        show_error(lRet)
-        wic_dll.xChannelClose(hDevice)
-        return
-
-    print("\nContinuously reading I/O data from Profibus ...")
-    bExitLoop = False
+    try:
+        bExitLoop = False
 
-    while not bExitLoop:
-        # Attempt to read data
-        lRet = wic_dll.xChannelIORead(hDevice, 0, 0, SIZE_BUFFER_IN, ctypes.byref(abReadIOBuffer), ulWaitTimeout)
-        if lRet != CIFX_NO_ERROR:
-            print(f"ReadIOData(): READING data from IOBuffer failed. (Error: {lRet})")
-            show_error(lRet)
-            
-        else:
-            ctypes.memmove(ctypes.addressof(slave), abReadIOBuffer, ctypes.sizeof(slave))
-            return slave
-            
-        # Check for keyboard input
-        if msvcrt.kbhit():
-            key = msvcrt.getch().decode('utf-8').lower()
-            if key in ('q', '\x1b'):  # 'q' or ESC
-                print(f"\nKey '{key}' pressed. Exiting Profibus I/O loop ...")
-                bExitLoop = True
-            elif key == 'w':  # Write operation
-                view = int(input("Enter view number (1-4): "))
-                print(f"Writing data for view {view}")
-                print("\n\nWRITING Copy of READ Buffer to MASTER ...")
-                WIC_SendToMaster(hDriver, szBoard, ulWaitTimeout)
-                print("\nDATA OUT: ")
-                # Output data structure
-                #print(master.data)
-
-        print("\n\n*** Press (w) to WRITE I/O Data back to Profibus MASTER. (ESC) or (q) to quit ***")
-        print("\n*********************************************************************************\n")
-
-        # Delay for input
-        time.sleep(3)  # Sleep for whatever seconds
-
-    # Cleanup
-    if hDevice != None:
-        wic_dll.xChannelClose(hDevice)
+        while not bExitLoop:
+            # Attempt to read data
+            if notifier is not None:
+                slave = notifier.next_input(ulWaitTimeout / 1000)
+                lError = notifier.lLastError
+            else:
+                slave = session.read_input(ulWaitTimeout)
+                lError = session.lLastError
+            if slave is None:
+                show_error(lError, "ReadIOData(): READING data from IOBuffer failed")
+            else:
+                return slave
+
+            # Check for keyboard input
+            if msvcrt is not None and msvcrt.kbhit():
+                key = msvcrt.getch().decode('utf-8').lower()
+                if key in ('q', '\x1b'):  # 'q' or ESC
+                    print(f"\nKey '{key}' pressed. Exiting Profibus I/O loop ...")
+                    bExitLoop = True
+                elif key == 'w':  # Write operation
+                    view = int(input("Enter view number (1-4): "))
+                    print(f"Writing data for view {view}")
+                    print("\n\nWRITING Copy of READ Buffer to MASTER ...")
+                    # Echo the header of the last image read_input() returned; it stays current
+                    # when a later read fails
+                    WIC_SendToMaster(hDriver, szBoard, ulWaitTimeout, session.input_image.current, session=session)
+                    print("\nDATA OUT: ")
+                    # Output data structure
+                    #print(master.data)
+
+            print("\n\n*** Press (w) to WRITE I/O Data back to Profibus MASTER. (ESC) or (q) to quit ***")
+            print("\n*********************************************************************************\n")
+
+            # Delay for input
+            time.sleep(3)  # Sleep for whatever seconds
+
+    finally:
+        # Cleanup
+        if own_session:
+            session.close()
 
 
 def main():
@@ -364,15 +323,17 @@ def main():
     print(f"Actual timer resolution = {g_ulTimerResolution.value} ms")
     print(f"Actual I/O wait timeout = {g_ulIOTimeout.value} ms\n")
 
-    # Set the system clock to 1ms resolution
-    tc = TIMECAPS()
-    MMResult = timeGetDevCaps(ctypes.byref(tc), ctypes.sizeof(tc))
-    if MMResult != TIMERR_NOERROR:
-        print(f"FAILED to read actual SYSTEM-TIME-RESOLUTION, error: 0x{MMResult:X}")
+    # Set the system clock to 1ms resolution (Windows timer API only)
+    MMResult = None
+    if sys.platform == "win32":
+        tc = TIMECAPS()
+        MMResult = timeGetDevCaps(ctypes.byref(tc), ctypes.sizeof(tc))
+        if MMResult != TIMERR_NOERROR:
+            print(f"FAILED to read actual SYSTEM-TIME-RESOLUTION, error: 0x{MMResult:X}")
 
-    MMResult = timeBeginPeriod(g_ulTimerResolution.value)
-    if MMResult != TIMERR_NOERROR:
-        print(f"FAILED to change SYSTEM-TIME-RESOLUTION to 1 ms, error: 0x{MMResult:X}")
+        MMResult = timeBeginPeriod(g_ulTimerResolution.value)
+        if MMResult != TIMERR_NOERROR:
+            print(f"FAILED to change SYSTEM-TIME-RESOLUTION to 1 ms, error: 0x{MMResult:X}")
 
     # Run the CifX console test
     return_code = WIC_RunCifXConsoleTest(
@@ -471,94 +432,60 @@ def print_PbBufOutWic(master):
     print("pv4:", list(master.pv4))
     print("pvq4:", list(master.pvq4))
 
-def WIC_SendToMaster(hDriver, szBoard, ulWaitTimeout, result):
-
-    lRet = CIFX_NO_ERROR
-    abWriteIOBuffer = (ctypes.c_byte * SIZE_BUFFER_OUT)() # Buffer to hold the data to write
-    abReadIOBuffer = (ctypes.c_byte * SIZE_BUFFER_IN)()
-    master = PbBufOutWic()
-    # Implementation starts
-    #master = PbBufOutWic()
-    slave = PbBufInWic()
-    print(hDriver, szBoard, ulWaitTimeout)
-    copy_struct(master, result)
-    print_PbBufOutWic(master)
-
-    
-    if ctypes.sizeof(master) > 244:
-        raise ValueError(f"PbBufOutWic structure size ({ctypes.sizeof(PbBufOutWic)}) exceeds buffer size (244).")
-    
-
-    szBoard_ctypes = ctypes.create_string_buffer(szBoard.encode('utf-8'))
-    CIFXHANDLE = ctypes.c_void_p
-    hDevice = CIFXHANDLE(None)
+def WIC_SendToMaster(hDriver, szBoard, ulWaitTimeout, result, session=None, values=None):
+    """
+    Sends the result image to the Profibus master.
 
-    lRet = wic_dll.xChannelOpen(ctypes.byref(hDriver), szBoard_ctypes, 0, ctypes.byref(hDevice))
-    if lRet != CIFX_NO_ERROR:
-        print("Error in xChannelOpen:")
-        show_error(lRet)
-        return
-    else:
+    Args:
+        hDriver: Driver handle returned by xDriverOpen.
+        szBoard (str): Board name, e.g. "cifX0".
+        ulWaitTimeout (int): IO timeout in milliseconds.
+        result: Input image (PbBufInWic) whose header is echoed to the master.
+        session (ChannelSession): Already opened channel to write to. If None, a
+            channel is opened for this call and closed again afterwards.
+        values: Processing result (response.PvBlock) sent as pv1..pv4 / pvq1..pvq4.
+            If None, the process values are sent as zero.
+    """
+    own_session = session is None
+    if own_session:
+        print(hDriver, szBoard, ulWaitTimeout)
+        session = ChannelSession(hDriver, szBoard, ulWaitTimeout=ulWaitTimeout, dll=wic_dll)
+        session.reporter = error_reporter
+
+    # Build the output directly in the session's preallocated output image
+    master = session.output_image.back
+    response_builder.build(session.output_image.back_buffer, result, values)
+
+    if own_session:
+        print_PbBufOutWic(master)
+        try:
+            session.open()
+        except CifXError as e:
+            print(f"Error in {e.function}:")
+            show_error(e.lError)
+            return
         print("Channel opened successfully.")
 
-    # Ensure hDevice is valid
-    if not hDevice:
-        print("Invalid device handle.")
-        return
-
-    # Set device states
-    ulState = ctypes.c_uint32(0)
-    print("Setting host state to CIFX_HOST_STATE_READY...")
-    lRet = wic_dll.xChannelHostState(hDevice, CIFX_HOST_STATE_READY, ctypes.byref(ulState), 1000)
-    if lRet != CIFX_NO_ERROR:
-        print(f"Error in xChannelHostState: {hex(lRet)}")
-        show_error(lRet)
-        wic_dll.xChannelClose(hDevice)
-        return
-
-    print("Setting bus state to CIFX_BUS_STATE_ON...")
-    lRet = wic_dll.xChannelBusState(hDevice, CIFX_BUS_STATE_ON, ctypes.byref(ulState), 1000)
-    if lRet != CIFX_NO_ERROR:
-        print(f"Error in xChannelBusState: {hex(lRet)}")
-        show_error(lRet)
-        wic_dll.xChannelClose(hDevice)
-        return
-
-    #Memcpy from master to a writing buffer
-    
-    
-    # Write the buffer to the channel's I/O area
-
-    #print_buffer(abWriteIOBuffer, ctypes.sizeof(PbBufOutWic))
-    #WIC_print_buffer(result)
-
-    ctypes.memmove(abWriteIOBuffer, ctypes.byref(master), ctypes.sizeof(master))
-    
-    #print("Buffer before memmove:", list(abWriteIOBuffer[:ctypes.sizeof(master)]))
-
-    lRet = wic_dll.xChannelIOWrite(hDevice, 0, 0, SIZE_BUFFER_OUT, abWriteIOBuffer, ulWaitTimeout)
-    if lRet != CIFX_NO_ERROR:
-        print(f"SendToMaster: Sending data failed. (Error: {lRet})")
-        show_error(lRet)
-    else:
-        print("\nSendToMaster: Data SENT successfully.\n")
-        #ctypes.memmove(ctypes.addressof(master), abWriteIOBuffer, ctypes.sizeof(master))
-        #WIC_PrintPBStruct(master)
-        #WIC_print_buffer(abWriteIOBuffer, ctypes.sizeof(abWriteIOBuffer))
-
-    # Optionally, read back the data to verify correct handling
-    lRet = wic_dll.xChannelIORead(hDevice, 0, 0, SIZE_BUFFER_IN, abReadIOBuffer, ulWaitTimeout)
-    if lRet != CIFX_NO_ERROR:
-        print(f"SendToMaster: Reading data back from Master failed. (Error: {lRet})")
-        show_error(lRet)
-    else:
-        print("READ Buffer back from Master:\n")
-        ctypes.memmove(ctypes.addressof(slave), abReadIOBuffer, ctypes.sizeof(slave))
-        WIC_PrintPBStruct(slave)
+    try:
+        # Write the buffer to the channel's I/O area
+        lRet = session.write_output(master, ulWaitTimeout)
+        if lRet != CIFX_NO_ERROR:
+            show_error(lRet, "SendToMaster: Sending data failed")
+        elif own_session:
+            print("\nSendToMaster: Data SENT successfully.\n")
+
+            # Optionally, read back the data to verify correct handling
+            slave = session.read_input(ulWaitTimeout)
+            if slave is None:
+                show_error(session.lLastError, "SendToMaster: Reading data back from Master failed")
+            else:
+                print("READ Buffer back from Master:\n")
+                WIC_PrintPBStruct(slave)
 
-    # Close the channel
-    if hDevice is not None:
-        wic_dll.xChannelClose(hDevice)
+    finally:
+        # Close the channel
+        if own_session:
+            session.close()
 
 if __name__ == "__main__":
     main()
@@ -8,6 +8,119 @@ TRACKS_PER_VIEW_MAX = 8
 TIMECAPS = ctypes.Structure
 CIFX_MAX_INFO_NAME_LENGTH = 16
 
+# IO image sizes exchanged with the Profibus master
+SIZE_BUFFER_IN = 244
+SIZE_BUFFER_OUT = 244
+
+# Host and bus states
+CIFX_HOST_STATE_NOT_READY = 0
+CIFX_HOST_STATE_READY = 1
+CIFX_BUS_STATE_OFF = 0
+CIFX_BUS_STATE_ON = 1
+
+# PLC memory pointer commands and IO area definitions (xChannelPLCMemoryPtr)
+CIFX_MEM_PTR_OPEN = 1
+CIFX_MEM_PTR_CLOSE = 2
+CIFX_IO_INPUT_AREA = 1
+CIFX_IO_OUTPUT_AREA = 2
+
+# Notifications (xChannelRegisterNotification)
+CIFX_NOTIFY_RX_MBX_FULL = 1
+CIFX_NOTIFY_TX_MBX_EMPTY = 2
+CIFX_NOTIFY_PD0_IN = 3
+CIFX_NOTIFY_PD1_IN = 4
+CIFX_NOTIFY_PD0_OUT = 5
+CIFX_NOTIFY_PD1_OUT = 6
+CIFX_NOTIFY_SYNC = 7
+CIFX_NOTIFY_COM_STATE = 8
+
+# Device COS flags (ChannelInformation.ulDeviceCOSFlags)
+RCX_COMM_COS_READY = 0x00000001
+RCX_COMM_COS_RUN = 0x00000002
+RCX_COMM_COS_BUS_ON = 0x00000004
+RCX_COMM_COS_CONFIG_LOCKED = 0x00000008
+RCX_COMM_COS_CONFIG_NEW = 0x00000010
+RCX_COMM_COS_RESTART_REQUIRED = 0x00000020
+
+# Host COS flags (ChannelInformation.ulHostCOSFlags)
+RCX_APP_COS_APP_READY = 0x00000001
+RCX_APP_COS_BUS_ON = 0x00000002
+
+# Mailbox packets (xChannelPutPacket / xChannelGetPacket)
+CIFX_MAX_PACKET_SIZE = 1596
+CIFX_PACKET_HEADER_SIZE = 40
+CIFX_MAX_DATA_SIZE = CIFX_MAX_PACKET_SIZE - CIFX_PACKET_HEADER_SIZE
+RCX_PACKET_DEST_SYSTEM = 0x00000000
+RCX_PACKET_DEST_DEFAULT_CHANNEL = 0x00000020
+RCX_FIRMWARE_IDENTIFY_REQ = 0x00001EB6
+RCX_GET_COMMON_STATE_REQ = 0x00002F00
+ERR_HIL_UNKNOWN_COMMAND = 0xC0000004
+
+# Error codes (cifXErrors.h)
+CIFX_NO_ERROR = ctypes.c_int32(0x00000000).value
+CIFX_INVALID_POINTER = ctypes.c_int32(0x800A0001).value
+CIFX_INVALID_BOARD = ctypes.c_int32(0x800A0002).value
+CIFX_INVALID_CHANNEL = ctypes.c_int32(0x800A0003).value
+CIFX_INVALID_HANDLE = ctypes.c_int32(0x800A0004).value
+CIFX_INVALID_PARAMETER = ctypes.c_int32(0x800A0005).value
+CIFX_INVALID_COMMAND = ctypes.c_int32(0x800A0006).value
+CIFX_INVALID_BUFFERSIZE = ctypes.c_int32(0x800A0007).value
+CIFX_INVALID_ACCESS_SIZE = ctypes.c_int32(0x800A0008).value
+CIFX_FUNCTION_FAILED = ctypes.c_int32(0x800A0009).value
+CIFX_NO_MORE_ENTRIES = ctypes.c_int32(0x800A0014).value
+CIFX_DEV_NOT_READY = ctypes.c_int32(0x800C0011).value
+CIFX_DEV_NOT_RUNNING = ctypes.c_int32(0x800C0012).value
+CIFX_DEV_MAILBOX_FULL = ctypes.c_int32(0x800C0016).value
+CIFX_DEV_PUT_TIMEOUT = ctypes.c_int32(0x800C0017).value
+CIFX_DEV_GET_TIMEOUT = ctypes.c_int32(0x800C0018).value
+CIFX_DEV_GET_NO_PACKET = ctypes.c_int32(0x800C0019).value
+CIFX_DEV_NO_COM_FLAG = ctypes.c_int32(0x800C0021).value
+CIFX_DEV_EXCHANGE_FAILED = ctypes.c_int32(0x800C0022).value
+CIFX_DEV_EXCHANGE_TIMEOUT = ctypes.c_int32(0x800C0023).value
+
+# Define the PLC_MEMORY_INFORMATION structure (xChannelPLCMemoryPtr)
+class PlcMemoryInformation(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [
+        ("pvMemoryID", ctypes.c_void_p),                      # Identification of the mapping, needed to close it
+        ("ppvMemoryPtr", POINTER(ctypes.c_void_p)),           # Returns the pointer to the channel's DPM
+        ("ulAreaDefinition", ctypes.c_uint32),                # CIFX_IO_INPUT_AREA or CIFX_IO_OUTPUT_AREA
+        ("ulAreaNumber", ctypes.c_uint32),                    # IO area number
+        ("pulIOAreaStartOffset", POINTER(ctypes.c_uint32)),   # Returns the offset of the IO area from the pointer
+        ("pulIOAreaSize", POINTER(ctypes.c_uint32)),          # Returns the size of the IO area
+    ]
+
+# Data of the CIFX_NOTIFY_COM_STATE notification
+class NotifyComState(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [
+        ("ulComState", ctypes.c_uint32),    # 1 if the channel communicates with the master
+    ]
+
+# Define the CIFX_PACKET structure
+class CifXPacketHeader(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [
+        ("ulDest", ctypes.c_uint32),     # Destination of the packet (process queue)
+        ("ulSrc", ctypes.c_uint32),      # Source of the packet (process queue)
+        ("ulDestId", ctypes.c_uint32),   # Destination reference
+        ("ulSrcId", ctypes.c_uint32),    # Source reference
+        ("ulLen", ctypes.c_uint32),      # Length of the packet data
+        ("ulId", ctypes.c_uint32),       # Identification, echoed in the answer
+        ("ulState", ctypes.c_uint32),    # Status / error code of the packet
+        ("ulCmd", ctypes.c_uint32),      # Command (request) / command + 1 (confirmation)
+        ("ulExt", ctypes.c_uint32),      # Extension
+        ("ulRout", ctypes.c_uint32),     # Routing information
+    ]
+
+
+class CifXPacket(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [
+        ("tHeader", CifXPacketHeader),
+        ("abData", ctypes.c_uint8 * CIFX_MAX_DATA_SIZE),
+    ]
+
 # Define the DRIVER_INFORMATION structure
 class DriverInformation(ctypes.Structure):
     _pack_ = 1  # Packed structure
@@ -1,4 +1,24 @@
 from .CIFX70E_DP import main
+from .driver import CifXDriver, CifXError
+from .session import ChannelSession
+from .cycle import CycleScheduler, CycleStats
+from .process_image import ProcessImage
+from .response import ResponseBuilder, PvBlock
+from .change import Change, ChangeDetector
+from .async_channel import AsyncChannel
+from .manager import ChannelManager, ChannelWorker
+from .enum_cache import EnumerationCache
+from .recorder import Recorder, RecordingReader
+from .backend import load_backend, get_backend, set_backend
+from .simulator import SimulatedCifX, LoopbackMaster
+from .replay import ReplayCifX, ReplayMaster, load_recording
+from .metrics import MetricsRegistry, CycleMetrics, MetricsServer, SnapshotWriter
+from .errors import ErrorDescriptions, ErrorReporter, Backoff
+from .keepalive import KeepAlive
+from .partial_io import PartialIO
+from .dpm import DirectChannel
+from .notify import InputNotifier
+from .mailbox import PacketService, parse_firmware_identify
 
 if __name__ == "__main__":
     main
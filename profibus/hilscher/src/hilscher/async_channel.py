@@ -0,0 +1,138 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .Definitions import CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT
+from .change import Change, ChangeDetector
+from .session import ChannelSession
+
+# Read results meaning "no new image from the master yet"
+NO_DATA_ERRORS = (CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT)
+
+
+class AsyncChannel:
+    """
+    asyncio interface to a cifX channel.
+
+    All driver calls of the channel run on one dedicated IO thread, so coroutines
+    (camera acquisition, processing, logging) keep running while a read waits for the
+    master. Images are handed over as copies, so they stay valid however long a
+    coroutine keeps them.
+
+    Usage:
+        async with AsyncChannel(driver, "cifX0") as channel:
+            async for slave in channel.images():
+                await channel.write_image(await process(slave))
+    """
+
+    def __init__(self, hDriver, szBoard, ulChannel=0, ulWaitTimeout=10, ulStateTimeout=1000, dll=None):
+        """
+        Args:
+            hDriver: An opened CifXDriver, or a raw driver handle returned by xDriverOpen.
+            szBoard (str): Board name, e.g. "cifX0".
+            ulChannel (int): Channel number on the board.
+            ulWaitTimeout (int): Default IO timeout in milliseconds.
+            ulStateTimeout (int): Timeout in milliseconds for the host/bus state handshakes.
+            dll: cifX API to call when a raw handle is given. Defaults to the process-wide backend.
+        """
+        self.session = ChannelSession(hDriver, szBoard, ulChannel, ulWaitTimeout, ulStateTimeout, dll)
+        self._executor = None
+
+    @property
+    def is_open(self):
+        return self.session.is_open
+
+    @property
+    def lLastError(self):
+        return self.session.lLastError
+
+    async def _call(self, func, *args):
+        if self._executor is None:
+            raise RuntimeError(f"AsyncChannel {self.session.szBoard} is not open.")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        """
+        Starts the IO thread and opens the channel on it.
+
+        Raises:
+            CifXError: If the channel could not be set up.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cifx-io-{self.session.szBoard}")
+        try:
+            await self._call(self.session.open)
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def close(self):
+        """
+        Closes the channel and stops the IO thread. Safe to call more than once.
+        """
+        if self._executor is None:
+            return
+        try:
+            await self._call(self.session.close)
+        finally:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+    def _read_copy(self, ulWaitTimeout):
+        slave = self.session.read_input(ulWaitTimeout)
+        return None if slave is None else type(slave).from_buffer_copy(slave)
+
+    async def read_image(self, ulWaitTimeout=None):
+        """
+        Reads the next input image.
+
+        Args:
+            ulWaitTimeout (int): IO timeout in milliseconds, defaults to the channel timeout.
+
+        Returns:
+            PbBufInWic: Copy of the received image, or None if the read failed (see lLastError).
+        """
+        return await self._call(self._read_copy, ulWaitTimeout)
+
+    async def write_image(self, master=None, ulWaitTimeout=None):
+        """
+        Writes an output image.
+
+        Args:
+            master (PbBufOutWic): The image to send. Defaults to `session.output_image.back`.
+            ulWaitTimeout (int): IO timeout in milliseconds, defaults to the channel timeout.
+
+        Returns:
+            int: cifX error code, CIFX_NO_ERROR on success.
+        """
+        return await self._call(self.session.write_output, master, ulWaitTimeout)
+
+    async def images(self, changes=Change.ALL):
+        """
+        Yields new input images until the channel is closed.
+
+        Reads that time out without data are retried; images identical to the previous
+        one (or differing only outside `changes`) are not yielded.
+
+        Args:
+            changes (Change): Field groups whose change makes an image new.
+
+        Raises:
+            CifXError: If a read fails for another reason than missing data.
+        """
+        detector = ChangeDetector()
+        while self.is_open:
+            slave = await self.read_image()
+            if slave is None:
+                if self.lLastError in NO_DATA_ERRORS or not self.is_open:
+                    continue
+                raise self.session._error("xChannelIORead", self.lLastError)
+            if detector.update(slave) & changes:
+                yield slave
@@ -0,0 +1,69 @@
+import ctypes
+import os
+import sys
+
+from .driver import declare_signatures
+
+# Environment variables selecting the cifX backend
+CIFX_BACKEND_ENV = "CIFX_BACKEND"      # "dll", "sim" or "replay"
+CIFX_LIBRARY_ENV = "CIFX_LIBRARY"      # path of the driver library for the "dll" backend
+
+DEFAULT_LIBRARY = 'C:/Windows/System32/cifX32dll.dll'
+#C:/Windows/SysWOW64/cifX32dll.dll
+
+_backend = None
+
+
+def load_backend(name=None, library=None):
+    """
+    Creates a cifX backend.
+
+    Args:
+        name (str): "dll" for the real driver library, "sim" for the in-process simulator,
+            "replay" for the simulator playing back $CIFX_REPLAY_FILE at $CIFX_REPLAY_SPEED
+            (default 1.0, 0 for as fast as possible).
+            Defaults to $CIFX_BACKEND, or "dll" on Windows and "sim" elsewhere.
+        library (str): Driver library for the "dll" backend. Defaults to $CIFX_LIBRARY
+            or the cifX32dll in System32.
+
+    Returns:
+        The cifX API: a ctypes.CDLL with declared signatures, a SimulatedCifX or a ReplayCifX.
+    """
+    name = name or os.getenv(CIFX_BACKEND_ENV) or ("dll" if sys.platform == "win32" else "sim")
+
+    if name == "dll":
+        dll = ctypes.CDLL(library or os.getenv(CIFX_LIBRARY_ENV) or DEFAULT_LIBRARY)
+        declare_signatures(dll)
+        return dll
+
+    if name == "sim":
+        from .simulator import SimulatedCifX
+        return SimulatedCifX()
+
+    if name == "replay":
+        from .replay import ReplayCifX, CIFX_REPLAY_FILE_ENV, CIFX_REPLAY_SPEED_ENV
+        recording = os.getenv(CIFX_REPLAY_FILE_ENV)
+        if not recording:
+            raise ValueError(f"The replay backend needs a recording in ${CIFX_REPLAY_FILE_ENV}.")
+        return ReplayCifX(recording, float(os.getenv(CIFX_REPLAY_SPEED_ENV) or 1.0))
+
+    raise ValueError(f"Unknown cifX backend '{name}', expected 'dll', 'sim' or 'replay'.")
+
+
+def get_backend():
+    """
+    Returns the process-wide cifX backend, loading it on first use.
+    """
+    global _backend
+    if _backend is None:
+        _backend = load_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Replaces the process-wide cifX backend. Must be called before the first
+    get_backend() / hilscher.CIFX70E_DP import to affect the module's wic_dll.
+    """
+    global _backend
+    _backend = backend
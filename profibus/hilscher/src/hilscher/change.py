@@ -0,0 +1,126 @@
+import enum
+
+from .Definitions import PbBufInWic
+
+
+class Change(enum.IntFlag):
+    """
+    Field groups of the input image that differ from the previous image.
+    """
+    NONE = 0
+    STATE = enum.auto()         # state1, state2
+    TIMESTAMP = enum.auto()     # year .. seconds
+    INTERVALS = enum.auto()     # interval1 .. interval4
+    VALUES = enum.auto()        # value_13 .. value_15
+    WATCHDOG = enum.auto()      # value_16, ticks every master cycle
+    SETPOINTS = enum.auto()     # sp1 .. sp4
+    ALL = STATE | TIMESTAMP | INTERVALS | VALUES | WATCHDOG | SETPOINTS
+
+    # Changes that require processing the image again
+    RELEVANT = STATE | INTERVALS | VALUES | SETPOINTS
+
+
+# Fields of PbBufInWic per change group
+PB_BUF_IN_GROUPS = {
+    Change.STATE: ("state1", "state2"),
+    Change.TIMESTAMP: ("year", "month", "day", "hours", "minutes", "seconds"),
+    Change.INTERVALS: ("interval1", "interval2", "interval3", "interval4"),
+    Change.VALUES: ("value_13", "value_14", "value_15"),
+    Change.WATCHDOG: ("value_16",),
+    Change.SETPOINTS: ("sp1", "sp2", "sp3", "sp4"),
+}
+
+
+class ChangeDetector:
+    """
+    Classifies each input image by the field groups that changed since the previous one.
+
+    The master refreshes the same image many times between real setpoint changes, so
+    most images differ only in the watchdog and timestamp. Whole images are compared as
+    bytes first; only differing images are compared group by group.
+
+    gate() turns a processing stage into one that only runs on relevant changes. The
+    response header (and with it the watchdog) is still echoed from every input image
+    by the write stage:
+
+    Usage:
+        detector = ChangeDetector()
+        builder = ResponseBuilder()
+
+        def write(values):
+            builder.build(session.output_image.back_buffer, session.input_image.current, values)
+            return session.write_output(session.output_image.back)
+
+        scheduler = CycleScheduler(10, session.read_input, detector.gate(process), write)
+    """
+
+    def __init__(self, struct_type=PbBufInWic, groups=PB_BUF_IN_GROUPS, relevant=Change.RELEVANT):
+        """
+        Args:
+            struct_type: ctypes structure of the input image.
+            groups (dict): Change flag -> field names of struct_type.
+            relevant (Change): Changes that trigger processing in gate().
+        """
+        self.relevant = relevant
+        self._slices = []
+        for flag, names in groups.items():
+            fields = [getattr(struct_type, name) for name in names]
+            start = min(field.offset for field in fields)
+            end = max(field.offset + field.size for field in fields)
+            self._slices.append((flag, slice(start, end)))
+        self._previous = None
+        self.processed = 0
+        self.skipped = 0
+
+    def reset(self):
+        """
+        Forgets the previous image, so the next one is reported as Change.ALL.
+        """
+        self._previous = None
+
+    def update(self, image):
+        """
+        Compares an image with the previous one and remembers it.
+
+        Args:
+            image: Input image (ctypes structure or other bytes-like object).
+
+        Returns:
+            Change: The changed field groups, Change.NONE for an identical image.
+        """
+        data = bytes(image)
+        previous = self._previous
+        self._previous = data
+        if previous is None:
+            return Change.ALL
+        if data == previous:
+            return Change.NONE
+
+        change = Change.NONE
+        for flag, region in self._slices:
+            if data[region] != previous[region]:
+                change |= flag
+        return change
+
+    def gate(self, process):
+        """
+        Wraps a processing stage so it only runs when a relevant field group changed.
+
+        Args:
+            process: Callable turning an input image into a processing result.
+
+        Returns:
+            Callable returning the result of process(image) for relevant changes and the
+            previous result otherwise.
+        """
+        result = None
+
+        def gated(image):
+            nonlocal result
+            if self.update(image) & self.relevant or result is None:
+                result = process(image)
+                self.processed += 1
+            else:
+                self.skipped += 1
+            return result
+        return gated
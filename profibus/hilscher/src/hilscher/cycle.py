@@ -0,0 +1,241 @@
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import sys
+import threading
+import time
+from collections import deque
+
+
+# clock_nanosleep() definitions (Linux)
+CLOCK_MONOTONIC = 1
+TIMER_ABSTIME = 1
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [
+        ("tv_sec", ctypes.c_long),
+        ("tv_nsec", ctypes.c_long),
+    ]
+
+
+def _load_clock_nanosleep():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        func = libc.clock_nanosleep
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(_Timespec), ctypes.POINTER(_Timespec)]
+    func.restype = ctypes.c_int
+    return func
+
+
+_clock_nanosleep = _load_clock_nanosleep()
+
+
+def sleep_until(deadline_ns):
+    """
+    Sleeps until the absolute time.monotonic_ns() deadline has been reached.
+
+    On Linux this is an absolute clock_nanosleep() on CLOCK_MONOTONIC (the same clock
+    as time.monotonic_ns()), so the wake-up time does not depend on when the call was made.
+    Elsewhere it falls back to a relative time.sleep().
+    """
+    if _clock_nanosleep is not None:
+        ts = _Timespec(deadline_ns // 1_000_000_000, deadline_ns % 1_000_000_000)
+        # Restart when interrupted by a signal, the deadline stays the same
+        while _clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, ctypes.byref(ts), None) == errno.EINTR:
+            pass
+        return
+
+    remaining = deadline_ns - time.monotonic_ns()
+    if remaining > 0:
+        time.sleep(remaining / 1_000_000_000)
+
+
+class CycleStats:
+    """
+    Jitter and overrun statistics of a CycleScheduler.
+
+    Jitter is the delay between a cycle's deadline and the moment the cycle actually started.
+    Only the last `history` samples are kept for the percentile.
+    """
+
+    def __init__(self, history=10000):
+        self.cycles = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.jitter_ns = deque(maxlen=history)
+        self._jitter_sum_ns = 0
+
+    def record(self, jitter_ns):
+        self.cycles += 1
+        if len(self.jitter_ns) == self.jitter_ns.maxlen:
+            self._jitter_sum_ns -= self.jitter_ns[0]
+        self.jitter_ns.append(jitter_ns)
+        self._jitter_sum_ns += jitter_ns
+
+    def summary(self):
+        """
+        Returns:
+            dict: cycles, overruns, skipped and min/mean/p99/max jitter in microseconds.
+        """
+        result = {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter_min_us": 0.0,
+            "jitter_mean_us": 0.0,
+            "jitter_p99_us": 0.0,
+            "jitter_max_us": 0.0,
+        }
+        if self.jitter_ns:
+            samples = sorted(self.jitter_ns)
+            result["jitter_min_us"] = samples[0] / 1000
+            result["jitter_mean_us"] = self._jitter_sum_ns / len(samples) / 1000
+            result["jitter_p99_us"] = samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000
+            result["jitter_max_us"] = samples[-1] / 1000
+        return result
+
+    def __str__(self):
+        s = self.summary()
+        return (f"cycles={s['cycles']} overruns={s['overruns']} skipped={s['skipped']} "
+                f"jitter[us] min={s['jitter_min_us']:.1f} mean={s['jitter_mean_us']:.1f} "
+                f"p99={s['jitter_p99_us']:.1f} max={s['jitter_max_us']:.1f}")
+
+
+class CycleScheduler:
+    """
+    Runs read -> process -> write at a fixed period.
+
+    Deadlines are absolute (start + n * period), so time spent in the stages or in
+    sleeping does not accumulate into drift. A cycle that finishes after the next
+    deadline counts as an overrun; deadlines that were missed completely are skipped
+    to keep the phase instead of running a burst of late cycles.
+
+    Usage:
+        with ChannelSession(hDriver, "cifX0") as session:
+            scheduler = CycleScheduler(10, session.read_input, process, session.write_output)
+            scheduler.run(cycles=1000)
+            print(scheduler.stats)
+    """
+
+    def __init__(self, period_ms, read, process=None, write=None, clock=time.monotonic_ns, sleep=sleep_until, metrics=None):
+        """
+        Args:
+            period_ms (float): Cycle period in milliseconds.
+            read: Callable returning the input image, or None if no image was read.
+            process: Callable turning the input image into the output image. Defaults to passing it through.
+            write: Callable sending the output image. Skipped when None or when process returns None.
+            clock: Monotonic clock in nanoseconds.
+            sleep: Callable sleeping until an absolute clock value in nanoseconds.
+            metrics (metrics.CycleMetrics): Receives stage and cycle times, jitter and overruns.
+        """
+        if period_ms <= 0:
+            raise ValueError(f"Cycle period must be positive, got {period_ms} ms.")
+        self.period_ns = int(period_ms * 1_000_000)
+        self.read = read
+        self.process = process
+        self.write = write
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = CycleStats()
+        self.metrics = metrics
+        self._stop = threading.Event()
+
+    def stop(self):
+        """
+        Requests the running loop to return after the current cycle.
+        """
+        self._stop.set()
+
+    def run_cycle(self):
+        """
+        Runs one read -> process -> write pass without any timing.
+        """
+        image = self.read()
+        if image is None:
+            return
+        result = image if self.process is None else self.process(image)
+        if result is not None and self.write is not None:
+            self.write(result)
+
+    def _run_cycle_measured(self):
+        # run_cycle() with the duration of each stage reported to the metrics
+        clock, metrics = self.clock, self.metrics
+        start = clock()
+        image = self.read()
+        end = clock()
+        metrics.observe_stage("read", end - start)
+        if image is None:
+            return
+        if self.process is not None:
+            start = end
+            image = self.process(image)
+            end = clock()
+            metrics.observe_stage("process", end - start)
+        if image is not None and self.write is not None:
+            start = end
+            self.write(image)
+            metrics.observe_stage("write", clock() - start)
+
+    def run(self, cycles=None):
+        """
+        Runs cycles until stop() is called or `cycles` cycles have been executed.
+
+        Returns:
+            CycleStats: The statistics of this scheduler.
+        """
+        self._stop.clear()
+        period_ns = self.period_ns
+        clock = self.clock
+        stats = self.stats
+        metrics = self.metrics
+        run_cycle = self.run_cycle if metrics is None else self._run_cycle_measured
+
+        deadline = clock() + period_ns
+        remaining = cycles
+        while not self._stop.is_set() and (remaining is None or remaining > 0):
+            self.sleep(deadline)
+            start = clock()
+            stats.record(start - deadline)
+
+            run_cycle()
+
+            now = clock()
+            if metrics is not None:
+                metrics.cycle_done(now, now - start, start - deadline)
+            deadline += period_ns
+            if now > deadline:
+                stats.overruns += 1
+                missed = (now - deadline) // period_ns
+                stats.skipped += missed
+                deadline += missed * period_ns
+                if metrics is not None:
+                    metrics.overrun(missed)
+
+            if remaining is not None:
+                remaining -= 1
+
+        return stats
+
+
+def main():
+    """
+    Measures the scheduler jitter on this machine with empty stages.
+    """
+    parser = argparse.ArgumentParser(description="Measure cycle jitter of the cyclic I/O scheduler.")
+    parser.add_argument("-P", "--period", type=float, default=10.0, help="Cycle period in milliseconds")
+    parser.add_argument("-N", "--cycles", type=int, default=1000, help="Number of cycles to run")
+    args = parser.parse_args()
+
+    scheduler = CycleScheduler(args.period, read=lambda: None)
+    print(f"Running {args.cycles} cycles at {args.period} ms ...")
+    print(scheduler.run(args.cycles))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Direct DPM access: zero-copy cyclic IO through the cifX PLC functions.
+
+xChannelPLCMemoryPtr maps the IO areas of a channel's dual-port memory into the
+process. PbBufInWic / PbBufOutWic are overlaid on the mapped areas, so the image is
+neither copied by the driver (as xChannelIORead/Write do) nor by us. Ownership of
+the areas is passed between host and card with the PLC handshake functions:
+
+    xChannelPLCIsReadReady    -> the input area holds a new image, the host owns it
+    xChannelPLCActivateRead   -> the host is done reading, the card may update it
+    xChannelPLCIsWriteReady   -> the host may write the output area
+    xChannelPLCActivateWrite  -> the output area is complete, the card sends it
+"""
+import ctypes
+import time
+
+from .Definitions import (
+    PbBufInWic, PbBufOutWic, PlcMemoryInformation,
+    CIFX_NO_ERROR, CIFX_DEV_EXCHANGE_TIMEOUT, CIFX_MEM_PTR_OPEN, CIFX_MEM_PTR_CLOSE, CIFX_IO_INPUT_AREA, CIFX_IO_OUTPUT_AREA,
+)
+from .driver import CifXError
+
+
+class _MappedArea:
+    """
+    One IO area mapped with xChannelPLCMemoryPtr.
+    """
+
+    def __init__(self, ulAreaDefinition, ulAreaNumber):
+        self.pvMemory = ctypes.c_void_p(None)
+        self.ulStartOffset = ctypes.c_uint32(0)
+        self.ulSize = ctypes.c_uint32(0)
+        self.info = PlcMemoryInformation(
+            ppvMemoryPtr=ctypes.pointer(self.pvMemory),
+            ulAreaDefinition=ulAreaDefinition,
+            ulAreaNumber=ulAreaNumber,
+            pulIOAreaStartOffset=ctypes.pointer(self.ulStartOffset),
+            pulIOAreaSize=ctypes.pointer(self.ulSize),
+        )
+
+    @property
+    def address(self):
+        return self.pvMemory.value + self.ulStartOffset.value
+
+
+class DirectChannel:
+    """
+    Zero-copy access to the IO areas of an opened channel.
+
+    `input` and `output` are structure views of the mapped DPM, valid while the channel
+    is mapped. The input image may only be read between read_input() and
+    release_input(), the output image may only be written after write_ready().
+
+    Usage:
+        with ChannelSession(driver, "cifX0") as session, DirectChannel(session) as dpm:
+            slave = dpm.read_input()
+            if slave is not None:
+                if dpm.write_ready():
+                    builder.build(dpm.output_buffer, slave, values)
+                    dpm.activate_write()
+                dpm.release_input()
+    """
+
+    def __init__(self, session, ulAreaNumber=0, in_type=PbBufInWic, out_type=PbBufOutWic, poll_interval=0.0002):
+        """
+        Args:
+            session (ChannelSession): Opened channel.
+            ulAreaNumber (int): IO area number.
+            in_type: Structure overlaid on the input area.
+            out_type: Structure overlaid on the output area.
+            poll_interval (float): Seconds between two handshake polls while waiting.
+        """
+        self.session = session
+        self.ulAreaNumber = ulAreaNumber
+        self.in_type = in_type
+        self.out_type = out_type
+        self.poll_interval = poll_interval
+        self.input = None
+        self.output = None
+        self.output_buffer = None
+        self.lLastError = CIFX_NO_ERROR
+        self._areas = ()
+        self._state = ctypes.c_uint32(0)
+        self._is_read_ready = None
+        self._is_write_ready = None
+        self._activate_read = None
+        self._activate_write = None
+
+    @property
+    def is_mapped(self):
+        return bool(self._areas)
+
+    def open(self):
+        """
+        Maps the input and output areas and overlays the image structures on them.
+
+        Raises:
+            CifXError: If an area cannot be mapped or is smaller than its structure.
+        """
+        if self.is_mapped:
+            return self
+        session = self.session
+        areas = []
+        try:
+            for ulAreaDefinition, struct_type in ((CIFX_IO_INPUT_AREA, self.in_type), (CIFX_IO_OUTPUT_AREA, self.out_type)):
+                area = _MappedArea(ulAreaDefinition, self.ulAreaNumber)
+                lRet = session.dll.xChannelPLCMemoryPtr(session.hDevice, CIFX_MEM_PTR_OPEN, ctypes.byref(area.info))
+                if lRet != CIFX_NO_ERROR or not area.pvMemory:
+                    raise session._error("xChannelPLCMemoryPtr", lRet)
+                areas.append(area)
+                if area.ulSize.value < ctypes.sizeof(struct_type):
+                    raise ValueError(f"{struct_type.__name__} structure size ({ctypes.sizeof(struct_type)}) exceeds the IO area ({area.ulSize.value}).")
+        except (CifXError, ValueError):
+            self._unmap(areas)
+            raise
+
+        self._areas = tuple(areas)
+        input_area, output_area = self._areas
+        self.input = self.in_type.from_address(input_area.address)
+        self.output = self.out_type.from_address(output_area.address)
+        self.output_buffer = (ctypes.c_ubyte * ctypes.sizeof(self.out_type)).from_address(output_area.address)
+
+        bind = session.driver.bind
+        state = ctypes.byref(self._state)
+        self._is_read_ready = bind("xChannelPLCIsReadReady", session.hDevice, self.ulAreaNumber, state)
+        self._is_write_ready = bind("xChannelPLCIsWriteReady", session.hDevice, self.ulAreaNumber, state)
+        self._activate_read = bind("xChannelPLCActivateRead", session.hDevice, self.ulAreaNumber)
+        self._activate_write = bind("xChannelPLCActivateWrite", session.hDevice, self.ulAreaNumber)
+        return self
+
+    def _unmap(self, areas):
+        for area in areas:
+            self.session.dll.xChannelPLCMemoryPtr(self.session.hDevice, CIFX_MEM_PTR_CLOSE, ctypes.byref(area.info))
+
+    def close(self):
+        """
+        Unmaps the areas. The structure views must not be used afterwards.
+        """
+        if self.is_mapped and self.session.is_open:
+            self._unmap(self._areas)
+        self._areas = ()
+        self.input = self.output = self.output_buffer = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _check(self, function, lRet):
+        self.lLastError = lRet
+        if lRet != CIFX_NO_ERROR and self.session.metrics is not None:
+            self.session.metrics.count_error(function, lRet)
+        return lRet
+
+    def _poll(self, function, call, ulTimeout):
+        # Polls a handshake flag until it is set or ulTimeout milliseconds have passed
+        deadline = None
+        while True:
+            lRet = call()
+            if lRet != CIFX_NO_ERROR:
+                return self._check(function, lRet)
+            if self._state.value:
+                self.lLastError = CIFX_NO_ERROR
+                return CIFX_NO_ERROR
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + ulTimeout / 1000
+            elif now >= deadline:
+                self.lLastError = CIFX_DEV_EXCHANGE_TIMEOUT
+                return CIFX_DEV_EXCHANGE_TIMEOUT
+            time.sleep(self.poll_interval)
+
+    def read_input(self, ulWaitTimeout=None):
+        """
+        Waits until the card handed over a new input image.
+
+        Args:
+            ulWaitTimeout (int): Timeout in milliseconds, defaults to the session timeout.
+
+        Returns:
+            The input structure overlaid on the DPM, or None on timeout or error (see
+            lLastError). Release it with release_input() once processed.
+        """
+        ulTimeout = self.session.ulWaitTimeout if ulWaitTimeout is None else ulWaitTimeout
+        if self._poll("xChannelPLCIsReadReady", self._is_read_ready, ulTimeout) != CIFX_NO_ERROR:
+            return None
+        if self.session.recorder is not None:
+            self.session.recorder.record_input(self.input)
+        return self.input
+
+    def release_input(self):
+        """
+        Hands the input area back to the card for the next image.
+
+        Returns:
+            int: cifX error code, CIFX_NO_ERROR on success.
+        """
+        return self._check("xChannelPLCActivateRead", self._activate_read())
+
+    def write_ready(self, ulWaitTimeout=None):
+        """
+        Waits until the host may write the output area.
+
+        Returns:
+            bool: True if `output` may be written now (see lLastError otherwise).
+        """
+        ulTimeout = self.session.ulWaitTimeout if ulWaitTimeout is None else ulWaitTimeout
+        return self._poll("xChannelPLCIsWriteReady", self._is_write_ready, ulTimeout) == CIFX_NO_ERROR
+
+    def activate_write(self):
+        """
+        Hands the written output area to the card.
+
+        Returns:
+            int: cifX error code, CIFX_NO_ERROR on success.
+        """
+        lRet = self._check("xChannelPLCActivateWrite", self._activate_write())
+        if lRet == CIFX_NO_ERROR and self.session.recorder is not None:
+            self.session.recorder.record_output(self.output)
+        return lRet
@@ -0,0 +1,238 @@
+import ctypes
+from ctypes import POINTER, CFUNCTYPE, c_char_p, c_int32, c_uint32, c_void_p
+from functools import partial
+
+from .Definitions import DriverInformation, BoardInformation, ChannelInformation, CIFX_NO_ERROR
+from .errors import ErrorDescriptions
+
+
+# typedef void* CIFXHANDLE;
+CIFXHANDLE = c_void_p
+
+# typedef void (APIENTRY *PFN_NOTIFY_CALLBACK)(uint32_t ulNotification, uint32_t ulDataLen, void* pvData, void* pvUser);
+PFN_NOTIFY_CALLBACK = CFUNCTYPE(None, c_uint32, c_uint32, c_void_p, c_void_p)
+
+# Signatures of the cifX API functions as declared in cifXUser.h: name -> (restype, argtypes)
+CIFX_API_SIGNATURES = {
+    # Driver functions
+    "xDriverOpen": (c_int32, [POINTER(CIFXHANDLE)]),
+    "xDriverClose": (c_int32, [CIFXHANDLE]),
+    "xDriverGetInformation": (c_int32, [CIFXHANDLE, c_uint32, c_void_p]),
+    "xDriverGetErrorDescription": (c_int32, [c_int32, c_char_p, c_uint32]),
+    "xDriverEnumBoards": (c_int32, [CIFXHANDLE, c_uint32, c_uint32, c_void_p]),
+    "xDriverEnumChannels": (c_int32, [CIFXHANDLE, c_uint32, c_uint32, c_uint32, c_void_p]),
+    "xDriverRestartDevice": (c_int32, [CIFXHANDLE, c_char_p, c_void_p]),
+
+    # Channel functions
+    "xChannelOpen": (c_int32, [CIFXHANDLE, c_char_p, c_uint32, POINTER(CIFXHANDLE)]),
+    "xChannelClose": (c_int32, [CIFXHANDLE]),
+    "xChannelInfo": (c_int32, [CIFXHANDLE, c_uint32, c_void_p]),
+    "xChannelReset": (c_int32, [CIFXHANDLE, c_uint32, c_uint32]),
+    "xChannelWatchdog": (c_int32, [CIFXHANDLE, c_uint32, POINTER(c_uint32)]),
+    "xChannelHostState": (c_int32, [CIFXHANDLE, c_uint32, POINTER(c_uint32), c_uint32]),
+    "xChannelBusState": (c_int32, [CIFXHANDLE, c_uint32, POINTER(c_uint32), c_uint32]),
+    "xChannelIORead": (c_int32, [CIFXHANDLE, c_uint32, c_uint32, c_uint32, c_void_p, c_uint32]),
+    "xChannelIOWrite": (c_int32, [CIFXHANDLE, c_uint32, c_uint32, c_uint32, c_void_p, c_uint32]),
+    "xChannelIOReadSendData": (c_int32, [CIFXHANDLE, c_uint32, c_uint32, c_uint32, c_void_p]),
+
+    # Mailbox functions
+    "xChannelGetMBXState": (c_int32, [CIFXHANDLE, POINTER(c_uint32), POINTER(c_uint32)]),
+    "xChannelPutPacket": (c_int32, [CIFXHANDLE, c_void_p, c_uint32]),
+    "xChannelGetPacket": (c_int32, [CIFXHANDLE, c_uint32, c_void_p, c_uint32]),
+
+    # Notification functions
+    "xChannelRegisterNotification": (c_int32, [CIFXHANDLE, c_uint32, PFN_NOTIFY_CALLBACK, c_void_p]),
+    "xChannelUnregisterNotification": (c_int32, [CIFXHANDLE, c_uint32]),
+
+    # PLC (direct DPM access) functions
+    "xChannelPLCMemoryPtr": (c_int32, [CIFXHANDLE, c_uint32, c_void_p]),
+    "xChannelPLCIsReadReady": (c_int32, [CIFXHANDLE, c_uint32, POINTER(c_uint32)]),
+    "xChannelPLCIsWriteReady": (c_int32, [CIFXHANDLE, c_uint32, POINTER(c_uint32)]),
+    "xChannelPLCActivateWrite": (c_int32, [CIFXHANDLE, c_uint32]),
+    "xChannelPLCActivateRead": (c_int32, [CIFXHANDLE, c_uint32]),
+}
+
+
+class CifXError(RuntimeError):
+    """
+    Raised when a cifX driver call needed to set up a channel fails.
+
+    Attributes:
+        function (str): Name of the failing cifX API function.
+        lError (int): cifX error code returned by the driver.
+        description (str): Driver error description, if it could be retrieved.
+    """
+
+    def __init__(self, function, lError, description=""):
+        self.function = function
+        self.lError = lError
+        self.description = description
+        super().__init__(f"{function} failed: 0x{lError & 0xFFFFFFFF:08X} <{description}>")
+
+
+def declare_signatures(dll):
+    """
+    Sets argtypes/restype of every cifX API function exported by a loaded library.
+
+    Functions the library does not export are skipped. Objects that are not ctypes
+    libraries (e.g. an in-process simulator) are left untouched.
+    """
+    if not isinstance(dll, ctypes.CDLL):
+        return
+    for name, (restype, argtypes) in CIFX_API_SIGNATURES.items():
+        try:
+            func = getattr(dll, name)
+        except AttributeError:
+            continue
+        func.restype = restype
+        func.argtypes = argtypes
+
+
+class CifXDriver:
+    """
+    Typed facade over the cifX driver API.
+
+    The API signatures are declared once on the library, the driver handle and its
+    byref() pointer are created once, and bind()/bind_io() return prebound callables
+    for the cyclic calls so the hot path does no argument building or conversion.
+
+    Usage:
+        with CifXDriver() as driver:
+            for board in driver.enum_boards():
+                print(board.abBoardName)
+    """
+
+    def __init__(self, dll=None, hDriver=None):
+        """
+        Args:
+            dll: cifX API to call. Defaults to the process-wide backend (see backend.get_backend()).
+            hDriver: Already opened driver handle. If None, open() opens the driver.
+        """
+        if dll is None:
+            from .backend import get_backend
+            dll = get_backend()
+        declare_signatures(dll)
+        self.dll = dll
+        self._owns_handle = hDriver is None
+        self.hDriver = CIFXHANDLE(None) if hDriver is None else hDriver
+        self._phDriver = ctypes.byref(self.hDriver)
+        self.error_descriptions = ErrorDescriptions(dll)
+        self._fast_funcs = {}
+
+    @property
+    def is_open(self):
+        return bool(self.hDriver)
+
+    def open(self):
+        """
+        Opens the driver.
+
+        Returns:
+            int: cifX error code, CIFX_NO_ERROR on success.
+        """
+        if self.is_open:
+            return CIFX_NO_ERROR
+        return self.dll.xDriverOpen(self._phDriver)
+
+    def close(self):
+        """
+        Closes the driver if it was opened by this object.
+        """
+        if self.is_open and self._owns_handle:
+            self.dll.xDriverClose(self.hDriver)
+            self.hDriver.value = None
+
+    def __enter__(self):
+        lRet = self.open()
+        if lRet != CIFX_NO_ERROR:
+            raise CifXError("xDriverOpen", lRet, self.error_description(lRet))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def error_description(self, lError):
+        """
+        Returns the driver's description of a cifX error code (cached per code).
+        """
+        return self.error_descriptions.describe(lError)
+
+    def get_information(self):
+        """
+        Returns:
+            DriverInformation: The driver information, or None on error.
+        """
+        driver_info = DriverInformation()
+        if self.dll.xDriverGetInformation(self.hDriver, ctypes.sizeof(driver_info), ctypes.byref(driver_info)) != CIFX_NO_ERROR:
+            return None
+        return driver_info
+
+    def enum_boards(self):
+        """
+        Yields the BoardInformation of every board known to the driver.
+        """
+        ulBoard = 0
+        while True:
+            board_info = BoardInformation()
+            if self.dll.xDriverEnumBoards(self.hDriver, ulBoard, ctypes.sizeof(board_info), ctypes.byref(board_info)) != CIFX_NO_ERROR:
+                return
+            yield board_info
+            ulBoard += 1
+
+    def enum_channels(self, ulBoard):
+        """
+        Yields the ChannelInformation of every channel of a board.
+        """
+        ulChannel = 0
+        while True:
+            channel_info = ChannelInformation()
+            if self.dll.xDriverEnumChannels(self.hDriver, ulBoard, ulChannel, ctypes.sizeof(channel_info), ctypes.byref(channel_info)) != CIFX_NO_ERROR:
+                return
+            yield channel_info
+            ulChannel += 1
+
+    def fast(self, function):
+        """
+        Returns an untyped alias of a cifX function that only has its restype set.
+
+        ctypes converts every argument through argtypes on each call, which costs more
+        than the driver call itself. The alias skips that conversion, so it must only be
+        called with arguments that were checked beforehand (see bind()).
+        """
+        func = self._fast_funcs.get(function)
+        if func is None:
+            if isinstance(self.dll, ctypes.CDLL):
+                func = self.dll._FuncPtr((function, self.dll))
+                func.restype = CIFX_API_SIGNATURES[function][0]
+            else:
+                func = getattr(self.dll, function)
+            self._fast_funcs[function] = func
+        return func
+
+    def bind(self, function, *args):
+        """
+        Returns a callable performing one prebound call of a cifX function.
+
+        Integer arguments are checked once to fit the uint32 parameters (and the C int
+        ctypes passes them as); handles, pointers and buffers are passed as given.
+        """
+        for value in args:
+            if isinstance(value, int) and not 0 <= value < 2**31:
+                raise ValueError(f"{function}: argument {value} out of range")
+        return partial(self.fast(function), *args)
+
+    def bind_io(self, function, hChannel, ulArea, ulOffset, ulDataLen, buffer, ulTimeout):
+        """
+        Returns a callable performing one prebound IO transfer.
+
+        Args:
+            function (str): "xChannelIORead" or "xChannelIOWrite".
+            hChannel: Channel handle.
+            ulArea, ulOffset, ulDataLen (int): Area number, offset and length of the transfer.
+            buffer: ctypes buffer the data is read into / written from.
+            ulTimeout (int): IO timeout in milliseconds.
+        """
+        if ctypes.sizeof(buffer) < ulDataLen:
+            raise ValueError(f"{function}: buffer ({ctypes.sizeof(buffer)} bytes) is smaller than ulDataLen ({ulDataLen}).")
+        return self.bind(function, hChannel, ulArea, ulOffset, ulDataLen, buffer, ulTimeout)
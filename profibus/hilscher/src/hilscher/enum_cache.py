@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from .Definitions import BoardInformation, ChannelInformation
+
+# Environment variable overriding the location of the cache file
+CIFX_ENUM_CACHE_ENV = "CIFX_ENUM_CACHE"
+
+DEFAULT_CACHE_FILE = Path.home() / ".cache" / "hilscher" / "cifx_enumeration.json"
+CACHE_VERSION = 1
+
+
+def board_key(board_info):
+    """
+    Returns the "device number/serial number" identifying a board.
+    """
+    return f"{board_info.tSystemInfo.ulDeviceNumber}/{board_info.tSystemInfo.ulSerialNumber}"
+
+
+def _text(value):
+    return value.decode('ascii', 'replace').rstrip('\0')
+
+
+def _board_entry(ulBoard, board_info, channels):
+    return {
+        "ulBoard": ulBoard,
+        "name": _text(board_info.abBoardName),
+        "alias": _text(board_info.abBoardAlias),
+        "device_number": board_info.tSystemInfo.ulDeviceNumber,
+        "serial_number": board_info.tSystemInfo.ulSerialNumber,
+        "board_info": bytes(board_info).hex(),
+        "channels": [
+            {
+                "firmware": bytes(info.abFWName[:info.bFWNameLength]).decode('ascii', 'replace'),
+                "version": f"{info.usFWMajor}.{info.usFWMinor}.{info.usFWBuild}.{info.usFWRevision}",
+                "channel_info": bytes(info).hex(),
+            }
+            for info in channels
+        ],
+    }
+
+
+def _signature(entries):
+    # Fields that identify the installation; counters and flags in the infos change all the time
+    return {
+        key: (entry["ulBoard"], entry["name"], entry["alias"],
+              tuple((channel["firmware"], channel["version"]) for channel in entry["channels"]))
+        for key, entry in entries.items()
+    }
+
+
+class EnumerationCache:
+    """
+    On-disk cache of the board/channel enumeration.
+
+    Walking xDriverEnumBoards / xDriverEnumChannels for every board and channel is slow
+    compared to the cyclic IO. The cache stores the result keyed by device/serial
+    number. On start it is validated with one xDriverEnumBoards call per board, and the
+    full enumeration is refreshed on a background thread while the cyclic loop already
+    runs.
+
+    Usage:
+        with CifXDriver() as driver:
+            cache = EnumerationCache().start(driver)
+            manager = ChannelManager(driver, cache.channel_keys())
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: Cache file. Defaults to $CIFX_ENUM_CACHE or ~/.cache/hilscher/cifx_enumeration.json.
+        """
+        self.path = Path(path or os.getenv(CIFX_ENUM_CACHE_ENV) or DEFAULT_CACHE_FILE)
+        self.entries = {}
+        self.valid = False
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def load(self):
+        """
+        Reads the cache file.
+
+        Returns:
+            bool: True if a cache of the current format was read.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != CACHE_VERSION:
+            return False
+        with self._lock:
+            self.entries = data["boards"]
+        return True
+
+    def save(self):
+        """
+        Writes the cache file atomically.
+
+        The cache is only an optimization: if it cannot be written (e.g. read-only cache
+        directory), the error is printed and the in-memory entries stay valid, so the
+        next start falls back to the live enumeration.
+
+        Returns:
+            bool: True if the cache file was written.
+        """
+        with self._lock:
+            data = {"version": CACHE_VERSION, "boards": self.entries}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to write enumeration cache {self.path}: {e}")
+            return False
+        return True
+
+    def validate(self, driver):
+        """
+        Checks that the driver reports the cached boards, without enumerating channels.
+
+        Returns:
+            bool: True if the boards (device/serial number, index and name) match the cache.
+        """
+        boards = {board_key(info): (ulBoard, _text(info.abBoardName)) for ulBoard, info in enumerate(driver.enum_boards())}
+        with self._lock:
+            cached = {key: (entry["ulBoard"], entry["name"]) for key, entry in self.entries.items()}
+        self.valid = bool(boards) and boards == cached
+        return self.valid
+
+    def refresh(self, driver):
+        """
+        Enumerates all boards and channels and updates the cache file if the installation changed.
+
+        Returns:
+            bool: True if the cache changed.
+        """
+        entries = {}
+        for ulBoard, board_info in enumerate(driver.enum_boards()):
+            entries[board_key(board_info)] = _board_entry(ulBoard, board_info, list(driver.enum_channels(ulBoard)))
+
+        with self._lock:
+            changed = _signature(entries) != _signature(self.entries)
+            self.entries = entries
+        self.valid = True
+        if changed:
+            self.save()
+        return changed
+
+    def start(self, driver, background=False):
+        """
+        Loads and validates the cache, then refreshes it on a background thread.
+
+        Without a valid cache the enumeration is done right away.
+
+        Args:
+            driver (CifXDriver): Opened driver.
+            background (bool): Never call the driver on the calling thread: the cache file
+                is only loaded (not validated), and the refresh runs in the background
+                even on a cold start, so the entries may be empty until it finished.
+        """
+        if background:
+            self.load()
+            self._start_refresh(driver)
+        elif self.load() and self.validate(driver):
+            self._start_refresh(driver)
+        else:
+            self.refresh(driver)
+        return self
+
+    def _start_refresh(self, driver):
+        self._refresh_thread = threading.Thread(target=self.refresh, args=(driver,), name="cifx-enum-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def wait(self, timeout=None):
+        """
+        Waits for the background refresh, e.g. before closing the driver.
+        """
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout)
+
+    def find(self, szBoard):
+        """
+        Returns:
+            dict: Cache entry of the board with this name or alias, or None.
+        """
+        with self._lock:
+            for entry in self.entries.values():
+                if szBoard in (entry["name"], entry["alias"]):
+                    return entry
+        return None
+
+    def boards(self):
+        """
+        Returns:
+            list: BoardInformation of every cached board, by board index.
+        """
+        with self._lock:
+            entries = sorted(self.entries.values(), key=lambda entry: entry["ulBoard"])
+        return [BoardInformation.from_buffer_copy(bytes.fromhex(entry["board_info"])) for entry in entries]
+
+    def channels(self, szBoard):
+        """
+        Returns:
+            list: ChannelInformation of every cached channel of a board.
+        """
+        entry = self.find(szBoard)
+        if entry is None:
+            return []
+        return [ChannelInformation.from_buffer_copy(bytes.fromhex(channel["channel_info"])) for channel in entry["channels"]]
+
+    def channel_keys(self):
+        """
+        Returns:
+            list: (board name, channel number) of every cached channel, e.g. for ChannelManager.
+        """
+        with self._lock:
+            entries = sorted(self.entries.values(), key=lambda entry: entry["ulBoard"])
+        return [(entry["name"], ulChannel) for entry in entries for ulChannel in range(len(entry["channels"]))]
@@ -0,0 +1,201 @@
+"""
+Error handling for the cyclic IO: cached error descriptions, rate-limited reporting
+and exponential backoff for retries.
+
+During a bus outage every cycle fails with the same error code. The description is
+looked up in the driver once per code, the first failure is reported right away and
+repeats are only counted and summarized once per interval, e.g.
+
+    Error: 0x800C0019 <Communication flag not set> x 412 in last 10 s
+"""
+import ctypes
+import random
+import threading
+import time
+from ctypes import create_string_buffer
+
+from .Definitions import CIFX_NO_ERROR
+
+
+def format_error(lError):
+    """
+    Returns a cifX error code as unsigned hex, e.g. 0x800C0019.
+    """
+    return f"0x{lError & 0xFFFFFFFF:08X}"
+
+
+class ErrorDescriptions:
+    """
+    Cache of the driver's error descriptions, one xDriverGetErrorDescription call per code.
+    """
+
+    def __init__(self, dll):
+        """
+        Args:
+            dll: cifX API providing xDriverGetErrorDescription.
+        """
+        self.dll = dll
+        self._cache = {}
+        self._szError = create_string_buffer(1024)
+        self._lock = threading.Lock()
+
+    def describe(self, lError):
+        """
+        Returns:
+            str: The driver's description of a cifX error code.
+        """
+        description = self._cache.get(lError)
+        if description is None:
+            with self._lock:
+                self.dll.xDriverGetErrorDescription(lError, self._szError, ctypes.sizeof(self._szError))
+                description = self._szError.value.decode('ascii', 'replace').rstrip('\0')
+            self._cache[lError] = description
+        return description
+
+    def clear(self):
+        self._cache.clear()
+
+
+class ErrorReporter:
+    """
+    Reports cifX errors at most once per code and interval.
+
+    The first occurrence of a code is reported immediately. Further occurrences within
+    `interval` seconds are counted and reported as one summary line when the interval
+    has passed (checked on the next report() or flush()). The summary gives the time
+    since the first counted occurrence.
+    """
+
+    def __init__(self, describe=None, interval=10.0, output=print, clock=time.monotonic):
+        """
+        Args:
+            describe: Callable returning the description of an error code, e.g. ErrorDescriptions.describe.
+            interval (float): Seconds between two reports of the same code.
+            output: Callable receiving each report line.
+            clock: Monotonic clock in seconds.
+        """
+        self.describe = describe
+        self.interval = interval
+        self.output = output
+        self.clock = clock
+        self.reported = 0
+        self.suppressed = 0
+        # code -> [start of the interval, occurrences not reported yet,
+        #          time and context of the first of them]
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def _line(self, lError, context=""):
+        description = f" <{self.describe(lError)}>" if self.describe is not None else ""
+        prefix = f"{context}: " if context else ""
+        return f"{prefix}Error: {format_error(lError)}{description}"
+
+    def report(self, lError, context=""):
+        """
+        Reports an error code, or counts it if it was reported less than `interval` ago.
+
+        Args:
+            lError (int): cifX error code; CIFX_NO_ERROR is ignored.
+            context (str): Prefix of the report line, e.g. the failing function.
+
+        Returns:
+            bool: True if a line was written.
+        """
+        if lError == CIFX_NO_ERROR:
+            return False
+        now = self.clock()
+        with self._lock:
+            state = self._codes.get(lError)
+            if state is not None and now - state[0] < self.interval:
+                if not state[1]:
+                    state[2], state[3] = now, context
+                state[1] += 1
+                self.suppressed += 1
+                return False
+            pending = state if state is not None and state[1] else None
+            self._codes[lError] = [now, 0, None, ""]
+        if pending is not None:
+            self._summary(lError, pending[1] + 1, now - pending[2], context)
+        else:
+            self.output(self._line(lError, context))
+        self.reported += 1
+        return True
+
+    def _summary(self, lError, count, span, context=""):
+        self.output(f"{self._line(lError, context)} x {count} in last {round(span, 1):g} s")
+
+    def flush(self):
+        """
+        Writes the summaries of all codes with unreported occurrences.
+        """
+        now = self.clock()
+        with self._lock:
+            pending = [(lError, state[1], now - state[2], state[3]) for lError, state in self._codes.items() if state[1]]
+            self._codes.clear()
+        for lError, count, span, context in pending:
+            self._summary(lError, count, span, context)
+            self.reported += 1
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter for retrying a failing operation, e.g. reopening
+    a channel while the bus is down.
+
+    Usage:
+        backoff = Backoff(initial=0.1, maximum=10.0)
+        while not try_open():
+            if backoff.wait(stop_event):
+                break
+        backoff.reset()
+    """
+
+    def __init__(self, initial=0.1, maximum=10.0, factor=2.0, jitter=0.1, rng=random.random):
+        """
+        Args:
+            initial (float): First delay in seconds.
+            maximum (float): Upper limit of the delay in seconds.
+            factor (float): Growth of the delay per failed attempt.
+            jitter (float): Random spread of each delay, as a fraction of it.
+            rng: Callable returning a random float in [0, 1).
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.rng = rng
+        self.attempts = 0
+
+    def reset(self):
+        """
+        Starts over with the initial delay, after the operation succeeded.
+        """
+        self.attempts = 0
+
+    def next_delay(self):
+        """
+        Returns:
+            float: Delay in seconds before the next attempt.
+        """
+        # The exponent is capped so the delay cannot overflow after a long outage
+        delay = min(self.maximum, self.initial * self.factor ** min(self.attempts, 64))
+        self.attempts += 1
+        if self.jitter:
+            delay *= 1 + self.jitter * (2 * self.rng() - 1)
+        return delay
+
+    def wait(self, stop=None):
+        """
+        Sleeps for the next delay.
+
+        Args:
+            stop (threading.Event): Ends the wait early when set.
+
+        Returns:
+            bool: True if the wait was ended by `stop`.
+        """
+        delay = self.next_delay()
+        if stop is None:
+            time.sleep(delay)
+            return False
+        return stop.wait(delay)
@@ -0,0 +1,124 @@
+"""
+NumPy codec for batches of raw Profibus frames.
+
+The structured dtypes mirror PbBufInWic / PbBufOutWic byte for byte (field offsets and
+packing are taken from the ctypes structures), so a recording of many frames is decoded
+with one np.frombuffer() call and encoded back with tobytes().
+
+NumPy is an optional dependency (`pip install hilscher[numpy]`).
+"""
+import ctypes
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import as_strided
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from .Definitions import PbBufInWic, PbBufOutWic, TRACKS_PER_VIEW_MAX
+
+VIEWS = 4
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("hilscher.frame_codec requires numpy, install it with 'pip install hilscher[numpy]'.")
+
+
+def _field_format(ctype):
+    if issubclass(ctype, ctypes.Array):
+        return (_field_format(ctype._type_), (ctype._length_,))
+    return np.dtype(ctype._type_)
+
+
+def struct_dtype(struct_type, itemsize=None):
+    """
+    Builds a structured dtype with the exact memory layout of a ctypes structure.
+
+    Args:
+        struct_type: ctypes structure, e.g. PbBufInWic.
+        itemsize (int): Size of one record, if frames are stored padded (e.g. SIZE_BUFFER_IN).
+                        Defaults to the structure size.
+
+    Returns:
+        numpy.dtype: The structured dtype.
+    """
+    _require_numpy()
+    size = ctypes.sizeof(struct_type)
+    if itemsize is None:
+        itemsize = size
+    elif itemsize < size:
+        raise ValueError(f"itemsize ({itemsize}) is smaller than {struct_type.__name__} ({size}).")
+
+    names, formats, offsets = [], [], []
+    for name, ctype in struct_type._fields_:
+        names.append(name)
+        formats.append(_field_format(ctype))
+        offsets.append(getattr(struct_type, name).offset)
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": itemsize})
+
+
+if np is not None:
+    PB_BUF_IN_DTYPE = struct_dtype(PbBufInWic)
+    PB_BUF_OUT_DTYPE = struct_dtype(PbBufOutWic)
+
+
+def decode_frames(data, struct_type=PbBufInWic, itemsize=None):
+    """
+    Decodes raw frames into a structured array without copying.
+
+    Args:
+        data: bytes-like object holding the concatenated frames.
+        struct_type: PbBufInWic or PbBufOutWic.
+        itemsize (int): Size of one stored frame, if larger than the structure.
+
+    Returns:
+        numpy.ndarray: Structured array of shape (n,), a view on data.
+    """
+    dtype = struct_dtype(struct_type, itemsize)
+    if memoryview(data).nbytes % dtype.itemsize:
+        raise ValueError(f"Data length is not a multiple of the frame size ({dtype.itemsize}).")
+    return np.frombuffer(data, dtype=dtype)
+
+
+def encode_frames(frames):
+    """
+    Encodes a structured array of frames back to raw bytes.
+    """
+    _require_numpy()
+    return np.ascontiguousarray(frames).tobytes()
+
+
+def from_structs(structs, struct_type=PbBufInWic):
+    """
+    Collects ctypes frames (e.g. read one at a time) into a structured array.
+    """
+    return decode_frames(bytearray(b"".join(bytes(s) for s in structs)), struct_type)
+
+
+def _track_view(frames, first_field, view_stride):
+    """
+    Returns a (n, VIEWS, TRACKS_PER_VIEW_MAX) uint16 view over per-view track arrays.
+    """
+    base = frames[first_field]
+    return as_strided(base, shape=(frames.shape[0], VIEWS, TRACKS_PER_VIEW_MAX),
+                      strides=(frames.strides[0], view_stride, base.strides[-1]),
+                      writeable=frames.flags.writeable)
+
+
+def setpoints(frames):
+    """
+    Returns the setpoints sp1..sp4 of PbBufInWic frames as a (n, 4, 8) uint16 view.
+    """
+    return _track_view(frames, "sp1", PbBufInWic.sp2.offset - PbBufInWic.sp1.offset)
+
+
+def process_values(frames):
+    """
+    Returns the process values of PbBufOutWic frames.
+
+    Returns:
+        tuple: (pv, pvq), each a (n, 4, 8) uint16 view of pv1..pv4 and pvq1..pvq4.
+    """
+    view_stride = PbBufOutWic.pv2.offset - PbBufOutWic.pv1.offset
+    return _track_view(frames, "pv1", view_stride), _track_view(frames, "pvq1", view_stride)
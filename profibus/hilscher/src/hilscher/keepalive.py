@@ -0,0 +1,263 @@
+"""
+Watchdog keep-alive independent of the image processing.
+
+The Profibus master watches value_16 of the output image (the echo of its watchdog
+value). If the only output is written after processing, a slow processing step trips
+the master's watchdog and takes the line down. KeepAlive runs the IO on its own
+high-priority thread: every bus cycle it reads the input image and immediately writes
+back the echoed header (state1/state2, time stamp, intervals and the watchdog) - only
+that region of the output area. The pv/pvq results are written separately by
+publish() whenever processing completes, so slow frames only make the results older.
+"""
+import ctypes
+import os
+import sys
+import threading
+from collections import namedtuple
+
+from .Definitions import CIFX_NO_ERROR, CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT
+from .cycle import CycleScheduler
+from .errors import Backoff
+from .response import ResponseBuilder
+
+# Read results meaning "no new image from the master yet"
+NO_DATA_ERRORS = (CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT)
+
+# Windows THREAD_PRIORITY_TIME_CRITICAL
+_THREAD_PRIORITY_TIME_CRITICAL = 15
+
+InputFrame = namedtuple("InputFrame", "sequence image")
+
+
+def raise_thread_priority(priority=10):
+    """
+    Gives the calling thread real-time priority: SCHED_FIFO on Linux, time critical on Windows.
+
+    Args:
+        priority (int): SCHED_FIFO priority (1..99) on Linux.
+
+    Returns:
+        bool: True if the priority was changed. Without the required privileges the
+            thread keeps its priority.
+    """
+    try:
+        if sys.platform == "win32":
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), _THREAD_PRIORITY_TIME_CRITICAL))
+        if hasattr(os, "sched_setscheduler"):
+            # pid 0 is the calling thread on Linux
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            return True
+    except (OSError, AttributeError):
+        pass
+    return False
+
+
+class KeepAlive:
+    """
+    Echoes the input header to the master every bus cycle on a dedicated thread and
+    publishes the processing results whenever they are ready.
+
+    Without a period the thread runs at the master's pace (each read waits for the next
+    image, i.e. a bus-synchronous channel); with `period_ms` it is paced by a
+    CycleScheduler. The newest input image is handed to processing by next_input();
+    images that arrive while processing is busy are skipped, not queued.
+
+    Usage:
+        with ChannelSession(driver, "cifX0") as session, KeepAlive(session) as keepalive:
+            while True:
+                frame = keepalive.next_input()
+                if frame is not None:
+                    keepalive.publish(process(frame.image), frame.sequence)
+    """
+
+    def __init__(self, session, builder=None, period_ms=None, priority=10, realtime=True):
+        """
+        Args:
+            session (ChannelSession): Opened channel. Only this thread reads from it while running.
+            builder (ResponseBuilder): Layout of the echoed header and the pv/pvq block.
+            period_ms (float): Cycle period in milliseconds, None to run at the master's pace.
+            priority (int): SCHED_FIFO priority of the thread on Linux.
+            realtime (bool): Raise the priority of the thread, see raise_thread_priority().
+        """
+        self.session = session
+        self.builder = builder if builder is not None else ResponseBuilder()
+        self.priority = priority
+        self.realtime = realtime
+        self.scheduler = CycleScheduler(period_ms, self._read, None, self._echo) if period_ms else None
+
+        self.cycles = 0
+        self.timeouts = 0
+        self.read_errors = 0
+        self.header_errors = 0
+        self.results = 0
+        self.result_errors = 0
+        self.sequence = 0
+        self.result_sequence = 0
+        self.realtime_priority = False
+        self.error = None
+
+        self._header = (ctypes.c_ubyte * self.builder.echo_size)()
+        self._zeros = (ctypes.c_ubyte * self.builder.values_size)()
+        self._write_header = None
+        self._latest = None
+        self._taken = 0
+        self._cond = threading.Condition()
+        self._publish_lock = threading.Lock()
+        self._backoff = Backoff(initial=session.ulWaitTimeout / 1000, maximum=1.0)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def result_age(self):
+        """
+        Number of input images received since the one the published results belong to.
+        """
+        return self.sequence - self.result_sequence
+
+    def start(self):
+        """
+        Starts the keep-alive thread on the opened session.
+        """
+        session = self.session
+        # The header write is the same call every cycle, so it is bound once
+        self._write_header = session.driver.bind_io("xChannelIOWrite", session.hDevice, 0, self.builder.echo_offset,
+                                                    self.builder.echo_size, self._header, session.ulWaitTimeout)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"cifx-keepalive-{session.szBoard}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def _run(self):
+        if self.realtime:
+            self.realtime_priority = raise_thread_priority(self.priority)
+        try:
+            if self.scheduler is not None:
+                self.scheduler.run()
+                return
+            while not self._stop.is_set():
+                slave = self._read()
+                if slave is not None:
+                    self._echo(slave)
+                elif self.session.lLastError not in NO_DATA_ERRORS:
+                    self._backoff.wait(self._stop)
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+
+    def _read(self):
+        slave = self.session.read_input()
+        if slave is None:
+            if self.session.lLastError in NO_DATA_ERRORS:
+                self.timeouts += 1
+            else:
+                self.read_errors += 1
+            return None
+        self._backoff.reset()
+        return slave
+
+    def _echo(self, slave):
+        offset = self.builder.echo_offset
+        ctypes.memmove(self._header, ctypes.addressof(slave) + offset, self.builder.echo_size)
+        lRet = self._write_header()
+        if lRet != CIFX_NO_ERROR:
+            self.header_errors += 1
+            if self.session.metrics is not None:
+                self.session.metrics.count_error("xChannelIOWrite", lRet)
+        elif self.session.mailbox is not None:
+            # The header write is this thread's cyclic exchange, so it opens the mailbox window
+            self.session.mailbox.cycle_done()
+        self.cycles += 1
+
+        image = type(slave).from_buffer_copy(slave)
+        with self._cond:
+            self.sequence += 1
+            self._latest = InputFrame(self.sequence, image)
+            self._cond.notify_all()
+
+    def next_input(self, timeout=None):
+        """
+        Waits for an input image newer than the last one returned.
+
+        Returns:
+            InputFrame: (sequence, copy of the input image), or None on timeout or stop.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._stop.is_set() or (self._latest is not None and self._latest.sequence > self._taken), timeout):
+                return None
+            if self._stop.is_set():
+                return None
+            self._taken = self._latest.sequence
+            return self._latest
+
+    def publish(self, values, sequence=None):
+        """
+        Writes the pv/pvq block of the output area, leaving the header to the keep-alive thread.
+
+        Args:
+            values: Processing result of the size of the pv/pvq block (see ResponseBuilder.build),
+                or None to clear it.
+            sequence (int): Sequence of the input image the values were computed from.
+
+        Returns:
+            int: cifX error code, CIFX_NO_ERROR on success.
+        """
+        builder = self.builder
+        if values is None:
+            data = self._zeros
+        else:
+            data = memoryview(values).cast("B")
+            if data.nbytes != builder.values_size:
+                raise ValueError(f"Values have {data.nbytes} bytes, the pv/pvq block has {builder.values_size}.")
+            data = (ctypes.c_ubyte * builder.values_size).from_buffer_copy(data)
+        with self._publish_lock:
+            lRet = self.session.write_area(builder.values_offset, builder.values_size, data)
+        if lRet == CIFX_NO_ERROR:
+            self.results += 1
+            self.result_sequence = self.sequence if sequence is None else sequence
+        else:
+            self.result_errors += 1
+        return lRet
+
+    def statistics(self):
+        """
+        Returns:
+            dict: Keep-alive and result counters, and the age of the published results.
+        """
+        stats = {
+            "running": self.running,
+            "realtime_priority": self.realtime_priority,
+            "cycles": self.cycles,
+            "timeouts": self.timeouts,
+            "read_errors": self.read_errors,
+            "header_errors": self.header_errors,
+            "results": self.results,
+            "result_errors": self.result_errors,
+            "result_age": self.result_age,
+            "error": None if self.error is None else repr(self.error),
+        }
+        if self.scheduler is not None:
+            stats.update(self.scheduler.stats.summary())
+        return stats
@@ -0,0 +1,306 @@
+"""
+Acyclic packet service on the channel mailbox.
+
+Diagnostics and firmware queries are sent with xChannelPutPacket and answered through
+xChannelGetPacket while the cyclic IO keeps running. PacketService owns the mailbox on
+its own thread and correlates confirmations to requests by the packet id (ulId).
+
+Mailbox traffic must never delay the cyclic exchange:
+  - every mailbox call is made with timeout 0, so the service never waits in the driver;
+    a full mailbox is retried later instead,
+  - the service thread keeps normal priority (see keepalive.KeepAlive for the cyclic side),
+  - in gated mode the service only runs in the gap right after a cyclic write
+    (ChannelSession.mailbox hook), with at most one request and `budget` confirmations
+    per cycle.
+"""
+import ctypes
+import itertools
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from .Definitions import (
+    CifXPacket,
+    CIFX_NO_ERROR, CIFX_DEV_MAILBOX_FULL, CIFX_DEV_PUT_TIMEOUT, CIFX_DEV_GET_TIMEOUT, CIFX_DEV_GET_NO_PACKET,
+    CIFX_MAX_DATA_SIZE, RCX_PACKET_DEST_DEFAULT_CHANNEL, RCX_FIRMWARE_IDENTIFY_REQ, RCX_GET_COMMON_STATE_REQ,
+)
+from .driver import CifXError
+
+# Put results meaning "mailbox busy, try again later"
+MAILBOX_BUSY_ERRORS = (CIFX_DEV_MAILBOX_FULL, CIFX_DEV_PUT_TIMEOUT)
+# Get results meaning "no packet waiting"
+NO_PACKET_ERRORS = (CIFX_DEV_GET_NO_PACKET, CIFX_DEV_GET_TIMEOUT)
+
+
+def parse_firmware_identify(packet):
+    """
+    Args:
+        packet (CifXPacket): Confirmation of RCX_FIRMWARE_IDENTIFY_REQ.
+
+    Returns:
+        dict: Firmware version, name and build date.
+    """
+    major, minor, build, revision, name_length, name, year, month, day = struct.unpack_from("<4HB63sHBB", bytes(packet.abData))
+    return {
+        "version": f"{major}.{minor}.{build}.{revision}",
+        "name": name[:name_length].decode("ascii", "replace"),
+        "date": f"{year:04}-{month:02}-{day:02}",
+    }
+
+
+class PacketService:
+    """
+    Sends request packets and delivers their confirmations on a background thread.
+
+    Confirmations are matched to requests by ulId; unsolicited packets (indications)
+    are kept in `indications`. A request without confirmation within its timeout fails
+    with a CifXError (CIFX_DEV_GET_TIMEOUT).
+
+    Usage:
+        with ChannelSession(driver, "cifX0") as session, PacketService(session) as mailbox:
+            print(mailbox.firmware_identify())
+            confirmation = mailbox.transact(RCX_GET_COMMON_STATE_REQ)
+    """
+
+    def __init__(self, session, timeout=1.0, poll_interval=0.002, idle_interval=0.1, gated=False, budget=4, indications=64):
+        """
+        Args:
+            session (ChannelSession): Opened channel.
+            timeout (float): Default seconds to wait for a confirmation.
+            poll_interval (float): Seconds between mailbox polls while requests are outstanding.
+            idle_interval (float): Seconds between polls for indications when idle.
+            gated (bool): Only use the mailbox right after a cyclic write, see cycle_done().
+            budget (int): Packets received per pass.
+            indications (int): Number of unsolicited packets kept.
+        """
+        self.session = session
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.idle_interval = idle_interval
+        self.gated = gated
+        self.budget = budget
+        self.indications = deque(maxlen=indications)
+        self.sent = 0
+        self.received = 0
+        self.timeouts = 0
+        self.unsolicited = 0
+        self.lLastError = CIFX_NO_ERROR
+
+        self._queue = deque()
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._window = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._recv_packet = CifXPacket()
+        self._recv_count = ctypes.c_uint32(0)
+        self._send_count = ctypes.c_uint32(0)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"cifx-mailbox-{self.session.szBoard}", daemon=True)
+        self._thread.start()
+        if self.gated:
+            self.session.mailbox = self
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stops the service thread. Outstanding requests fail with a CifXError.
+        """
+        self._stop.set()
+        self._wake.set()
+        self._window.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.session.mailbox is self:
+            self.session.mailbox = None
+        with self._lock:
+            outstanding = [future for _, future, _ in self._queue] + [future for future, _ in self._pending.values()]
+            self._queue.clear()
+            self._pending.clear()
+        for future in outstanding:
+            future.set_exception(CifXError("xChannelGetPacket", CIFX_DEV_GET_TIMEOUT, "Packet service stopped"))
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def cycle_done(self):
+        """
+        Opens the mailbox window after a cyclic exchange (gated mode).
+        """
+        self._window.set()
+
+    def request(self, ulCmd, data=b"", ulDest=RCX_PACKET_DEST_DEFAULT_CHANNEL, timeout=None):
+        """
+        Queues a request packet.
+
+        Args:
+            ulCmd (int): Command code of the request.
+            data (bytes): Packet data.
+            ulDest (int): Destination of the packet.
+            timeout (float): Seconds to wait for the confirmation, defaults to `timeout`.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the confirmation (CifXPacket), or fails
+                with a CifXError.
+        """
+        if not self.running:
+            raise RuntimeError(f"Packet service of {self.session.szBoard} is not running.")
+        if len(data) > CIFX_MAX_DATA_SIZE:
+            raise ValueError(f"Packet data ({len(data)} bytes) exceeds the maximum of {CIFX_MAX_DATA_SIZE}.")
+        packet = CifXPacket()
+        header = packet.tHeader
+        header.ulDest = ulDest
+        header.ulId = next(self._ids) & 0xFFFFFFFF
+        header.ulCmd = ulCmd
+        header.ulLen = len(data)
+        packet.abData[:len(data)] = data
+        future = Future()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._queue.append((packet, future, deadline))
+        self._wake.set()
+        return future
+
+    def transact(self, ulCmd, data=b"", ulDest=RCX_PACKET_DEST_DEFAULT_CHANNEL, timeout=None):
+        """
+        Sends a request and waits for its confirmation.
+
+        Returns:
+            CifXPacket: The confirmation; its tHeader.ulState holds the result of the command.
+
+        Raises:
+            CifXError: If the request could not be sent or was not confirmed in time.
+        """
+        return self.request(ulCmd, data, ulDest, timeout).result()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                busy = bool(self._queue or self._pending)
+            interval = self.poll_interval if busy else self.idle_interval
+            if self.gated:
+                # Requests wait for the next cycle; without one only the deadlines are checked
+                opened = self._window.wait(interval)
+                self._window.clear()
+            else:
+                self._wake.wait(interval)
+                self._wake.clear()
+                opened = True
+            if self._stop.is_set():
+                break
+            if opened:
+                self._service()
+            else:
+                self._expire()
+
+    def _service(self):
+        dll, hDevice = self.session.dll, self.session.hDevice
+        # At most one request per pass; the mailbox calls never wait
+        with self._lock:
+            item = self._queue.popleft() if self._queue else None
+        if item is not None:
+            packet, future, deadline = item
+            lRet = dll.xChannelPutPacket(hDevice, ctypes.byref(packet), 0)
+            if lRet == CIFX_NO_ERROR:
+                self.sent += 1
+                with self._lock:
+                    self._pending[packet.tHeader.ulId] = (future, deadline)
+            elif lRet in MAILBOX_BUSY_ERRORS and time.monotonic() < deadline:
+                with self._lock:
+                    self._queue.appendleft(item)
+            else:
+                self._fail("xChannelPutPacket", lRet, future)
+
+        for _ in range(self.budget):
+            lRet = dll.xChannelGetMBXState(hDevice, ctypes.byref(self._recv_count), ctypes.byref(self._send_count))
+            if lRet != CIFX_NO_ERROR or not self._recv_count.value:
+                break
+            lRet = dll.xChannelGetPacket(hDevice, ctypes.sizeof(self._recv_packet), ctypes.byref(self._recv_packet), 0)
+            if lRet != CIFX_NO_ERROR:
+                if lRet not in NO_PACKET_ERRORS:
+                    self.lLastError = lRet
+                break
+            self._dispatch(CifXPacket.from_buffer_copy(self._recv_packet))
+
+        self._expire()
+
+    def _dispatch(self, packet):
+        self.received += 1
+        with self._lock:
+            pending = self._pending.pop(packet.tHeader.ulId, None)
+        if pending is None:
+            self.unsolicited += 1
+            self.indications.append(packet)
+        else:
+            pending[0].set_result(packet)
+
+    def _fail(self, function, lRet, future):
+        self.lLastError = lRet
+        if self.session.metrics is not None:
+            self.session.metrics.count_error(function, lRet)
+        future.set_exception(CifXError(function, lRet, self.session.driver.error_description(lRet)))
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [ulId for ulId, (_, deadline) in self._pending.items() if deadline <= now]
+            futures = [self._pending.pop(ulId)[0] for ulId in expired]
+            while self._queue and self._queue[0][2] <= now:
+                futures.append(self._queue.popleft()[1])
+        for future in futures:
+            self.timeouts += 1
+            self._fail("xChannelGetPacket", CIFX_DEV_GET_TIMEOUT, future)
+
+    def _confirm(self, ulCmd, data=b"", timeout=None):
+        packet = self.transact(ulCmd, data, timeout=timeout)
+        if packet.tHeader.ulState:
+            lError = ctypes.c_int32(packet.tHeader.ulState).value
+            raise CifXError(f"Packet 0x{ulCmd:04X}", lError, self.session.driver.error_description(lError))
+        return packet
+
+    def firmware_identify(self, ulChannelId=None, timeout=None):
+        """
+        Returns:
+            dict: Firmware version, name and build date of the channel (RCX_FIRMWARE_IDENTIFY_REQ).
+        """
+        ulChannelId = self.session.ulChannel if ulChannelId is None else ulChannelId
+        return parse_firmware_identify(self._confirm(RCX_FIRMWARE_IDENTIFY_REQ, struct.pack("<I", ulChannelId), timeout))
+
+    def common_state(self, timeout=None):
+        """
+        Returns:
+            dict: Communication COS flags, state and error of the channel (RCX_GET_COMMON_STATE_REQ).
+        """
+        packet = self._confirm(RCX_GET_COMMON_STATE_REQ, timeout=timeout)
+        cos, state, error = struct.unpack_from("<III", bytes(packet.abData))
+        return {"cos": cos, "state": state, "error": error}
+
+    def statistics(self):
+        """
+        Returns:
+            dict: Packet counters and the number of outstanding requests.
+        """
+        with self._lock:
+            outstanding = len(self._queue) + len(self._pending)
+        return {
+            "running": self.running,
+            "sent": self.sent,
+            "received": self.received,
+            "timeouts": self.timeouts,
+            "unsolicited": self.unsolicited,
+            "outstanding": outstanding,
+        }
@@ -0,0 +1,253 @@
+import threading
+
+from .Definitions import CIFX_NO_ERROR, CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT
+from .cycle import CycleScheduler
+from .driver import CifXError
+from .errors import Backoff, ErrorReporter
+from .response import ResponseBuilder
+from .session import ChannelSession
+
+
+class ChannelWorker:
+    """
+    Runs the cyclic exchange of one channel on its own thread.
+
+    Each cycle reads the input image, calls process(key, slave) for the pv/pvq block
+    (see response.PvBlock; None sends zeros) and writes the response. With a period
+    the cycles are paced by a CycleScheduler, otherwise they are paced by the master
+    (each read waits for the next image up to the IO timeout).
+
+    While the master is silent the master-paced loop backs off exponentially instead of
+    polling every IO timeout; other read errors reopen the channel with backoff. Errors
+    are reported once per code and interval, see errors.ErrorReporter.
+    """
+
+    def __init__(self, driver, szBoard, ulChannel=0, process=None, period_ms=None, ulWaitTimeout=10):
+        """
+        Args:
+            driver (CifXDriver): Opened driver.
+            szBoard (str): Board name, e.g. "cifX0".
+            ulChannel (int): Channel number on the board.
+            process: Callable process(key, slave) returning the processing result, or None.
+            period_ms (float): Cycle period in milliseconds, None to run at the master's pace.
+            ulWaitTimeout (int): IO timeout in milliseconds.
+        """
+        self.key = (szBoard, ulChannel)
+        self.session = ChannelSession(driver, szBoard, ulChannel, ulWaitTimeout=ulWaitTimeout)
+        self.process = process
+        self.builder = ResponseBuilder()
+        self.scheduler = CycleScheduler(period_ms, self._read, self._process, self._write) if period_ms else None
+        self.exchanges = 0
+        self.timeouts = 0
+        self.read_errors = 0
+        self.write_errors = 0
+        self.lLastError = CIFX_NO_ERROR
+        self.error = None
+        self.latest = None
+        self.reopens = 0
+        self.backoff = Backoff(initial=ulWaitTimeout / 1000, maximum=1.0)
+        self.reporter = ErrorReporter(self.session.driver.error_descriptions.describe)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Opens the channel and starts the worker thread.
+
+        Raises:
+            CifXError: If the channel could not be set up.
+        """
+        self.session.open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"cifx-{self.key[0]}-{self.key[1]}", daemon=True)
+        self._thread.start()
+        return self
+
+    def request_stop(self):
+        """
+        Asks the worker thread to return after the current cycle, without waiting.
+        """
+        self._stop.set()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+
+    def stop(self, timeout=None):
+        """
+        Stops the worker thread and closes the channel.
+        """
+        self.request_stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.session.close()
+
+    def _run(self):
+        try:
+            if self.scheduler is not None:
+                self.scheduler.run()
+                return
+            while not self._stop.is_set():
+                slave = self._read()
+                if slave is not None:
+                    self._write(self._process(slave))
+                elif self.lLastError in (CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT):
+                    # No master: poll less often the longer it stays away
+                    self.backoff.wait(self._stop)
+        except Exception as e:
+            # Only this channel stops; the other workers keep running
+            self.error = e
+
+    def _read(self):
+        slave = self.session.read_input()
+        if slave is None:
+            self.lLastError = self.session.lLastError
+            if self.lLastError in (CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT):
+                self.timeouts += 1
+            else:
+                self.read_errors += 1
+                self.reporter.report(self.lLastError, f"{self.key[0]} channel {self.key[1]}: xChannelIORead")
+                if self.session.reopen(self.backoff, self._stop, self.reporter):
+                    self.reopens += 1
+        else:
+            self.backoff.reset()
+        return slave
+
+    def _process(self, slave):
+        self.latest = type(slave).from_buffer_copy(slave)
+        values = None if self.process is None else self.process(self.key, slave)
+        return slave, values
+
+    def _write(self, result):
+        slave, values = result
+        self.builder.build(self.session.output_image.back_buffer, slave, values)
+        lRet = self.session.write_output(self.session.output_image.back)
+        if lRet == CIFX_NO_ERROR:
+            self.exchanges += 1
+        else:
+            self.lLastError = lRet
+            self.write_errors += 1
+            self.reporter.report(lRet, f"{self.key[0]} channel {self.key[1]}: xChannelIOWrite")
+
+    def statistics(self):
+        """
+        Returns:
+            dict: Exchange and error counters (plus the cycle statistics when paced by a period).
+        """
+        stats = {
+            "running": self.running,
+            "exchanges": self.exchanges,
+            "timeouts": self.timeouts,
+            "read_errors": self.read_errors,
+            "write_errors": self.write_errors,
+            "reopens": self.reopens,
+            "last_error": self.lLastError,
+            "error": None if self.error is None else repr(self.error),
+        }
+        if self.scheduler is not None:
+            stats.update(self.scheduler.stats.summary())
+        return stats
+
+
+class ChannelManager:
+    """
+    Serves several Profibus masters from one process.
+
+    Opens every enumerated board/channel (or the configured ones) and runs each channel
+    on its own ChannelWorker thread, so a slow or failing channel does not stall the
+    others. Channels are identified by (board name, channel number).
+
+    Usage:
+        with CifXDriver() as driver, ChannelManager(driver, process=process) as manager:
+            ...
+            print(manager.statistics())
+    """
+
+    def __init__(self, driver, channels=None, process=None, period_ms=None, ulWaitTimeout=10):
+        """
+        Args:
+            driver (CifXDriver): Opened driver.
+            channels: (szBoard, ulChannel) pairs to serve. Defaults to all channels of all boards.
+            process: Callable process(key, slave) returning the processing result, or None.
+            period_ms (float): Cycle period in milliseconds, None to run at the masters' pace.
+            ulWaitTimeout (int): IO timeout in milliseconds.
+        """
+        self.driver = driver
+        self.channels = channels
+        self.process = process
+        self.period_ms = period_ms
+        self.ulWaitTimeout = ulWaitTimeout
+        self.workers = {}
+        self.failed = {}
+
+    def discover(self):
+        """
+        Returns:
+            list: (board name, channel number) of every channel known to the driver.
+        """
+        channels = []
+        for ulBoard, board_info in enumerate(self.driver.enum_boards()):
+            szBoard = board_info.abBoardName.decode('ascii')
+            channels.extend((szBoard, ulChannel) for ulChannel, _ in enumerate(self.driver.enum_channels(ulBoard)))
+        return channels
+
+    def start(self):
+        """
+        Opens all channels and starts their workers.
+
+        Channels that cannot be opened are reported and left out, see `failed`.
+        """
+        for szBoard, ulChannel in (self.channels if self.channels is not None else self.discover()):
+            worker = ChannelWorker(self.driver, szBoard, ulChannel, self.process, self.period_ms, self.ulWaitTimeout)
+            try:
+                self.workers[worker.key] = worker.start()
+            except CifXError as e:
+                print(f"{szBoard} channel {ulChannel}: {e}")
+                self.failed[worker.key] = e
+        return self
+
+    def stop(self):
+        """
+        Stops all workers and closes their channels.
+        """
+        for worker in self.workers.values():
+            worker.request_stop()
+        for worker in self.workers.values():
+            worker.stop()
+            worker.reporter.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def images(self):
+        """
+        Returns:
+            dict: (board, channel) -> copy of the last input image of the channel, or None.
+        """
+        return {key: worker.latest for key, worker in self.workers.items()}
+
+    def statistics(self):
+        """
+        Returns:
+            dict: (board, channel) -> statistics of the channel's worker.
+        """
+        return {key: worker.statistics() for key, worker in self.workers.items()}
+
+    def totals(self):
+        """
+        Returns:
+            dict: Counters summed over all channels, plus the number of running and failed channels.
+        """
+        totals = {"channels": len(self.workers), "running": 0, "failed": len(self.failed),
+                  "exchanges": 0, "timeouts": 0, "read_errors": 0, "write_errors": 0}
+        for worker in self.workers.values():
+            totals["running"] += worker.running
+            for name in ("exchanges", "timeouts", "read_errors", "write_errors"):
+                totals[name] += getattr(worker, name)
+        return totals
@@ -0,0 +1,383 @@
+"""
+Per-cycle metrics of the cyclic IO.
+
+A MetricsRegistry holds counters, gauges and histograms (optionally with labels) and
+renders them in the Prometheus text exposition format. MetricsServer serves them on a
+local HTTP endpoint, SnapshotWriter writes them to a JSON file at a fixed interval.
+
+CycleMetrics is the standard set for one channel: read/process/write and cycle time
+histograms, cycle jitter, cycles per second, overruns, skipped cycles and a counter
+per cifX error code. Recording a sample is a few additions, so it runs every cycle.
+
+Usage:
+    registry = MetricsRegistry()
+    metrics = CycleMetrics(registry, channel="cifX0/0")
+    session.metrics = metrics                                    # error counters
+    scheduler = CycleScheduler(10, read, process, write, metrics=metrics)
+    MetricsServer(registry, port=9108).start()                  # http://127.0.0.1:9108/metrics
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Histogram buckets in seconds for stage and cycle times, 20 us .. 1 s
+LATENCY_BUCKETS = (
+    0.00002, 0.00005, 0.0001, 0.0002, 0.0005,
+    0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0,
+)
+
+STAGES = ("read", "process", "write")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class CounterValue:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class GaugeValue:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class HistogramValue:
+    """
+    Bucket counts, sum and count of the observed values.
+
+    Counts are stored per bucket and made cumulative when rendered, so observe() is
+    one bisect and three additions.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            yield name + "_bucket", {**labels, "le": _format_value(float(bound))}, cumulative
+        yield name + "_sum", labels, self.sum
+        yield name + "_count", labels, self.count
+
+
+class Metric:
+    """
+    A metric family: one value per combination of label values.
+    The value of a metric without labels is labels().
+    """
+
+    def __init__(self, kind, name, help, labelnames=(), factory=CounterValue):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = factory()
+
+    def labels(self, *values):
+        """
+        Returns the value of one label combination, creating it on first use.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}.")
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield from child.samples(self.name, dict(zip(self.labelnames, values)))
+
+
+class MetricsRegistry:
+    """
+    Named metric families. Registering an existing name returns the existing family,
+    so several channels can share the families and differ by label.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, kind, name, help, labelnames, factory):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric(kind, name, help, labelnames, factory)
+            elif metric.kind != kind or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as {metric.kind} with labels {metric.labelnames}.")
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register("counter", name, help, labelnames, CounterValue)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register("gauge", name, help, labelnames, GaugeValue)
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        buckets = tuple(sorted(buckets))
+        return self._register("histogram", name, help, labelnames, lambda: HistogramValue(buckets))
+
+    def samples(self):
+        """
+        Yields:
+            (name, labels, value) of every sample, in exposition order.
+        """
+        for metric in list(self.metrics.values()):
+            yield from metric.samples()
+
+    def render(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Timestamp and all samples, for the snapshot file.
+        """
+        return {
+            "timestamp": time.time(),
+            "samples": [{"name": name, "labels": labels, "value": value} for name, labels, value in self.samples()],
+        }
+
+    def write_snapshot(self, path):
+        """
+        Writes snapshot() to a JSON file atomically.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(tmp_path, path)
+
+
+class CycleMetrics:
+    """
+    Standard cycle metrics of one channel, labeled with the channel name.
+    """
+
+    def __init__(self, registry, channel="cifX0/0", buckets=LATENCY_BUCKETS, prefix="cifx"):
+        """
+        Args:
+            registry (MetricsRegistry): Registry to add the metric families to.
+            channel (str): Value of the "channel" label, e.g. "cifX0/0".
+            buckets: Histogram buckets in seconds.
+            prefix (str): Prefix of the metric names.
+        """
+        self.channel = channel
+        stage_duration = registry.histogram(f"{prefix}_stage_duration_seconds", "Duration of the read, process and write stages.",
+                                            ("channel", "stage"), buckets)
+        self.stages = {stage: stage_duration.labels(channel, stage) for stage in STAGES}
+        self.cycle_duration = registry.histogram(f"{prefix}_cycle_duration_seconds", "Duration of a read -> process -> write cycle.",
+                                                 ("channel",), buckets).labels(channel)
+        self.jitter = registry.histogram(f"{prefix}_cycle_jitter_seconds", "Delay between a cycle's deadline and its start.",
+                                         ("channel",), buckets).labels(channel)
+        self.cycles = registry.counter(f"{prefix}_cycles_total", "Completed cycles.", ("channel",)).labels(channel)
+        self.overruns = registry.counter(f"{prefix}_overruns_total", "Cycles that ended after the next deadline.", ("channel",)).labels(channel)
+        self.skipped = registry.counter(f"{prefix}_skipped_cycles_total", "Deadlines skipped after overruns.", ("channel",)).labels(channel)
+        self.cycles_per_second = registry.gauge(f"{prefix}_cycles_per_second", "Cycle rate over the last second.", ("channel",)).labels(channel)
+        self._errors = registry.counter(f"{prefix}_errors_total", "Failed cifX calls per function and error code.", ("channel", "function", "code"))
+        self._rate_start_ns = None
+        self._rate_cycles = 0
+
+    def observe_stage(self, stage, duration_ns):
+        self.stages[stage].observe(duration_ns / 1e9)
+
+    def cycle_done(self, now_ns, duration_ns=None, jitter_ns=None):
+        """
+        Counts a completed cycle and updates the cycle rate once per second.
+
+        Args:
+            now_ns (int): Monotonic time in nanoseconds at the end of the cycle.
+            duration_ns (int): Duration of the cycle, if measured.
+            jitter_ns (int): Delay of the cycle start, if scheduled.
+        """
+        self.cycles.value += 1
+        if duration_ns is not None:
+            self.cycle_duration.observe(duration_ns / 1e9)
+        if jitter_ns is not None:
+            self.jitter.observe(jitter_ns / 1e9)
+        if self._rate_start_ns is None:
+            self._rate_start_ns, self._rate_cycles = now_ns, self.cycles.value
+        elif now_ns - self._rate_start_ns >= 1_000_000_000:
+            self.cycles_per_second.set((self.cycles.value - self._rate_cycles) * 1e9 / (now_ns - self._rate_start_ns))
+            self._rate_start_ns, self._rate_cycles = now_ns, self.cycles.value
+
+    def overrun(self, skipped=0):
+        self.overruns.inc()
+        self.skipped.inc(skipped)
+
+    def count_error(self, function, lError):
+        """
+        Counts a failed cifX call, labeled with the error code as 0x%08X.
+        """
+        self._errors.labels(self.channel, function, f"0x{lError & 0xFFFFFFFF:08X}").inc()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood stderr
+        pass
+
+
+class MetricsServer:
+    """
+    Serves a registry at http://host:port/metrics on a background thread.
+    """
+
+    def __init__(self, registry, port=9108, host="127.0.0.1"):
+        """
+        Args:
+            registry (MetricsRegistry): Metrics to serve.
+            port (int): TCP port, 0 for any free port (see `port` after start()).
+            host (str): Address to bind, local only by default.
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": self.registry})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+class SnapshotWriter:
+    """
+    Writes a registry snapshot to a JSON file every `interval` seconds.
+    """
+
+    def __init__(self, registry, path, interval=10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            self.registry.write_snapshot(self.path)
+        except OSError as e:
+            print(f"Failed to write metrics snapshot: {e}")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the writer and writes a last snapshot.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
@@ -0,0 +1,171 @@
+"""
+Event-driven input handling with cifX notifications.
+
+Instead of polling xChannelIORead with a timeout, InputNotifier registers callbacks
+with xChannelRegisterNotification: CIFX_NOTIFY_PD0_IN wakes the waiting thread as
+soon as the master delivered a new input image, CIFX_NOTIFY_COM_STATE reports when
+communication starts or stops. Drivers (or the simulator) without notification
+support fall back to polling.
+"""
+import ctypes
+import threading
+import time
+
+from .Definitions import (
+    ChannelInformation, NotifyComState,
+    CIFX_NO_ERROR, CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT, CIFX_NOTIFY_PD0_IN, CIFX_NOTIFY_COM_STATE,
+    RCX_COMM_COS_RUN, RCX_COMM_COS_BUS_ON,
+)
+from .driver import PFN_NOTIFY_CALLBACK
+from .errors import format_error
+
+NOTIFY = "notify"
+POLL = "poll"
+
+# Read results meaning "no new image from the master yet"
+NO_DATA_ERRORS = (CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT)
+
+
+class InputNotifier:
+    """
+    Waits for new input images of an opened channel.
+
+    In notification mode next_input() sleeps until the driver signals a new image and
+    then reads it without waiting. In polling mode (forced, or when the driver refuses
+    the registration) it reads with the session's IO timeout until an image arrives.
+
+    Usage:
+        with ChannelSession(driver, "cifX0") as session, InputNotifier(session) as notifier:
+            while True:
+                slave = notifier.next_input(timeout=1.0)
+                if slave is not None:
+                    ...
+    """
+
+    def __init__(self, session, poll=False):
+        """
+        Args:
+            session (ChannelSession): Opened channel.
+            poll (bool): Use polling mode without trying notifications.
+        """
+        self.session = session
+        self.poll = poll
+        self.mode = None
+        self.notifications = 0
+        # Last CIFX_NOTIFY_COM_STATE: True while communicating with the master, None before the first one
+        self.com_state = None
+        self.lLastError = CIFX_NO_ERROR
+        self._event = threading.Event()
+        self._stop = threading.Event()
+        # ctypes callbacks must stay referenced while registered
+        self._callbacks = {}
+
+    def start(self):
+        """
+        Registers the notifications, or selects polling mode if that is not possible.
+        """
+        self._stop.clear()
+        self._event.clear()
+        if self.poll:
+            self.mode = POLL
+            return self
+        for ulNotification, handler in ((CIFX_NOTIFY_PD0_IN, self._on_input), (CIFX_NOTIFY_COM_STATE, self._on_com_state)):
+            callback = PFN_NOTIFY_CALLBACK(handler)
+            try:
+                lRet = self.session.dll.xChannelRegisterNotification(self.session.hDevice, ulNotification, callback, None)
+            except AttributeError:
+                lRet = None
+            if lRet != CIFX_NO_ERROR:
+                reason = "not supported" if lRet is None else format_error(lRet)
+                print(f"xChannelRegisterNotification failed ({reason}), polling for input instead.")
+                self._unregister()
+                self.mode = POLL
+                return self
+            self._callbacks[ulNotification] = callback
+        self.mode = NOTIFY
+        return self
+
+    def _unregister(self):
+        for ulNotification in list(self._callbacks):
+            if self.session.is_open:
+                self.session.dll.xChannelUnregisterNotification(self.session.hDevice, ulNotification)
+            del self._callbacks[ulNotification]
+
+    def stop(self):
+        """
+        Unregisters the notifications and wakes a waiting next_input().
+        """
+        self._stop.set()
+        self._event.set()
+        self._unregister()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    # Called on the driver's notification thread: only signal the waiting thread
+    def _on_input(self, ulNotification, ulDataLen, pvData, pvUser):
+        self.notifications += 1
+        self._event.set()
+
+    def _on_com_state(self, ulNotification, ulDataLen, pvData, pvUser):
+        if pvData and ulDataLen >= ctypes.sizeof(NotifyComState):
+            self.com_state = bool(NotifyComState.from_address(pvData).ulComState)
+        self._event.set()
+
+    def cos_flags(self):
+        """
+        Returns:
+            tuple: (ulHostCOSFlags, ulDeviceCOSFlags) of the channel, or None if xChannelInfo failed.
+        """
+        info = ChannelInformation()
+        lRet = self.session.dll.xChannelInfo(self.session.hDevice, ctypes.sizeof(info), ctypes.byref(info))
+        if lRet != CIFX_NO_ERROR:
+            return None
+        return info.ulHostCOSFlags, info.ulDeviceCOSFlags
+
+    def bus_running(self):
+        """
+        Returns:
+            bool: True if the device reports running with the bus on (device COS flags).
+        """
+        flags = self.cos_flags()
+        required = RCX_COMM_COS_RUN | RCX_COMM_COS_BUS_ON
+        return flags is not None and flags[1] & required == required
+
+    def next_input(self, timeout=None):
+        """
+        Waits for the next input image.
+
+        Args:
+            timeout (float): Seconds to wait, None to wait until stop().
+
+        Returns:
+            The input image (the session's view, see ChannelSession.read_input()), or
+            None on timeout, stop or read error (see lLastError).
+        """
+        self.lLastError = CIFX_NO_ERROR
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop.is_set():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            if self.mode == NOTIFY:
+                if not self._event.wait(remaining):
+                    break
+                self._event.clear()
+                if self._stop.is_set():
+                    break
+                # The image is already there, so the read does not wait
+                slave = self.session.read_input(0)
+            else:
+                slave = self.session.read_input()
+            self.lLastError = self.session.lLastError
+            if slave is not None or self.lLastError not in NO_DATA_ERRORS:
+                return slave
+        if self.lLastError == CIFX_NO_ERROR:
+            self.lLastError = CIFX_DEV_EXCHANGE_TIMEOUT
+        return None
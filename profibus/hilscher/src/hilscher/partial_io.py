@@ -0,0 +1,206 @@
+"""
+Partial-area IO: transfers only the regions of the process images that changed.
+
+Named fields of the image structures (e.g. "value_16", "pv2") are mapped to their
+byte offsets in the IO area. Reading a few fields or writing the dirty ones issues
+offset/length-limited xChannelIORead / xChannelIOWrite calls instead of moving the
+whole 244 byte image; adjacent (or nearly adjacent, see `max_gap`) regions are
+coalesced into one transfer, since each transfer costs a DPM handshake.
+"""
+import ctypes
+
+from .Definitions import PbBufInWic, PbBufOutWic, CIFX_NO_ERROR
+
+
+def field_region(struct_type, name):
+    """
+    Returns:
+        tuple: (offset, size) in bytes of a field of a ctypes structure.
+
+    Raises:
+        ValueError: If the structure has no such field.
+    """
+    if not any(field_name == name for field_name, *_ in struct_type._fields_):
+        raise ValueError(f"{struct_type.__name__} has no field '{name}'.")
+    field = getattr(struct_type, name)
+    return field.offset, field.size
+
+
+def coalesce(regions, max_gap=0):
+    """
+    Merges overlapping regions and regions at most `max_gap` bytes apart.
+
+    Args:
+        regions: (offset, size) pairs in any order.
+        max_gap (int): Largest gap in bytes transferred along instead of starting a new transfer.
+
+    Returns:
+        tuple: Sorted, non-overlapping (offset, size) pairs.
+    """
+    merged = []
+    for offset, size in sorted(regions):
+        if merged and offset <= merged[-1][0] + merged[-1][1] + max_gap:
+            last_offset, last_size = merged[-1]
+            merged[-1] = (last_offset, max(last_size, offset + size - last_offset))
+        else:
+            merged.append((offset, size))
+    return tuple(merged)
+
+
+class PartialIO:
+    """
+    Field-level access to the IO areas of an opened channel.
+
+    `input` and `output` are single (not double-buffered) images updated in place.
+    read() fetches only the requested fields; fields of `output` are marked dirty
+    with mark() (or found by comparing with the last written contents, see changed())
+    and flush() writes only those. In full mode every read() and flush() transfers
+    the whole image, as the plain ChannelSession does.
+
+    Usage:
+        io = PartialIO(session)
+        slave = io.read("state1", "state2", "value_16")
+        io.output.value_16 = slave.value_16
+        io.mark("value_16")
+        io.flush()
+    """
+
+    def __init__(self, session, in_type=PbBufInWic, out_type=PbBufOutWic, max_gap=0, full=False):
+        """
+        Args:
+            session (ChannelSession): Opened channel.
+            in_type: Structure of the input image.
+            out_type: Structure of the output image.
+            max_gap (int): See coalesce().
+            full (bool): Full-image sync mode: always transfer the complete images.
+        """
+        self.session = session
+        self.in_type = in_type
+        self.out_type = out_type
+        self.max_gap = max_gap
+        self.full = full
+        self.input = in_type()
+        self.output = out_type()
+        self.lLastError = CIFX_NO_ERROR
+        self.transfers = 0
+        self.bytes = 0
+
+        # Output area contents as last written, to find changed fields
+        self._written = bytearray(ctypes.sizeof(out_type))
+        self._output_bytes = memoryview((ctypes.c_ubyte * ctypes.sizeof(out_type)).from_buffer(self.output)).cast("B")
+        self._out_fields = []
+        for name, *_ in out_type._fields_:
+            offset, size = field_region(out_type, name)
+            self._out_fields.append((name, slice(offset, offset + size)))
+        self._dirty = set()
+        self._regions = {}
+        self._bound = {}
+        self._hDevice = None
+
+    def regions(self, struct_type, names):
+        """
+        Returns:
+            tuple: Coalesced (offset, size) regions of the fields, the whole structure if
+                `names` is empty or in full mode.
+        """
+        if self.full or not names:
+            return ((0, ctypes.sizeof(struct_type)),)
+        key = (struct_type, frozenset(names))
+        regions = self._regions.get(key)
+        if regions is None:
+            regions = self._regions[key] = coalesce((field_region(struct_type, name) for name in names), self.max_gap)
+        return regions
+
+    def _transfers(self, function, image, regions):
+        # One prebound call per region; rebound when the channel was reopened
+        session = self.session
+        if self._hDevice != session.hDevice.value:
+            self._bound.clear()
+            self._hDevice = session.hDevice.value
+        key = (function, regions)
+        calls = self._bound.get(key)
+        if calls is None:
+            bind = session.driver.bind_io
+            calls = self._bound[key] = tuple(
+                bind(function, session.hDevice, 0, offset, size, (ctypes.c_ubyte * size).from_buffer(image, offset), session.ulWaitTimeout)
+                for offset, size in regions
+            )
+        return calls
+
+    def _run(self, function, image, regions):
+        for call, (_, size) in zip(self._transfers(function, image, regions), regions):
+            lRet = call()
+            if lRet != CIFX_NO_ERROR:
+                self.lLastError = lRet
+                if self.session.metrics is not None:
+                    self.session.metrics.count_error(function, lRet)
+                return lRet
+            self.transfers += 1
+            self.bytes += size
+        self.lLastError = CIFX_NO_ERROR
+        return CIFX_NO_ERROR
+
+    def read(self, *names):
+        """
+        Reads fields of the input image, all of them if no names are given.
+
+        Returns:
+            The input image (updated in place), or None if a transfer failed (see lLastError).
+        """
+        if self._run("xChannelIORead", self.input, self.regions(self.in_type, names)) != CIFX_NO_ERROR:
+            return None
+        return self.input
+
+    def mark(self, *names):
+        """
+        Marks fields of the output image to be written by the next flush().
+        """
+        for name in names:
+            field_region(self.out_type, name)
+        self._dirty.update(names)
+
+    def changed(self):
+        """
+        Returns:
+            list: Names of the output fields that differ from what was last written.
+        """
+        current = self._output_bytes
+        written = self._written
+        return [name for name, region in self._out_fields if current[region] != written[region]]
+
+    def flush(self, detect=False):
+        """
+        Writes the dirty fields of the output image.
+
+        Args:
+            detect (bool): Also write the fields changed since the last write, see changed().
+
+        Returns:
+            int: cifX error code, CIFX_NO_ERROR on success. The fields stay dirty on failure.
+        """
+        if detect:
+            self._dirty.update(self.changed())
+        if not self._dirty and not self.full:
+            return CIFX_NO_ERROR
+        return self._write(self.regions(self.out_type, tuple(self._dirty)))
+
+    def _write(self, regions):
+        lRet = self._run("xChannelIOWrite", self.output, regions)
+        if lRet == CIFX_NO_ERROR:
+            current = self._output_bytes
+            for offset, size in regions:
+                self._written[offset:offset + size] = current[offset:offset + size]
+            self._dirty.clear()
+        return lRet
+
+    def sync(self):
+        """
+        Full-image sync: reads the whole input image and writes the whole output image.
+
+        Returns:
+            int: cifX error code of the first failing transfer, CIFX_NO_ERROR on success.
+        """
+        lRet = self._run("xChannelIORead", self.input, self.regions(self.in_type, ()))
+        if lRet != CIFX_NO_ERROR:
+            return lRet
+        return self._write(self.regions(self.out_type, ()))
@@ -0,0 +1,73 @@
+import ctypes
+
+
+class ProcessImage:
+    """
+    Double-buffered process image backed by one preallocated buffer.
+
+    Both halves of the backing buffer are exposed twice: as a raw byte array the driver
+    reads into / writes from, and as a structure view (`from_buffer`) over the same memory.
+    No objects are created and nothing is copied per cycle.
+
+    The driver always works on the back half. After a successful transfer swap() makes it
+    the current image, so the previous valid image stays readable while the next one is
+    being filled. A view returned by `current` is therefore valid until the second
+    following swap().
+    """
+
+    def __init__(self, struct_type, size):
+        """
+        Args:
+            struct_type: ctypes structure overlaid on each half, e.g. PbBufInWic.
+            size (int): Size in bytes of one image as transferred by the driver.
+        """
+        if ctypes.sizeof(struct_type) > size:
+            raise ValueError(f"{struct_type.__name__} structure size ({ctypes.sizeof(struct_type)}) exceeds buffer size ({size}).")
+
+        self.struct_type = struct_type
+        self.size = size
+        self._backing = (ctypes.c_ubyte * (2 * size))()
+        self.buffers = tuple((ctypes.c_ubyte * size).from_buffer(self._backing, i * size) for i in range(2))
+        self._images = tuple(struct_type.from_buffer(self._backing, i * size) for i in range(2))
+        self._front = 0
+
+    @property
+    def back_index(self):
+        """
+        Index into `buffers` of the image being filled.
+        """
+        return self._front ^ 1
+
+    @property
+    def current(self):
+        """
+        The last valid image.
+        """
+        return self._images[self._front]
+
+    @property
+    def back(self):
+        """
+        Structure view of the image being filled.
+        """
+        return self._images[self._front ^ 1]
+
+    @property
+    def back_buffer(self):
+        """
+        Raw bytes of the image being filled, passed directly to the driver.
+        """
+        return self.buffers[self._front ^ 1]
+
+    @property
+    def current_buffer(self):
+        """
+        Raw bytes of the last valid image.
+        """
+        return self.buffers[self._front]
+
+    def swap(self):
+        """
+        Publishes the back image as the current one.
+        """
+        self._front ^= 1
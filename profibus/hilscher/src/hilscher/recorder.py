@@ -0,0 +1,395 @@
+"""
+Process-image recorder.
+
+Every raw input (PbBufInWic) and output (PbBufOutWic) image is appended with a
+monotonic timestamp to a fixed-size, memory-mapped ring file. When the ring is full
+the oldest records are overwritten, so the recorder can run permanently with bounded
+disk usage, and the last minutes before a problem on the line can be read back.
+
+Most images differ from the previous one only in the timestamp and the watchdog.
+Those are stored as delta records holding just these fields; every other image (and
+every keyframe_interval-th image of a direction) is stored in full.
+
+File layout:
+    RecorderHeader | data ring of records
+    record = RECORD header (length, kind, timestamp_ns) + payload
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from ctypes import Structure, c_char, c_uint32, c_uint64, sizeof
+
+from .Definitions import PbBufInWic, PbBufOutWic
+
+RECORDER_MAGIC = b"PBIMGREC"
+RECORDER_VERSION = 1
+DEFAULT_SIZE = 16 * 1024 * 1024
+
+# Record kinds
+INPUT = 1
+OUTPUT = 2
+DELTA = 0x80
+WRAP = 0x7F         # the next record starts at the beginning of the ring
+
+STRUCT_TYPES = {INPUT: PbBufInWic, OUTPUT: PbBufOutWic}
+
+# Fields that change every master cycle (Change.TIMESTAMP and Change.WATCHDOG)
+VOLATILE_FIELDS = ("year", "month", "day", "hours", "minutes", "seconds", "value_16")
+
+# Record header: total record length, kind, monotonic timestamp in nanoseconds
+RECORD = struct.Struct("<HBxQ")
+
+Frame = namedtuple("Frame", "timestamp_ns direction data")
+
+
+class RecorderHeader(Structure):
+    _fields_ = [
+        ("abMagic", c_char * 8),
+        ("ulVersion", c_uint32),
+        ("ulDataSize", c_uint32),
+        ("ullHead", c_uint64),      # offset of the next record
+        ("ullTail", c_uint64),      # offset of the oldest record
+        ("ullCount", c_uint64),     # number of records in the ring
+        ("ullWritten", c_uint64),   # number of records written since the file was created
+    ]
+
+
+# ullHead, ullTail, ullCount and ullWritten, updated after every record
+RING_STATE = struct.Struct("<QQQQ")
+RING_STATE_OFFSET = RecorderHeader.ullHead.offset
+
+
+def _regions(struct_type, names):
+    """
+    Returns the (start, end) byte ranges of the named fields, adjacent fields merged.
+    """
+    fields = sorted((getattr(struct_type, name) for name in names), key=lambda field: field.offset)
+    regions = []
+    for field in fields:
+        if regions and regions[-1][1] == field.offset:
+            regions[-1] = (regions[-1][0], field.offset + field.size)
+        else:
+            regions.append((field.offset, field.offset + field.size))
+    return regions
+
+
+class _Layout:
+    """
+    Volatile and stable byte ranges of one image type.
+
+    Images are compared as integers: an image is a delta of its keyframe if the XOR of
+    both has no bit set in the stable bytes.
+    """
+
+    def __init__(self, struct_type, volatile=VOLATILE_FIELDS):
+        self.size = sizeof(struct_type)
+        regions = _regions(struct_type, volatile)
+        self.volatile = [slice(start, end) for start, end in regions]
+        mask = bytearray(b"\xff" * self.size)
+        for start, end in regions:
+            mask[start:end] = bytes(end - start)
+        self.stable_mask = int.from_bytes(mask, "little")
+        # Unpacks the volatile fields of an image as byte strings
+        layout, pos = [], 0
+        for start, end in regions:
+            layout.append(f"{start - pos}x{end - start}s" if start > pos else f"{end - start}s")
+            pos = end
+        self._volatile_struct = struct.Struct("<" + "".join(layout))
+
+    def is_delta(self, value, key_value):
+        return not (value ^ key_value) & self.stable_mask
+
+    def delta(self, data):
+        return b"".join(self._volatile_struct.unpack_from(data))
+
+    def apply(self, key, payload):
+        pos = 0
+        for region in self.volatile:
+            length = region.stop - region.start
+            key[region] = payload[pos:pos + length]
+            pos += length
+
+
+LAYOUTS = {direction: _Layout(struct_type) for direction, struct_type in STRUCT_TYPES.items()}
+
+
+class Recorder:
+    """
+    Appends input and output images to a memory-mapped ring file.
+
+    An existing recording of the same size is continued. Records are written straight
+    into the mapping, so recording costs a byte comparison and a copy per image.
+
+    Usage:
+        recorder = Recorder("line1.pbrec")
+        session.recorder = recorder      # records every successful read and write
+        ...
+        recorder.close()
+    """
+
+    def __init__(self, path, size=DEFAULT_SIZE, keyframe_interval=1000, clock=time.monotonic_ns):
+        """
+        Args:
+            path: Ring file to create or continue.
+            size (int): Size of the data ring in bytes.
+            keyframe_interval (int): Store every n-th image of a direction in full, so
+                                     deltas whose keyframe was overwritten are lost only briefly.
+            clock: Timestamp source in nanoseconds.
+        """
+        if size < 2 * (RECORD.size + sizeof(PbBufOutWic)):
+            raise ValueError(f"Ring size {size} is too small for two full records.")
+        self.path = path
+        self.size = size
+        self.keyframe_interval = keyframe_interval
+        self.clock = clock
+        self.full_records = 0
+        self.delta_records = 0
+        self._keys = {INPUT: None, OUTPUT: None}
+        self._since_key = {INPUT: 0, OUTPUT: 0}
+        self._lock = threading.Lock()
+
+        total = sizeof(RecorderHeader) + size
+        continued = os.path.exists(path) and os.path.getsize(path) == total
+        self._file = open(path, "r+b" if continued else "w+b")
+        if not continued:
+            self._file.truncate(total)
+        self._map = mmap.mmap(self._file.fileno(), total)
+        self._base = sizeof(RecorderHeader)
+
+        # The ring position is kept in Python ints and stored with one pack per record
+        header = RecorderHeader.from_buffer_copy(self._map)
+        if not continued or header.abMagic != RECORDER_MAGIC or header.ulVersion != RECORDER_VERSION:
+            header = RecorderHeader(abMagic=RECORDER_MAGIC, ulVersion=RECORDER_VERSION, ulDataSize=size)
+            self._map[:self._base] = bytes(header)
+        self._head, self._tail = header.ullHead, header.ullTail
+        self.count, self.written = header.ullCount, header.ullWritten
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def record_input(self, image):
+        """
+        Appends an input image (PbBufInWic or bytes-like).
+        """
+        self.record(INPUT, image)
+
+    def record_output(self, image):
+        """
+        Appends an output image (PbBufOutWic or bytes-like).
+        """
+        self.record(OUTPUT, image)
+
+    def record(self, direction, image, timestamp_ns=None):
+        """
+        Appends an image, as delta record if only its volatile fields changed.
+
+        Args:
+            direction (int): INPUT or OUTPUT.
+            image: The image, at least as large as the structure of the direction.
+            timestamp_ns (int): Timestamp of the image, defaults to clock().
+        """
+        layout = LAYOUTS[direction]
+        data = bytes(image)
+        if len(data) != layout.size:
+            data = data[:layout.size]
+        value = int.from_bytes(data, "little")
+        if timestamp_ns is None:
+            timestamp_ns = self.clock()
+        with self._lock:
+            key_value = self._keys[direction]
+            if (key_value is not None and self._since_key[direction] < self.keyframe_interval
+                    and layout.is_delta(value, key_value)):
+                self._since_key[direction] += 1
+                self.delta_records += 1
+                self._append(direction | DELTA, timestamp_ns, layout.delta(data))
+            else:
+                self._keys[direction] = value
+                self._since_key[direction] = 0
+                self.full_records += 1
+                self._append(direction, timestamp_ns, data)
+
+    def _append(self, kind, timestamp_ns, payload):
+        length = RECORD.size + len(payload)
+        pos = self._head
+        if pos + length > self.size:
+            self._evict(pos, self.size)
+            if self.size - pos >= RECORD.size:
+                RECORD.pack_into(self._map, self._base + pos, RECORD.size, WRAP, 0)
+            pos = 0
+        self._evict(pos, pos + length)
+        if self.count == 0:
+            self._tail = pos
+
+        start = self._base + pos
+        RECORD.pack_into(self._map, start, length, kind, timestamp_ns)
+        self._map[start + RECORD.size:start + length] = payload
+        self._head = pos + length
+        self.count += 1
+        self.written += 1
+        RING_STATE.pack_into(self._map, RING_STATE_OFFSET, self._head, self._tail, self.count, self.written)
+
+    def _evict(self, start, end):
+        # Drops the oldest records while they lie in the range about to be overwritten
+        while self.count:
+            tail = self._tail
+            # Outside the range; at the ring start the tail may still be a wrap position
+            if not start <= tail < end and start:
+                break
+            if self.size - tail < RECORD.size:
+                self._tail = 0
+                continue
+            length, kind, _ = RECORD.unpack_from(self._map, self._base + tail)
+            if kind == WRAP:
+                self._tail = 0
+                continue
+            if not start <= tail < end:
+                break
+            self._tail = tail + length
+            self.count -= 1
+
+    def flush(self):
+        """
+        Writes the mapped pages to disk.
+        """
+        self._map.flush()
+
+    def close(self):
+        """
+        Flushes and unmaps the ring file. Safe to call more than once.
+        """
+        if self._map is None:
+            return
+        with self._lock:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            self._file.close()
+
+
+class RecordingReader:
+    """
+    Reads a ring file written by Recorder, oldest record first.
+
+    Delta records are expanded with the preceding full record of the same direction;
+    deltas whose full record was already overwritten are skipped. A file that is still
+    being recorded can be read, but records overwritten during the read may be lost.
+
+    Usage:
+        with RecordingReader("line1.pbrec") as reader:
+            for timestamp_ns, slave in reader.images(INPUT, start_ns, end_ns):
+                ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self.read_header()
+        if header.abMagic != RECORDER_MAGIC or header.ulVersion != RECORDER_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a process-image recording.")
+        self.size = header.ulDataSize
+        self._base = sizeof(RecorderHeader)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.read_header().ullCount
+
+    def read_header(self):
+        """
+        Returns:
+            RecorderHeader: Copy of the current file header.
+        """
+        return RecorderHeader.from_buffer_copy(self._map, 0)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._file.close()
+
+    def frames(self, start_ns=None, end_ns=None, direction=None):
+        """
+        Iterates the recorded images.
+
+        Args:
+            start_ns (int): Skip images recorded before this timestamp.
+            end_ns (int): Skip images recorded after this timestamp.
+            direction (int): INPUT or OUTPUT, None for both.
+
+        Yields:
+            Frame: (timestamp_ns, direction, raw image bytes)
+        """
+        header = self.read_header()
+        data, base, size = self._map, self._base, self.size
+        keys = {INPUT: None, OUTPUT: None}
+        pos, remaining = header.ullTail, header.ullCount
+        while remaining:
+            if size - pos < RECORD.size:
+                pos = 0
+                continue
+            length, kind, timestamp_ns = RECORD.unpack_from(data, base + pos)
+            if kind == WRAP:
+                pos = 0
+                continue
+            payload = data[base + pos + RECORD.size:base + pos + length]
+            pos += length
+            remaining -= 1
+
+            record_direction = kind & ~DELTA
+            if kind & DELTA:
+                key = keys[record_direction]
+                if key is None:
+                    continue
+                LAYOUTS[record_direction].apply(key, payload)
+                image = bytes(key)
+            else:
+                keys[record_direction] = bytearray(payload)
+                image = payload
+
+            if direction is not None and record_direction != direction:
+                continue
+            if (start_ns is not None and timestamp_ns < start_ns) or (end_ns is not None and timestamp_ns > end_ns):
+                continue
+            yield Frame(timestamp_ns, record_direction, image)
+
+    def images(self, direction=INPUT, start_ns=None, end_ns=None):
+        """
+        Yields:
+            (timestamp_ns, image): The images of one direction as ctypes structures.
+        """
+        struct_type = STRUCT_TYPES[direction]
+        for frame in self.frames(start_ns, end_ns, direction):
+            yield frame.timestamp_ns, struct_type.from_buffer_copy(frame.data)
+
+    def load(self, direction=INPUT, start_ns=None, end_ns=None):
+        """
+        Loads a time range of one direction in bulk (requires numpy).
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): uint64 timestamps and the structured array of
+                frames, see frame_codec.decode_frames().
+        """
+        from . import frame_codec
+        frame_codec._require_numpy()
+        np = frame_codec.np
+
+        timestamps, images = [], []
+        for frame in self.frames(start_ns, end_ns, direction):
+            timestamps.append(frame.timestamp_ns)
+            images.append(frame.data)
+        frames = frame_codec.decode_frames(b"".join(images), STRUCT_TYPES[direction])
+        return np.array(timestamps, dtype=np.uint64), frames
@@ -0,0 +1,262 @@
+"""
+Replay of recorded Profibus frames.
+
+ReplayCifX is a simulated cifX backend whose master side plays back a recording made
+with recorder.Recorder, so the unchanged stack (WIC_ReadIOData / WIC_SendToMaster,
+ChannelSession, ...) processes real master data without a card. Frames are delivered
+at the original timing, at a scaled speed, or as fast as the host answers. Every
+answer is compared with the output recorded for the same input.
+"""
+import os
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from ctypes import sizeof
+
+from .Definitions import PbBufOutWic, CIFX_NO_ERROR, CIFX_BUS_STATE_ON
+from .cycle import sleep_until
+from .recorder import INPUT, OUTPUT, RecordingReader
+from .simulator import SimulatedCifX, SimulatedBoard, SimulatedChannel
+
+# Environment variables of the "replay" backend
+CIFX_REPLAY_FILE_ENV = "CIFX_REPLAY_FILE"
+CIFX_REPLAY_SPEED_ENV = "CIFX_REPLAY_SPEED"
+
+# Waits longer than this are done on the stop event, so stop() is not delayed by gaps in the recording
+_COARSE_WAIT_NS = 50_000_000
+
+ReplayFrame = namedtuple("ReplayFrame", "timestamp_ns data expected")
+
+
+def _field_slice(struct_type, name):
+    field = getattr(struct_type, name)
+    return slice(field.offset, field.offset + field.size)
+
+
+_WATCHDOG = _field_slice(PbBufOutWic, "value_16")
+_OUTPUT_FIELDS = [(name, _field_slice(PbBufOutWic, name)) for name, _ in PbBufOutWic._fields_]
+
+
+def load_recording(path, start_ns=None, end_ns=None):
+    """
+    Reads the input images of a recording, each with the output recorded after it.
+
+    Args:
+        path: Ring file written by recorder.Recorder.
+        start_ns, end_ns (int): Time range to load, see RecordingReader.frames().
+
+    Returns:
+        list: ReplayFrame(timestamp_ns, input image bytes, expected output bytes or None)
+    """
+    frames = []
+    with RecordingReader(path) as reader:
+        for frame in reader.frames(start_ns, end_ns):
+            if frame.direction == INPUT:
+                frames.append(ReplayFrame(frame.timestamp_ns, frame.data, None))
+            elif frame.direction == OUTPUT and frames and frames[-1].expected is None:
+                frames[-1] = frames[-1]._replace(expected=frame.data)
+    return frames
+
+
+class ReplayMaster:
+    """
+    Plays recorded frames as the Profibus master of a SimulatedChannel.
+
+    Answers of the host are matched to the delivered frames by the echoed watchdog
+    (value_16) and compared field by field with the recorded outputs.
+
+    Usage:
+        master = ReplayMaster(sim.channel("cifX0"), load_recording("line1.pbrec"), speed=0).start()
+        master.wait()
+        print(master.report())
+    """
+
+    def __init__(self, channel, frames, speed=1.0, answer_timeout=0.1, max_differences=100):
+        """
+        Args:
+            channel (SimulatedChannel): Channel to deliver the frames to.
+            frames: ReplayFrame sequence, see load_recording().
+            speed (float): 1.0 replays at the recorded timing, 2.0 twice as fast. 0 or None
+                delivers each frame as soon as the host answered the previous one.
+            answer_timeout (float): Seconds to wait for an answer before the next frame
+                (as fast as possible) or after the last frame.
+            max_differences (int): Number of differing fields kept in `differences`.
+        """
+        self.channel = channel
+        self.frames = list(frames)
+        self.speed = speed
+        self.answer_timeout = answer_timeout
+        self.max_differences = max_differences
+        self.frames_sent = 0
+        self.round_trips = 0
+        self.compared = 0
+        self.mismatches = 0
+        self.field_mismatches = Counter()
+        self.differences = []
+        self.elapsed = 0.0
+        self.finished = threading.Event()
+        # Frames waiting for their answer; appended by _run, matched by the collector thread
+        self._pending = deque()
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._collector = None
+        self._started = 0.0
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def _wait_until(self, deadline_ns):
+        remaining = deadline_ns - time.monotonic_ns()
+        if remaining > _COARSE_WAIT_NS and self._stop.wait((remaining - _COARSE_WAIT_NS) / 1e9):
+            return
+        sleep_until(deadline_ns)
+
+    def _run(self):
+        start_ns = time.monotonic_ns()
+        first_ns = self.frames[0].timestamp_ns if self.frames else 0
+        for index, frame in enumerate(self.frames):
+            if self._stop.is_set():
+                break
+            if self.speed:
+                self._wait_until(start_ns + int((frame.timestamp_ns - first_ns) / self.speed))
+            with self._pending_lock:
+                self._pending.append((index, frame.data[_WATCHDOG], frame.expected))
+            self.channel.deliver_input(frame.data)
+            self.frames_sent += 1
+            if not self.speed:
+                self._check(self.channel.collect_output(timeout=self.answer_timeout))
+
+        # Give the host time to answer the last frames
+        deadline = time.monotonic() + self.answer_timeout
+        while self._pending and time.monotonic() < deadline and not self._stop.is_set():
+            if not self.speed:
+                self._check(self.channel.collect_output(timeout=self.answer_timeout))
+            else:
+                time.sleep(0.001)
+        self.elapsed = time.perf_counter() - self._started
+        self.finished.set()
+
+    def _collect(self):
+        while not self._stop.is_set():
+            self._check(self.channel.collect_output(timeout=0.1))
+
+    def _check(self, output):
+        if output is None:
+            return
+        echo = output[_WATCHDOG]
+        with self._pending_lock:
+            for position, (index, watchdog, expected) in enumerate(self._pending):
+                if watchdog == echo:
+                    break
+            else:
+                return
+            # Frames delivered before the answered one were missed
+            for _ in range(position + 1):
+                self._pending.popleft()
+        self.round_trips += 1
+        if expected is not None:
+            self._compare(index, expected, output)
+
+    def _compare(self, index, expected, output):
+        self.compared += 1
+        size = sizeof(PbBufOutWic)
+        if output[:size] == expected[:size]:
+            return
+        self.mismatches += 1
+        expected_image = PbBufOutWic.from_buffer_copy(expected)
+        output_image = PbBufOutWic.from_buffer_copy(output)
+        for name, region in _OUTPUT_FIELDS:
+            if output[region] != expected[region]:
+                self.field_mismatches[name] += 1
+                if len(self.differences) < self.max_differences:
+                    self.differences.append((index, name, _plain(getattr(expected_image, name)), _plain(getattr(output_image, name))))
+
+    def start(self):
+        """
+        Starts delivering frames and collecting answers on background threads.
+        """
+        self._stop.clear()
+        self.finished.clear()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="ReplayMaster", daemon=True)
+        self._thread.start()
+        if self.speed:
+            self._collector = threading.Thread(target=self._collect, name="ReplayMaster-collect", daemon=True)
+            self._collector.start()
+        return self
+
+    def wait(self, timeout=None):
+        """
+        Waits until all frames were delivered and answered (or timed out).
+
+        Returns:
+            bool: True if the replay has finished.
+        """
+        return self.finished.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+        for thread in (self._thread, self._collector):
+            if thread is not None:
+                thread.join()
+        if not self.finished.is_set():
+            self.elapsed = time.perf_counter() - self._started
+
+    def report(self):
+        """
+        Returns:
+            dict: Throughput and the differences between the answers and the recorded outputs.
+        """
+        return {
+            "frames": len(self.frames),
+            "frames_sent": self.frames_sent,
+            "round_trips": self.round_trips,
+            "missed": self.frames_sent - self.round_trips,
+            "elapsed": self.elapsed,
+            "throughput_hz": self.round_trips / self.elapsed if self.elapsed else 0.0,
+            "compared": self.compared,
+            "mismatches": self.mismatches,
+            "field_mismatches": dict(self.field_mismatches),
+            "differences": list(self.differences),
+        }
+
+
+def _plain(value):
+    return list(value) if hasattr(value, "_length_") else value
+
+
+class ReplayCifX(SimulatedCifX):
+    """
+    Simulated cifX backend playing back a recording on one board with one channel.
+
+    The replay starts when the host sets the bus state ON, so the recorded timing is
+    kept relative to the start of the cyclic IO. The channel is bus-synchronous: each
+    frame is read exactly once.
+
+    Usage:
+        sim = ReplayCifX("line1.pbrec", speed=0)
+        with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session:
+            ...
+        print(sim.master.report())
+    """
+
+    def __init__(self, recording, speed=1.0, board="cifX0", answer_timeout=0.1):
+        """
+        Args:
+            recording: Path of a recording, or ReplayFrame sequence.
+            speed (float): Replay speed, see ReplayMaster.
+            board (str): Name of the simulated board.
+            answer_timeout (float): See ReplayMaster.
+        """
+        super().__init__([SimulatedBoard(board, synchronous=True)])
+        frames = load_recording(recording) if isinstance(recording, (str, os.PathLike)) else recording
+        self.master = ReplayMaster(self.boards[0].channels[0], frames, speed, answer_timeout)
+
+    def xChannelBusState(self, hChannel, ulCmd, pulState, ulTimeout):
+        lRet = super().xChannelBusState(hChannel, ulCmd, pulState, ulTimeout)
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if lRet == CIFX_NO_ERROR and channel.bus_state == CIFX_BUS_STATE_ON and not self.master.started:
+            self.master.start()
+        return lRet
@@ -0,0 +1,96 @@
+import ctypes
+from ctypes import ARRAY, c_uint16
+
+from .Definitions import PbBufInWic, PbBufOutWic, TRACKS_PER_VIEW_MAX
+
+VIEWS = 4
+
+# Header fields the response echoes from the input image (value_16 is the master's watchdog)
+ECHOED_FIELDS = (
+    "state1", "state2",
+    "year", "month", "day", "hours", "minutes", "seconds",
+    "interval1", "interval2", "interval3", "interval4",
+    "value_13", "value_14", "value_15", "value_16",
+)
+
+# Fields filled by processing, in PbBufOutWic memory order
+PROCESSED_FIELDS = tuple(f"{name}{view}" for view in range(1, VIEWS + 1) for name in ("pv", "pvq"))
+
+# Processing result as laid out in PbBufOutWic: block[view][0 = pv, 1 = pvq][track]
+PvBlock = ARRAY(ARRAY(ARRAY(c_uint16, TRACKS_PER_VIEW_MAX), 2), VIEWS)
+
+
+def _region(struct_type, names):
+    """
+    Returns (offset, size) of the fields, which must be contiguous and in this order.
+    """
+    offset = getattr(struct_type, names[0]).offset
+    end = offset
+    for name in names:
+        field = getattr(struct_type, name)
+        if field.offset != end:
+            raise ValueError(f"{struct_type.__name__}.{name} is not contiguous with the preceding field.")
+        end += field.size
+    return offset, end - offset
+
+
+class ResponseBuilder:
+    """
+    Fills the output buffer for the Profibus master from the input image and the processing result.
+
+    The output consists of a header echoed from the input and the pv/pvq block produced
+    by processing. The layouts are checked once when the builder is created; building a
+    response then is two memory copies instead of a getattr/setattr per field.
+    """
+
+    def __init__(self, in_type=PbBufInWic, out_type=PbBufOutWic, echoed=ECHOED_FIELDS, processed=PROCESSED_FIELDS):
+        """
+        Args:
+            in_type: Structure of the input image, e.g. PbBufInWic.
+            out_type: Structure of the output image, e.g. PbBufOutWic.
+            echoed (tuple): Field names copied from the input to the output.
+            processed (tuple): Field names of the output filled from the processing result.
+
+        Raises:
+            ValueError: If the echoed fields are not byte-compatible in both structures or the
+                        echoed and processed fields do not cover the output structure.
+        """
+        in_fields = dict(in_type._fields_)
+        out_fields = dict(out_type._fields_)
+        for name in echoed:
+            if name not in in_fields or name not in out_fields:
+                raise ValueError(f"Echoed field '{name}' is missing in {in_type.__name__} or {out_type.__name__}.")
+            if in_fields[name] is not out_fields[name]:
+                raise ValueError(f"Echoed field '{name}' has different types in {in_type.__name__} and {out_type.__name__}.")
+
+        self.echo_offset, self.echo_size = _region(out_type, echoed)
+        if _region(in_type, echoed) != (self.echo_offset, self.echo_size):
+            raise ValueError(f"Echoed fields are laid out differently in {in_type.__name__} and {out_type.__name__}.")
+
+        self.values_offset, self.values_size = _region(out_type, processed)
+        covered = sorted([(self.echo_offset, self.echo_size), (self.values_offset, self.values_size)])
+        if covered[0][0] != 0 or sum(covered[0]) != covered[1][0] or sum(covered[1]) != ctypes.sizeof(out_type):
+            raise ValueError(f"Echoed and processed fields do not cover {out_type.__name__}.")
+
+        self.in_type = in_type
+        self.out_type = out_type
+        self._echo = slice(self.echo_offset, self.echo_offset + self.echo_size)
+        self._values = slice(self.values_offset, self.values_offset + self.values_size)
+        self._zeros = bytes(self.values_size)
+
+    def build(self, buffer, slave, values=None):
+        """
+        Writes a complete response into buffer.
+
+        Args:
+            buffer: Writable buffer of at least sizeof(out_type) bytes, e.g. ProcessImage.back_buffer.
+            slave: Input image (in_type) the header is echoed from.
+            values: Processing result of exactly values_size bytes: a PvBlock, bytes or a
+                    contiguous (4, 2, 8) uint16 array. If None, the pv/pvq block is cleared.
+
+        Raises:
+            ValueError: If values does not have the size of the pv/pvq block.
+        """
+        out = memoryview(buffer).cast("B")
+        out[self._echo] = memoryview(slave).cast("B")[self._echo]
+        out[self._values] = self._zeros if values is None else memoryview(values).cast("B")
@@ -0,0 +1,254 @@
+import ctypes
+from ctypes import create_string_buffer
+
+from .Definitions import (
+    PbBufInWic,
+    PbBufOutWic,
+    CIFX_NO_ERROR,
+    CIFX_HOST_STATE_READY,
+    CIFX_BUS_STATE_ON,
+    SIZE_BUFFER_IN,
+    SIZE_BUFFER_OUT,
+)
+from .driver import CifXDriver, CifXError
+from .errors import Backoff
+from .process_image import ProcessImage
+
+
+class ChannelSession:
+    """
+    Keeps one cifX channel open for the lifetime of the session.
+
+    The channel is opened and host/bus state are brought up once, so the cyclic
+    read_input() / write_output() calls only perform the IO transfer.
+
+    Usage:
+        with CifXDriver() as driver, ChannelSession(driver, "cifX0") as session:
+            slave = session.read_input()
+            session.write_output(master)
+    """
+
+    def __init__(self, hDriver, szBoard, ulChannel=0, ulWaitTimeout=10, ulStateTimeout=1000, dll=None):
+        """
+        Args:
+            hDriver: An opened CifXDriver, or a raw driver handle returned by xDriverOpen.
+            szBoard (str): Board name, e.g. "cifX0".
+            ulChannel (int): Channel number on the board.
+            ulWaitTimeout (int): Default IO timeout in milliseconds.
+            ulStateTimeout (int): Timeout in milliseconds for the host/bus state handshakes.
+            dll: cifX API to call when a raw handle is given. Defaults to the process-wide backend.
+        """
+        self.driver = hDriver if isinstance(hDriver, CifXDriver) else CifXDriver(dll, hDriver=hDriver)
+        self.dll = self.driver.dll
+        self.hDriver = self.driver.hDriver
+        self.szBoard = szBoard
+        self.ulChannel = ulChannel
+        self.ulWaitTimeout = ulWaitTimeout
+        self.ulStateTimeout = ulStateTimeout
+        self.hDevice = ctypes.c_void_p(None)
+        self.lLastError = CIFX_NO_ERROR
+
+        # Process images are allocated once; the driver transfers directly into/out of them
+        self.input_image = ProcessImage(PbBufInWic, SIZE_BUFFER_IN)
+        self.output_image = ProcessImage(PbBufOutWic, SIZE_BUFFER_OUT)
+
+        # Prebound IO transfers per image half, created on open()
+        self._io_read = None
+        self._io_write = None
+
+        # Optional recorder.Recorder receiving every successfully transferred image
+        self.recorder = None
+        # Optional metrics.CycleMetrics counting failed transfers per error code
+        self.metrics = None
+        # Optional mailbox.PacketService (gated mode) serviced after each successful write
+        self.mailbox = None
+        # Optional errors.ErrorReporter whose pending summaries are written on close()
+        self.reporter = None
+
+    @property
+    def is_open(self):
+        return bool(self.hDevice)
+
+    def open(self):
+        """
+        Opens the channel and sets host state READY and bus state ON.
+
+        Raises:
+            CifXError: If one of the setup calls fails. The channel is closed again.
+        """
+        if self.is_open:
+            return self
+
+        szBoard = create_string_buffer(self.szBoard.encode('ascii'))
+        lRet = self.dll.xChannelOpen(self.hDriver, szBoard, self.ulChannel, ctypes.byref(self.hDevice))
+        if lRet != CIFX_NO_ERROR or not self.hDevice:
+            self.hDevice = ctypes.c_void_p(None)
+            raise self._error("xChannelOpen", lRet)
+
+        ulState = ctypes.c_uint32(0)
+        lRet = self.dll.xChannelHostState(self.hDevice, CIFX_HOST_STATE_READY, ctypes.byref(ulState), self.ulStateTimeout)
+        if lRet != CIFX_NO_ERROR:
+            self.close()
+            raise self._error("xChannelHostState", lRet)
+
+        lRet = self.dll.xChannelBusState(self.hDevice, CIFX_BUS_STATE_ON, ctypes.byref(ulState), self.ulStateTimeout)
+        if lRet != CIFX_NO_ERROR:
+            self.close()
+            raise self._error("xChannelBusState", lRet)
+
+        self._bind_io()
+        return self
+
+    def _bind_io(self):
+        bind = self.driver.bind_io
+        self._io_read = tuple(
+            bind("xChannelIORead", self.hDevice, 0, 0, SIZE_BUFFER_IN, buffer, self.ulWaitTimeout)
+            for buffer in self.input_image.buffers
+        )
+        self._io_write = tuple(
+            bind("xChannelIOWrite", self.hDevice, 0, 0, SIZE_BUFFER_OUT, buffer, self.ulWaitTimeout)
+            for buffer in self.output_image.buffers
+        )
+
+    def close(self):
+        """
+        Closes the channel. Safe to call more than once.
+        """
+        if self.is_open:
+            self.dll.xChannelClose(self.hDevice)
+            self.hDevice = ctypes.c_void_p(None)
+            self._io_read = None
+            self._io_write = None
+        if self.reporter is not None:
+            self.reporter.flush()
+
+    def reopen(self, backoff=None, stop=None, reporter=None):
+        """
+        Closes the channel and opens it again, retrying with exponential backoff until
+        it succeeds, e.g. after the card or the bus was lost.
+
+        Args:
+            backoff (errors.Backoff): Delays between the attempts. Defaults to 0.1 s .. 10 s.
+            stop (threading.Event): Gives up when set.
+            reporter (errors.ErrorReporter): Receives the error of each failed attempt.
+
+        Returns:
+            bool: True if the channel is open, False if `stop` was set.
+        """
+        if backoff is None:
+            backoff = Backoff()
+        self.close()
+        while stop is None or not stop.is_set():
+            try:
+                self.open()
+            except CifXError as e:
+                self.lLastError = e.lError
+                if reporter is not None:
+                    reporter.report(e.lError, f"{self.szBoard} channel {self.ulChannel}: {e.function}")
+                if backoff.wait(stop):
+                    break
+            else:
+                backoff.reset()
+                return True
+        return False
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def read_input(self, ulWaitTimeout=None):
+        """
+        Reads the input image sent by the Profibus master.
+
+        The driver reads into the back half of input_image, which becomes the current
+        image on success. On failure the last valid image stays current.
+
+        Args:
+            ulWaitTimeout (int): IO timeout in milliseconds, defaults to the session timeout.
+
+        Returns:
+            PbBufInWic: View of the received image (valid until the second following read),
+                or None if the read failed (see lLastError).
+        """
+        image = self.input_image
+        if ulWaitTimeout is None or ulWaitTimeout == self.ulWaitTimeout:
+            lRet = self._io_read[image.back_index]()
+        else:
+            lRet = self.dll.xChannelIORead(self.hDevice, 0, 0, SIZE_BUFFER_IN, image.back_buffer, ulWaitTimeout)
+        self.lLastError = lRet
+        if lRet != CIFX_NO_ERROR:
+            if self.metrics is not None:
+                self.metrics.count_error("xChannelIORead", lRet)
+            return None
+        image.swap()
+        if self.recorder is not None:
+            self.recorder.record_input(image.current)
+        return image.current
+
+    def write_output(self, master=None, ulWaitTimeout=None):
+        """
+        Writes an output image to the Profibus master.
+
+        Filling `output_image.back` in place and passing it here avoids any copy. Any
+        other structure is copied into the back half first. On success the written
+        image becomes `output_image.current`.
+
+        Args:
+            master (PbBufOutWic): The image to send. Defaults to `output_image.back`.
+            ulWaitTimeout (int): IO timeout in milliseconds, defaults to the session timeout.
+
+        Returns:
+            int: cifX error code, CIFX_NO_ERROR on success.
+        """
+        image = self.output_image
+        if master is not None and master is not image.back:
+            size = ctypes.sizeof(master)
+            if size > SIZE_BUFFER_OUT:
+                raise ValueError(f"{type(master).__name__} structure size ({size}) exceeds buffer size ({SIZE_BUFFER_OUT}).")
+            ctypes.memmove(image.back_buffer, ctypes.byref(master), size)
+
+        if ulWaitTimeout is None or ulWaitTimeout == self.ulWaitTimeout:
+            lRet = self._io_write[image.back_index]()
+        else:
+            lRet = self.dll.xChannelIOWrite(self.hDevice, 0, 0, SIZE_BUFFER_OUT, image.back_buffer, ulWaitTimeout)
+        self.lLastError = lRet
+        if lRet == CIFX_NO_ERROR:
+            image.swap()
+            if self.recorder is not None:
+                self.recorder.record_output(image.current)
+            if self.mailbox is not None:
+                self.mailbox.cycle_done()
+        elif self.metrics is not None:
+            self.metrics.count_error("xChannelIOWrite", lRet)
+        return lRet
+
+    def write_area(self, ulOffset, ulDataLen, pvData, ulWaitTimeout=None):
+        """
+        Writes part of the output area, e.g. only the pv/pvq block while another thread
+        keeps the header up to date (see keepalive.KeepAlive).
+
+        Unlike write_output() this does not touch output_image or lLastError, so it can
+        be called from another thread than the cyclic IO.
+
+        Args:
+            ulOffset (int): Offset in the output area in bytes.
+            ulDataLen (int): Number of bytes to write.
+            pvData: ctypes buffer holding the data.
+            ulWaitTimeout (int): IO timeout in milliseconds, defaults to the session timeout.
+
+        Returns:
+            int: cifX error code, CIFX_NO_ERROR on success.
+        """
+        if ulOffset + ulDataLen > SIZE_BUFFER_OUT:
+            raise ValueError(f"Write of {ulDataLen} bytes at offset {ulOffset} exceeds buffer size ({SIZE_BUFFER_OUT}).")
+        lRet = self.dll.xChannelIOWrite(self.hDevice, 0, ulOffset, ulDataLen, pvData,
+                                        self.ulWaitTimeout if ulWaitTimeout is None else ulWaitTimeout)
+        if lRet != CIFX_NO_ERROR and self.metrics is not None:
+            self.metrics.count_error("xChannelIOWrite", lRet)
+        return lRet
+
+    def _error(self, function, lError):
+        return CifXError(function, lError, self.driver.error_description(lError))
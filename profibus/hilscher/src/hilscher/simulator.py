@@ -0,0 +1,814 @@
+import ctypes
+import itertools
+import mmap
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from .Definitions import (
+    DriverInformation, BoardInformation, ChannelInformation, PbBufInWic, PbBufOutWic,
+    TRACKS_PER_VIEW_MAX, SIZE_BUFFER_OUT,
+    CIFX_NO_ERROR, CIFX_NO_MORE_ENTRIES, CIFX_INVALID_POINTER, CIFX_INVALID_BOARD, CIFX_INVALID_CHANNEL,
+    CIFX_INVALID_HANDLE, CIFX_INVALID_PARAMETER, CIFX_INVALID_COMMAND, CIFX_INVALID_ACCESS_SIZE,
+    CIFX_DEV_NOT_READY, CIFX_DEV_NOT_RUNNING, CIFX_DEV_NO_COM_FLAG, CIFX_DEV_EXCHANGE_TIMEOUT,
+    CIFX_HOST_STATE_READY, CIFX_BUS_STATE_ON,
+    CIFX_MEM_PTR_OPEN, CIFX_MEM_PTR_CLOSE, CIFX_IO_INPUT_AREA, CIFX_IO_OUTPUT_AREA,
+    CIFX_FUNCTION_FAILED, CIFX_NOTIFY_PD0_IN, CIFX_NOTIFY_COM_STATE, NotifyComState,
+    RCX_COMM_COS_READY, RCX_COMM_COS_RUN, RCX_COMM_COS_BUS_ON, RCX_APP_COS_APP_READY, RCX_APP_COS_BUS_ON,
+    CifXPacket, CIFX_MAX_PACKET_SIZE, CIFX_PACKET_HEADER_SIZE, CIFX_MAX_DATA_SIZE, CIFX_INVALID_BUFFERSIZE,
+    CIFX_DEV_MAILBOX_FULL, CIFX_DEV_GET_NO_PACKET, CIFX_DEV_GET_TIMEOUT,
+    RCX_FIRMWARE_IDENTIFY_REQ, RCX_GET_COMMON_STATE_REQ, ERR_HIL_UNKNOWN_COMMAND,
+)
+from .cycle import sleep_until
+
+# Size of the IO input and output area of a communication channel
+DPM_IO_AREA_SIZE = 5760
+# Dual-port memory size of the CIFX 70E-DP (devices.json)
+DPM_TOTAL_SIZE = 64 * 1024
+# Simplified DPM layout: system and handshake channel first, then the communication
+# channels, each with its IO input area followed by the IO output area
+DPM_CHANNEL_OFFSET = 0x300
+DPM_CHANNEL_SIZE = 0x3980
+DPM_IO_AREA_OFFSET = 0x200
+# Packets the simulated card holds for the host before the mailbox counts as full
+MAILBOX_DEPTH = 16
+# Simulated firmware (version, name, build date)
+FIRMWARE_VERSION = (2, 9, 1, 0)
+FIRMWARE_NAME = b"PROFIBUS DP Slave (simulated)"
+FIRMWARE_DATE = (2024, 9, 18)
+RCX_COMM_STATE_STOP = 2
+RCX_COMM_STATE_OPERATE = 4
+
+# Returned when querying the host/bus state instead of setting it
+CIFX_HOST_STATE_READ = 2
+CIFX_BUS_STATE_GETSTATE = 2
+
+ERROR_DESCRIPTIONS = {
+    CIFX_NO_ERROR: "No error",
+    CIFX_NO_MORE_ENTRIES: "No more entries available",
+    CIFX_INVALID_POINTER: "Invalid pointer (NULL) passed to driver",
+    CIFX_INVALID_BOARD: "No board with the given name / index available",
+    CIFX_INVALID_CHANNEL: "No channel with the given index available",
+    CIFX_INVALID_HANDLE: "Invalid handle passed to driver",
+    CIFX_INVALID_PARAMETER: "Invalid parameter",
+    CIFX_INVALID_COMMAND: "Invalid command",
+    CIFX_INVALID_ACCESS_SIZE: "Invalid access size",
+    CIFX_FUNCTION_FAILED: "Function failed",
+    CIFX_DEV_NOT_READY: "Device not ready (ready flag failed)",
+    CIFX_DEV_NOT_RUNNING: "Device not running (running flag failed)",
+    CIFX_DEV_NO_COM_FLAG: "Communication flag not set",
+    CIFX_DEV_EXCHANGE_TIMEOUT: "Timeout during data exchange",
+}
+
+
+def _value(arg):
+    """
+    Returns the plain value of an argument passed as int, ctypes scalar or c_void_p handle.
+    """
+    return getattr(arg, "value", arg)
+
+
+def _target(arg):
+    """
+    Returns the object behind a byref() / pointer argument.
+    """
+    if arg is None:
+        return None
+    obj = getattr(arg, "_obj", None)
+    if obj is not None:
+        return obj
+    return arg.contents if isinstance(arg, ctypes._Pointer) else arg
+
+
+def _copy_struct_to(arg, struct, ulSize):
+    ctypes.memmove(arg, ctypes.byref(struct), min(_value(ulSize), ctypes.sizeof(struct)))
+
+
+class SimulatedChannel:
+    """
+    One simulated communication channel with its IO areas.
+
+    The IO areas are views of the board's (memory-mapped) DPM. The host side is driven
+    through the cifX API of SimulatedCifX, either copying (xChannelIORead/Write) or
+    directly on the DPM with the PLC functions; the master side (e.g. LoopbackMaster)
+    uses deliver_input() / collect_output().
+    """
+
+    def __init__(self, board, index, synchronous=False):
+        """
+        Args:
+            board (SimulatedBoard): Board the channel belongs to.
+            index (int): Channel number.
+            synchronous (bool): If True, xChannelIORead waits for an input image that
+                the host has not read yet, like a bus-synchronous IO mode.
+        """
+        self.board = board
+        self.index = index
+        self.synchronous = synchronous
+        self.host_state = 0
+        self.bus_state = 0
+        self.open_count = 0
+        self.dpm_offset = DPM_CHANNEL_OFFSET + index * DPM_CHANNEL_SIZE
+        self.dpm = (ctypes.c_char * DPM_CHANNEL_SIZE).from_buffer(board.dpm, self.dpm_offset)
+        area = DPM_IO_AREA_OFFSET
+        self.input_area = memoryview(self.dpm).cast("B")[area:area + DPM_IO_AREA_SIZE]
+        self.output_area = memoryview(self.dpm).cast("B")[area + DPM_IO_AREA_SIZE:area + 2 * DPM_IO_AREA_SIZE]
+        self.input_seq = 0
+        self.output_seq = 0
+        self.host_read_seq = 0
+        self.master_read_seq = 0
+        # PLC handshake: the host owns the input area between IsReadReady and ActivateRead
+        self.plc_input_owned = False
+        self.pending_input = None
+        # ulNotification -> (callback, pvUser) registered with xChannelRegisterNotification
+        self.notifications = {}
+        self.com_state = False
+        # Mailbox: packets from the card to the host
+        self.mailbox = deque()
+        self.put_packet_count = 0
+        self.get_packet_count = 0
+        self.cond = threading.Condition()
+
+    @property
+    def communicating(self):
+        """
+        True when host and bus are up and the master has delivered at least one image.
+        """
+        return self.host_state == CIFX_HOST_STATE_READY and self.bus_state == CIFX_BUS_STATE_ON and self.input_seq > 0
+
+    # --- master side ---
+
+    def deliver_input(self, data, offset=0):
+        """
+        Stores a new input image sent by the master.
+
+        While the host owns the input area (PLC mode), the image is held back until
+        the host releases the area with xChannelPLCActivateRead.
+        """
+        with self.cond:
+            if self.plc_input_owned:
+                self.pending_input = (offset, bytes(data))
+                return
+            self.input_area[offset:offset + len(data)] = data
+            self.input_seq += 1
+            self.cond.notify_all()
+        self.update_com_state()
+        self.notify(CIFX_NOTIFY_PD0_IN)
+
+    def notify(self, ulNotification, data=None):
+        """
+        Calls the callback registered for a notification, like the driver's interrupt thread.
+        """
+        registered = self.notifications.get(ulNotification)
+        if registered is not None:
+            callback, pvUser = registered
+            size = 0 if data is None else ctypes.sizeof(data)
+            callback(ulNotification, size, None if data is None else ctypes.addressof(data), pvUser)
+
+    def update_com_state(self):
+        """
+        Sends CIFX_NOTIFY_COM_STATE when `communicating` changed.
+        """
+        communicating = self.communicating
+        if communicating != self.com_state:
+            self.com_state = communicating
+            self.notify(CIFX_NOTIFY_COM_STATE, NotifyComState(int(communicating)))
+
+    def collect_output(self, size=SIZE_BUFFER_OUT, timeout=None):
+        """
+        Returns the last output image written by the host, waiting up to `timeout`
+        seconds for one that the master has not collected yet.
+
+        Returns:
+            bytes: The output image, or None if no new image arrived in time.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.output_seq > self.master_read_seq, timeout):
+                return None
+            self.master_read_seq = self.output_seq
+            return bytes(self.output_area[:size])
+
+    # --- host side ---
+
+    def io_read(self, ulOffset, ulDataLen, pvData, ulTimeout):
+        if ulOffset + ulDataLen > DPM_IO_AREA_SIZE:
+            return CIFX_INVALID_ACCESS_SIZE
+        with self.cond:
+            lRet = self._check_running()
+            if lRet != CIFX_NO_ERROR:
+                return lRet
+            if self.synchronous or self.input_seq == 0:
+                if not self.cond.wait_for(lambda: self.input_seq > self.host_read_seq, ulTimeout / 1000):
+                    return CIFX_DEV_NO_COM_FLAG if self.input_seq == 0 else CIFX_DEV_EXCHANGE_TIMEOUT
+            ctypes.memmove(pvData, (ctypes.c_char * ulDataLen).from_buffer(self.input_area, ulOffset), ulDataLen)
+            self.host_read_seq = self.input_seq
+        return CIFX_NO_ERROR
+
+    def io_write(self, ulOffset, ulDataLen, pvData):
+        if ulOffset + ulDataLen > DPM_IO_AREA_SIZE:
+            return CIFX_INVALID_ACCESS_SIZE
+        with self.cond:
+            lRet = self._check_running()
+            if lRet != CIFX_NO_ERROR:
+                return lRet
+            ctypes.memmove((ctypes.c_char * ulDataLen).from_buffer(self.output_area, ulOffset), pvData, ulDataLen)
+            self.output_seq += 1
+            self.cond.notify_all()
+        return CIFX_NO_ERROR
+
+    def _check_running(self):
+        if self.host_state != CIFX_HOST_STATE_READY:
+            return CIFX_DEV_NOT_READY
+        if self.bus_state != CIFX_BUS_STATE_ON:
+            return CIFX_DEV_NOT_RUNNING
+        return CIFX_NO_ERROR
+
+    def memory_area(self, ulAreaDefinition, ulAreaNumber):
+        """
+        Returns:
+            tuple: (offset of the IO area in the channel DPM, size), or None for an unknown area.
+        """
+        if ulAreaNumber != 0:
+            return None
+        if ulAreaDefinition == CIFX_IO_INPUT_AREA:
+            return DPM_IO_AREA_OFFSET, DPM_IO_AREA_SIZE
+        if ulAreaDefinition == CIFX_IO_OUTPUT_AREA:
+            return DPM_IO_AREA_OFFSET + DPM_IO_AREA_SIZE, DPM_IO_AREA_SIZE
+        return None
+
+    def plc_is_read_ready(self):
+        """
+        Returns:
+            tuple: (cifX error code, True if the host owns an input image it has not released yet)
+        """
+        with self.cond:
+            lRet = self._check_running()
+            if lRet == CIFX_NO_ERROR and not self.plc_input_owned and self.input_seq > self.host_read_seq:
+                self.plc_input_owned = True
+            return lRet, self.plc_input_owned
+
+    def plc_activate_read(self):
+        with self.cond:
+            lRet = self._check_running()
+            if lRet != CIFX_NO_ERROR:
+                return lRet
+            self.plc_input_owned = False
+            self.host_read_seq = self.input_seq
+            if self.pending_input is not None:
+                offset, data = self.pending_input
+                self.pending_input = None
+                self.input_area[offset:offset + len(data)] = data
+                self.input_seq += 1
+                self.cond.notify_all()
+            else:
+                return CIFX_NO_ERROR
+        self.notify(CIFX_NOTIFY_PD0_IN)
+        return CIFX_NO_ERROR
+
+    def plc_is_write_ready(self):
+        # The simulated card takes the output area over immediately on activation
+        with self.cond:
+            lRet = self._check_running()
+            return lRet, lRet == CIFX_NO_ERROR
+
+    def plc_activate_write(self):
+        with self.cond:
+            lRet = self._check_running()
+            if lRet != CIFX_NO_ERROR:
+                return lRet
+            self.output_seq += 1
+            self.cond.notify_all()
+        return CIFX_NO_ERROR
+
+    # --- mailbox ---
+
+    def answer(self, header, data):
+        """
+        Returns:
+            tuple: (ulState, data) of the confirmation to a request packet.
+        """
+        if header.ulCmd == RCX_FIRMWARE_IDENTIFY_REQ:
+            return 0, struct.pack("<4HB63sHBB", *FIRMWARE_VERSION, len(FIRMWARE_NAME), FIRMWARE_NAME, *FIRMWARE_DATE)
+        if header.ulCmd == RCX_GET_COMMON_STATE_REQ:
+            cos = self.information().ulDeviceCOSFlags
+            state = RCX_COMM_STATE_OPERATE if self.communicating else RCX_COMM_STATE_STOP
+            return 0, struct.pack("<III", cos, state, 0).ljust(64, b"\0")
+        return ERR_HIL_UNKNOWN_COMMAND, b""
+
+    def put_packet(self, packet):
+        """
+        Accepts a request from the host and queues the confirmation.
+        """
+        with self.cond:
+            if len(self.mailbox) >= MAILBOX_DEPTH:
+                return CIFX_DEV_MAILBOX_FULL
+            self.put_packet_count += 1
+            ulState, data = self.answer(packet.tHeader, bytes(packet.abData[:packet.tHeader.ulLen]))
+            confirmation = CifXPacket()
+            confirmation.tHeader = packet.tHeader
+            confirmation.tHeader.ulCmd = packet.tHeader.ulCmd + 1
+            confirmation.tHeader.ulState = ulState
+            confirmation.tHeader.ulLen = len(data)
+            confirmation.abData[:len(data)] = data
+            self.mailbox.append(confirmation)
+            self.cond.notify_all()
+        return CIFX_NO_ERROR
+
+    def get_packet(self, ulSize, pvPacket, ulTimeout):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.mailbox, ulTimeout / 1000):
+                return CIFX_DEV_GET_TIMEOUT if ulTimeout else CIFX_DEV_GET_NO_PACKET
+            packet = self.mailbox[0]
+            size = CIFX_PACKET_HEADER_SIZE + packet.tHeader.ulLen
+            if size > ulSize:
+                ctypes.memmove(pvPacket, ctypes.byref(packet), min(ulSize, CIFX_PACKET_HEADER_SIZE))
+                return CIFX_INVALID_BUFFERSIZE
+            self.mailbox.popleft()
+            self.get_packet_count += 1
+            ctypes.memmove(pvPacket, ctypes.byref(packet), size)
+        return CIFX_NO_ERROR
+
+    def information(self):
+        info = ChannelInformation()
+        info.abBoardName = self.board.name.encode('ascii')
+        info.abBoardAlias = self.board.alias.encode('ascii')
+        info.ulDeviceNumber = self.board.device_number
+        info.ulSerialNumber = self.board.serial_number
+        info.usFWMajor, info.usFWMinor, info.usFWBuild, info.usFWRevision = FIRMWARE_VERSION
+        info.bFWNameLength = len(FIRMWARE_NAME)
+        info.abFWName[:len(FIRMWARE_NAME)] = FIRMWARE_NAME
+        info.usFWYear, info.bFWMonth, info.bFWDay = FIRMWARE_DATE
+        info.ulOpenCnt = self.open_count
+        info.ulPutPacketCnt = self.put_packet_count
+        info.ulGetPacketCnt = self.get_packet_count
+        info.ulMailboxSize = CIFX_MAX_PACKET_SIZE
+        info.ulIOInAreaCnt = 1
+        info.ulIOOutAreaCnt = 1
+        info.ulHskSize = 8
+        info.ulDeviceCOSFlags = RCX_COMM_COS_READY
+        if self.bus_state == CIFX_BUS_STATE_ON:
+            info.ulDeviceCOSFlags |= RCX_COMM_COS_RUN | RCX_COMM_COS_BUS_ON
+        info.ulHostCOSFlags = (RCX_APP_COS_APP_READY if self.host_state == CIFX_HOST_STATE_READY else 0) | \
+                              (RCX_APP_COS_BUS_ON if self.bus_state == CIFX_BUS_STATE_ON else 0)
+        return info
+
+
+class SimulatedBoard:
+    """
+    One simulated cifX board.
+
+    The dual-port memory is an anonymous memory map, or a shared file mapping (e.g. in
+    /dev/shm on Linux) when `dpm_file` is given, so another process can act as the card.
+    """
+
+    def __init__(self, name, channel_count=1, device_number=1259410, serial_number=20000, alias="", synchronous=False,
+                 dpm_file=None):
+        if DPM_CHANNEL_OFFSET + channel_count * DPM_CHANNEL_SIZE > DPM_TOTAL_SIZE:
+            raise ValueError(f"{channel_count} channels do not fit into the {DPM_TOTAL_SIZE} byte DPM.")
+        self.name = name
+        self.alias = alias
+        self.device_number = device_number
+        self.serial_number = serial_number
+        self.dpm_file = dpm_file
+        if dpm_file is None:
+            self.dpm = mmap.mmap(-1, DPM_TOTAL_SIZE)
+        else:
+            with open(dpm_file, "a+b") as f:
+                if f.seek(0, 2) < DPM_TOTAL_SIZE:
+                    f.truncate(DPM_TOTAL_SIZE)
+                self.dpm = mmap.mmap(f.fileno(), DPM_TOTAL_SIZE)
+        self.channels = [SimulatedChannel(self, i, synchronous) for i in range(channel_count)]
+
+    def information(self):
+        info = BoardInformation()
+        info.abBoardName = self.name.encode('ascii')
+        info.abBoardAlias = self.alias.encode('ascii')
+        info.ulChannelCnt = len(self.channels)
+        info.ulDpmTotalSize = DPM_TOTAL_SIZE
+        info.tSystemInfo.abCookie[:] = b"netX"
+        info.tSystemInfo.ulDpmTotalSize = DPM_TOTAL_SIZE
+        info.tSystemInfo.ulDeviceNumber = self.device_number
+        info.tSystemInfo.ulSerialNumber = self.serial_number
+        return info
+
+
+class SimulatedCifX:
+    """
+    In-process implementation of the cifX driver API.
+
+    Provides the same functions (and return codes) as cifX32dll for driver, board and
+    channel enumeration, host/bus state and IO read/write, so everything built on the
+    driver can run without a card. Arguments are accepted the way ctypes code passes
+    them to the DLL: ints or ctypes scalars, handles as c_void_p, byref() pointers and
+    ctypes buffers.
+
+    Usage:
+        sim = SimulatedCifX()
+        master = LoopbackMaster(sim.channel("cifX0"), rate_hz=100).start()
+        with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session:
+            ...
+    """
+
+    def __init__(self, boards=None, synchronous=False, notifications=True):
+        """
+        Args:
+            boards: SimulatedBoard instances, defaults to one "cifX0" board with one channel.
+            synchronous (bool): Default IO mode of the default board, see SimulatedChannel.
+            notifications (bool): Support xChannelRegisterNotification. If False it fails,
+                like a driver without interrupt support.
+        """
+        self.boards = list(boards) if boards is not None else [SimulatedBoard("cifX0", synchronous=synchronous)]
+        self.notifications = notifications
+        self._handles = {}
+        self._next_handle = itertools.count(0x1000)
+        self._lock = threading.Lock()
+
+    def channel(self, szBoard, ulChannel=0):
+        """
+        Returns the SimulatedChannel of a board, for driving the master side.
+        """
+        for board in self.boards:
+            if board.name == szBoard:
+                return board.channels[ulChannel]
+        raise KeyError(szBoard)
+
+    def _new_handle(self, obj):
+        with self._lock:
+            handle = next(self._next_handle)
+            self._handles[handle] = obj
+        return handle
+
+    def _lookup(self, hHandle, kind):
+        obj = self._handles.get(_value(hHandle))
+        return obj if isinstance(obj, kind) else None
+
+    # --- driver functions ---
+
+    def xDriverOpen(self, phDriver):
+        target = _target(phDriver)
+        if target is None:
+            return CIFX_INVALID_POINTER
+        target.value = self._new_handle(self)
+        return CIFX_NO_ERROR
+
+    def xDriverClose(self, hDriver):
+        if self._lookup(hDriver, SimulatedCifX) is None:
+            return CIFX_INVALID_HANDLE
+        with self._lock:
+            del self._handles[_value(hDriver)]
+        return CIFX_NO_ERROR
+
+    def xDriverGetInformation(self, hDriver, ulSize, pvDriverInfo):
+        if self._lookup(hDriver, SimulatedCifX) is None:
+            return CIFX_INVALID_HANDLE
+        info = DriverInformation(abDriverVersion=b"cifX Simulator V1.0.0.0", ulBoardCnt=len(self.boards))
+        _copy_struct_to(pvDriverInfo, info, ulSize)
+        return CIFX_NO_ERROR
+
+    def xDriverGetErrorDescription(self, lError, szBuffer, ulBufferLen):
+        lError = ctypes.c_int32(_value(lError)).value
+        description = ERROR_DESCRIPTIONS.get(lError, f"Unknown error 0x{lError & 0xFFFFFFFF:08X}")
+        szBuffer.value = description.encode('ascii')[:_value(ulBufferLen) - 1]
+        return CIFX_NO_ERROR
+
+    def xDriverEnumBoards(self, hDriver, ulBoard, ulSize, pvBoardInfo):
+        if self._lookup(hDriver, SimulatedCifX) is None:
+            return CIFX_INVALID_HANDLE
+        ulBoard = _value(ulBoard)
+        if ulBoard >= len(self.boards):
+            return CIFX_NO_MORE_ENTRIES
+        _copy_struct_to(pvBoardInfo, self.boards[ulBoard].information(), ulSize)
+        return CIFX_NO_ERROR
+
+    def xDriverEnumChannels(self, hDriver, ulBoard, ulChannel, ulSize, pvChannelInfo):
+        if self._lookup(hDriver, SimulatedCifX) is None:
+            return CIFX_INVALID_HANDLE
+        ulBoard, ulChannel = _value(ulBoard), _value(ulChannel)
+        if ulBoard >= len(self.boards):
+            return CIFX_INVALID_BOARD
+        channels = self.boards[ulBoard].channels
+        if ulChannel >= len(channels):
+            return CIFX_NO_MORE_ENTRIES
+        _copy_struct_to(pvChannelInfo, channels[ulChannel].information(), ulSize)
+        return CIFX_NO_ERROR
+
+    # --- channel functions ---
+
+    def xChannelOpen(self, hDriver, szBoard, ulChannel, phChannel):
+        if self._lookup(hDriver, SimulatedCifX) is None:
+            return CIFX_INVALID_HANDLE
+        name = _value(szBoard)
+        name = name.decode('ascii') if isinstance(name, bytes) else name
+        try:
+            channel = self.channel(name, _value(ulChannel))
+        except KeyError:
+            return CIFX_INVALID_BOARD
+        except IndexError:
+            return CIFX_INVALID_CHANNEL
+        target = _target(phChannel)
+        if target is None:
+            return CIFX_INVALID_POINTER
+        channel.open_count += 1
+        target.value = self._new_handle(channel)
+        return CIFX_NO_ERROR
+
+    def xChannelClose(self, hChannel):
+        if self._lookup(hChannel, SimulatedChannel) is None:
+            return CIFX_INVALID_HANDLE
+        with self._lock:
+            del self._handles[_value(hChannel)]
+        return CIFX_NO_ERROR
+
+    def xChannelInfo(self, hChannel, ulSize, pvChannelInfo):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        _copy_struct_to(pvChannelInfo, channel.information(), ulSize)
+        return CIFX_NO_ERROR
+
+    def xChannelHostState(self, hChannel, ulCmd, pulState, ulTimeout):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        ulCmd = _value(ulCmd)
+        if ulCmd not in (0, CIFX_HOST_STATE_READY, CIFX_HOST_STATE_READ):
+            return CIFX_INVALID_COMMAND
+        if ulCmd != CIFX_HOST_STATE_READ:
+            channel.host_state = ulCmd
+            channel.update_com_state()
+        state = _target(pulState)
+        if state is not None:
+            state.value = channel.host_state
+        return CIFX_NO_ERROR
+
+    def xChannelBusState(self, hChannel, ulCmd, pulState, ulTimeout):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        ulCmd = _value(ulCmd)
+        if ulCmd not in (0, CIFX_BUS_STATE_ON, CIFX_BUS_STATE_GETSTATE):
+            return CIFX_INVALID_COMMAND
+        if ulCmd != CIFX_BUS_STATE_GETSTATE:
+            if channel.host_state != CIFX_HOST_STATE_READY:
+                return CIFX_DEV_NOT_READY
+            channel.bus_state = ulCmd
+            channel.update_com_state()
+        state = _target(pulState)
+        if state is not None:
+            state.value = channel.bus_state
+        return CIFX_NO_ERROR
+
+    def xChannelIORead(self, hChannel, ulAreaNumber, ulOffset, ulDataLen, pvData, ulTimeout):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        if _value(ulAreaNumber) != 0:
+            return CIFX_INVALID_PARAMETER
+        return channel.io_read(_value(ulOffset), _value(ulDataLen), pvData, _value(ulTimeout))
+
+    def xChannelIOWrite(self, hChannel, ulAreaNumber, ulOffset, ulDataLen, pvData, ulTimeout):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        if _value(ulAreaNumber) != 0:
+            return CIFX_INVALID_PARAMETER
+        return channel.io_write(_value(ulOffset), _value(ulDataLen), pvData)
+
+    # --- mailbox functions ---
+
+    def xChannelGetMBXState(self, hChannel, pulRecvPktCount, pulSendPktCount):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        recv, send = _target(pulRecvPktCount), _target(pulSendPktCount)
+        if recv is None or send is None:
+            return CIFX_INVALID_POINTER
+        with channel.cond:
+            recv.value = len(channel.mailbox)
+            send.value = int(len(channel.mailbox) < MAILBOX_DEPTH)
+        return CIFX_NO_ERROR
+
+    def xChannelPutPacket(self, hChannel, ptSendPkt, ulTimeout):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        packet = _target(ptSendPkt)
+        if packet is None:
+            return CIFX_INVALID_POINTER
+        if not isinstance(packet, CifXPacket):
+            packet = CifXPacket.from_address(ctypes.addressof(packet))
+        if packet.tHeader.ulLen > CIFX_MAX_DATA_SIZE:
+            return CIFX_INVALID_BUFFERSIZE
+        return channel.put_packet(packet)
+
+    def xChannelGetPacket(self, hChannel, ulSize, ptRecvPkt, ulTimeout):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        if ptRecvPkt is None:
+            return CIFX_INVALID_POINTER
+        return channel.get_packet(_value(ulSize), ptRecvPkt, _value(ulTimeout))
+
+    # --- notification functions ---
+
+    def xChannelRegisterNotification(self, hChannel, ulNotification, pfnCallback, pvUser):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        if not self.notifications:
+            return CIFX_FUNCTION_FAILED
+        if not pfnCallback:
+            return CIFX_INVALID_POINTER
+        ulNotification = _value(ulNotification)
+        if ulNotification in channel.notifications:
+            return CIFX_INVALID_PARAMETER
+        channel.notifications[ulNotification] = (pfnCallback, pvUser)
+        return CIFX_NO_ERROR
+
+    def xChannelUnregisterNotification(self, hChannel, ulNotification):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        if channel.notifications.pop(_value(ulNotification), None) is None:
+            return CIFX_INVALID_PARAMETER
+        return CIFX_NO_ERROR
+
+    # --- PLC (direct DPM access) functions ---
+
+    def xChannelPLCMemoryPtr(self, hChannel, ulCmd, pvMemoryInfo):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        info = _target(pvMemoryInfo)
+        if info is None:
+            return CIFX_INVALID_POINTER
+        ulCmd = _value(ulCmd)
+        if ulCmd == CIFX_MEM_PTR_CLOSE:
+            info.pvMemoryID = None
+            return CIFX_NO_ERROR
+        if ulCmd != CIFX_MEM_PTR_OPEN:
+            return CIFX_INVALID_COMMAND
+        area = channel.memory_area(info.ulAreaDefinition, info.ulAreaNumber)
+        if area is None:
+            return CIFX_INVALID_PARAMETER
+        if not info.ppvMemoryPtr or not info.pulIOAreaStartOffset or not info.pulIOAreaSize:
+            return CIFX_INVALID_POINTER
+        info.pvMemoryID = ctypes.addressof(channel.dpm) + area[0]
+        info.ppvMemoryPtr[0] = ctypes.addressof(channel.dpm)
+        info.pulIOAreaStartOffset[0], info.pulIOAreaSize[0] = area
+        return CIFX_NO_ERROR
+
+    def _plc_state(self, hChannel, ulAreaNumber, pulState, query):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        if _value(ulAreaNumber) != 0:
+            return CIFX_INVALID_PARAMETER
+        state = _target(pulState)
+        if state is None:
+            return CIFX_INVALID_POINTER
+        lRet, ready = query(channel)
+        state.value = int(ready)
+        return lRet
+
+    def xChannelPLCIsReadReady(self, hChannel, ulAreaNumber, pulReadState):
+        return self._plc_state(hChannel, ulAreaNumber, pulReadState, SimulatedChannel.plc_is_read_ready)
+
+    def xChannelPLCIsWriteReady(self, hChannel, ulAreaNumber, pulWriteState):
+        return self._plc_state(hChannel, ulAreaNumber, pulWriteState, SimulatedChannel.plc_is_write_ready)
+
+    def xChannelPLCActivateRead(self, hChannel, ulAreaNumber):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        if _value(ulAreaNumber) != 0:
+            return CIFX_INVALID_PARAMETER
+        return channel.plc_activate_read()
+
+    def xChannelPLCActivateWrite(self, hChannel, ulAreaNumber):
+        channel = self._lookup(hChannel, SimulatedChannel)
+        if channel is None:
+            return CIFX_INVALID_HANDLE
+        if _value(ulAreaNumber) != 0:
+            return CIFX_INVALID_PARAMETER
+        return channel.plc_activate_write()
+
+
+class LoopbackMaster:
+    """
+    Plays the Profibus master for a SimulatedChannel.
+
+    Every frame is a PbBufInWic with an advancing timestamp, the value_16 watchdog
+    incremented by one, and setpoints that change every `setpoint_period` frames.
+    Output images written back by the host are checked for the echoed watchdog; each
+    newly echoed value counts as one complete read -> process -> write round trip.
+
+    Usage:
+        master = LoopbackMaster(sim.channel("cifX0"), rate_hz=500).start()
+        ...
+        master.stop()
+        print(master.round_trips / master.elapsed)
+    """
+
+    def __init__(self, channel, rate_hz=100, setpoint_period=50, start_time=None):
+        """
+        Args:
+            channel (SimulatedChannel): Channel to deliver the frames to.
+            rate_hz (float): Frames per second. 0 or None runs closed loop: each frame is
+                sent as soon as the host has written its answer to the previous one.
+            setpoint_period (int): Number of frames between setpoint changes.
+            start_time (datetime): Timestamp of the first frame, defaults to now.
+        """
+        self.channel = channel
+        self.rate_hz = rate_hz
+        self.setpoint_period = setpoint_period
+        self.frame = PbBufInWic(state1=1, state2=0)
+        self.frames_sent = 0
+        self.round_trips = 0
+        self.elapsed = 0.0
+        self._time = start_time or datetime.now().replace(microsecond=0)
+        self._seconds = 0.0
+        self._last_echo = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._collector = None
+        self._started = 0.0
+
+    def next_frame(self):
+        """
+        Advances the frame to the next master cycle and returns it.
+        """
+        frame = self.frame
+        self.frames_sent += 1
+
+        # Timestamp advances with the frame period
+        self._seconds += 1 / self.rate_hz if self.rate_hz else 0.001
+        now = self._time + timedelta(seconds=int(self._seconds))
+        frame.year, frame.month, frame.day = now.year, now.month, now.day
+        frame.hours, frame.minutes, frame.seconds = now.hour, now.minute, now.second
+
+        # Watchdog ticks every frame
+        frame.value_16 = (frame.value_16 + 1) & 0xFFFF
+
+        # New setpoints and intervals every setpoint_period frames
+        if self.setpoint_period and self.frames_sent % self.setpoint_period == 1:
+            step = self.frames_sent // self.setpoint_period
+            for view, sp in enumerate((frame.sp1, frame.sp2, frame.sp3, frame.sp4)):
+                for track in range(TRACKS_PER_VIEW_MAX):
+                    sp[track] = (100 * (view + 1) + 10 * track + step) & 0xFFFF
+            frame.interval1 = frame.interval2 = frame.interval3 = frame.interval4 = 100 + step % 10
+        return frame
+
+    def send(self):
+        """
+        Delivers the next frame to the channel.
+        """
+        self.channel.deliver_input(bytes(self.next_frame()))
+
+    def _run(self):
+        period_ns = int(1_000_000_000 / self.rate_hz) if self.rate_hz else 0
+        deadline = time.monotonic_ns()
+        while not self._stop.is_set():
+            self.send()
+            if period_ns:
+                deadline += period_ns
+                sleep_until(deadline)
+            else:
+                # Closed loop: the next frame follows as soon as the host answered
+                self._check_echo(self.channel.collect_output(timeout=0.1))
+
+    def _collect(self):
+        while not self._stop.is_set():
+            self._check_echo(self.channel.collect_output(timeout=0.1))
+
+    def _check_echo(self, output):
+        # Every output echoing a watchdog value not seen before completes one round trip
+        if output is None:
+            return
+        offset = PbBufOutWic.value_16.offset
+        echo = int.from_bytes(output[offset:offset + 2], 'little')
+        if echo != self._last_echo and echo != 0:
+            self.round_trips += 1
+            self._last_echo = echo
+
+    def start(self):
+        """
+        Starts sending frames and collecting outputs on background threads.
+        """
+        self._stop.clear()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="LoopbackMaster", daemon=True)
+        self._thread.start()
+        if self.rate_hz:
+            self._collector = threading.Thread(target=self._collect, name="LoopbackMaster-collect", daemon=True)
+            self._collector.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in (self._thread, self._collector):
+            if thread is not None:
+                thread.join()
+        self.elapsed = time.perf_counter() - self._started
@@ -1,8 +1,16 @@
-from utils import get_logger
+from utils import get_logger, enable_async_logging
+import argparse
 import os
 import sys
 import ctypes
-from hilscher import CIFX70E_DP
+import struct
+from contextlib import ExitStack
+from hilscher import CIFX70E_DP, ChannelSession, CifXDriver, ResponseBuilder, EnumerationCache, KeepAlive, InputNotifier, PacketService, parse_firmware_identify, Backoff
+from hilscher.errors import format_error
+from hilscher.notify import NO_DATA_ERRORS
+from hilscher.metrics import MetricsRegistry, CycleMetrics, MetricsServer, SnapshotWriter
+from hilscher.Definitions import PbBufInWic, RCX_FIRMWARE_IDENTIFY_REQ
+from .pipeline import Pipeline, POLICIES, DROP_OLDEST
 
 
 
@@ -24,9 +32,125 @@ application_path = get_application_path()
 print("Application path:", application_path)
 
 
-def main():
+def passthrough(key, slave):
+    """
+    Default processing: no pv/pvq values. The master only gets its header echoed and a
+    zeroed pv/pvq block (see ResponseBuilder.build).
+
+    Args:
+        key (tuple): (szBoard, ulChannel) of the channel the image came from.
+        slave (PbBufInWic): The input image.
+
+    Returns:
+        None
+    """
+    return None
+
+
+def create_pipeline(session, queue_size=2, policy=DROP_OLDEST, metrics=None, keepalive=None, notifier=None, process=passthrough):
+    """
+    Creates the pipelined read -> process -> write loop on an opened channel.
+
+    Args:
+        session (ChannelSession): Opened channel to the Profibus master.
+        queue_size (int): Capacity of the queues between the stages.
+        policy (str): Back-pressure policy of the queues, "drop_oldest" or "block".
+        metrics (CycleMetrics): Receives the stage and cycle times.
+        keepalive (KeepAlive): Started keep-alive owning the channel IO. The pipeline then
+            takes its images from it and only publishes the pv/pvq results.
+        notifier (InputNotifier): Started notifier of the session; the read stage then
+            waits for input notifications instead of polling.
+        process: Callable process(key, slave) returning the pv/pvq values (see
+            ResponseBuilder.build), or None; like ChannelManager's process. Defaults to passthrough().
+
+    Returns:
+        Pipeline: The pipeline, not yet started.
+    """
+    if keepalive is not None:
+        return _create_keepalive_pipeline(keepalive, queue_size, policy, metrics, process)
+
+    builder = ResponseBuilder()
+    key = (session.szBoard, session.ulChannel)
+
+    def read():
+        # The pipeline keeps images across reads, so take a copy of the session's view
+        slave = session.read_input() if notifier is None else notifier.next_input(timeout=0.1)
+        return None if slave is None else PbBufInWic.from_buffer_copy(slave)
+
+    def read_failed():
+        # No new image waited for the IO timeout already; any other error returns at once
+        lLastError = session.lLastError if notifier is None else notifier.lLastError
+        return lLastError not in NO_DATA_ERRORS
+
+    def process_stage(slave):
+        return slave, process(key, slave)
+
+    def write(result):
+        # Only this stage touches the output image
+        slave, values = result
+        builder.build(session.output_image.back_buffer, slave, values)
+        lRet = session.write_output(session.output_image.back)
+        if lRet != CIFX70E_DP.CIFX_NO_ERROR:
+            CIFX70E_DP.show_error(lRet)
+
+    backoff = Backoff(initial=session.ulWaitTimeout / 1000, maximum=1.0)
+    return Pipeline(read, process_stage, write, queue_size, policy, metrics=metrics, read_failed=read_failed, backoff=backoff)
+
+
+def _create_keepalive_pipeline(keepalive, queue_size, policy, metrics, process):
+    # The keep-alive thread echoes the header every bus cycle, so a slow process stage
+    # only delays the results
+    key = (keepalive.session.szBoard, keepalive.session.ulChannel)
+
+    def read():
+        return keepalive.next_input(timeout=0.1)
+
+    def process_stage(frame):
+        return frame, process(key, frame.image)
+
+    def write(result):
+        frame, values = result
+        lRet = keepalive.publish(values, frame.sequence)
+        if lRet != CIFX70E_DP.CIFX_NO_ERROR:
+            CIFX70E_DP.show_error(lRet)
+
+    return Pipeline(read, process_stage, write, queue_size, policy, metrics=metrics)
+
+
+def _log_firmware_identify(future):
+    # Runs on the mailbox thread once the confirmation arrived (or the request failed)
+    app_logger = get_logger()
+    if future.exception() is not None:
+        app_logger.warning(f"Mailbox firmware identify failed: {future.exception()}")
+    elif future.result().tHeader.ulState:
+        app_logger.warning(f"Mailbox firmware identify failed: {format_error(ctypes.c_int32(future.result().tHeader.ulState).value)}")
+    else:
+        app_logger.info(f"Mailbox firmware identify: {parse_firmware_identify(future.result())}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FLS Profibus client.")
+    parser.add_argument("--pipeline", action="store_true", help="Run the pipelined read -> process -> write loop until Ctrl+C")
+    parser.add_argument("--queue-size", type=int, default=2, help="Capacity of the queues between the pipeline stages")
+    parser.add_argument("--policy", choices=POLICIES, default=DROP_OLDEST, help="Pipeline back-pressure policy")
+    parser.add_argument("--keepalive", action="store_true",
+                        help="Echo the master's watchdog every bus cycle on a separate thread, independent of processing (with --pipeline)")
+    parser.add_argument("--notify", action="store_true",
+                        help="Wait for input notifications of the driver instead of polling (falls back to polling if unsupported; not with --keepalive)")
+    parser.add_argument("--mailbox", action="store_true",
+                        help="Query the firmware through the packet mailbox; with --pipeline it is only serviced right after the cyclic writes")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", help="Write a JSON metrics snapshot to this file periodically")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between metrics snapshots")
+    args = parser.parse_args(argv)
+    if args.notify and args.keepalive:
+        # The keep-alive thread reads every bus cycle itself and never waits for notifications
+        parser.error("--notify cannot be combined with --keepalive")
+
     # Initialize global variables
 
+    # Log records are written by a background thread, so logging never waits for the disk
+    enable_async_logging()
     app_logger = get_logger()
     app_logger.info("Program started")
     app_logger.debug("Doing some debug-level work")
@@ -39,12 +163,12 @@ def main():
     szConfigFile = CIFX70E_DP.g_szConfigFile.value.decode('ascii')  # Config path
     ulTimerResolution = CIFX70E_DP.g_ulTimerResolution.value  # Timer resolution
     ulIOTimeout = CIFX70E_DP.g_ulIOTimeout.value  # I/O timeout
-    # Initialize the driver handle
-    CIFXHANDLE = ctypes.c_void_p
-    hDriver = CIFXHANDLE(None)
+    # Initialize the driver facade (declares the cifX API signatures once)
+    driver = CifXDriver(CIFX70E_DP.wic_dll)
+    hDriver = driver.hDriver
 
     # Open the driver
-    if CIFX70E_DP.wic_dll.xDriverOpen(ctypes.byref(hDriver)) != CIFX70E_DP.CIFX_NO_ERROR:
+    if driver.open() != CIFX70E_DP.CIFX_NO_ERROR:
         print("Failed to open cifX70e driver.")
         app_logger.error("Failed to open cifX70e driver.")
         sys.exit(1)
@@ -52,6 +176,22 @@ def main():
         print("cifX70e driver is open.")
         app_logger.info("cifX70e driver is open.")
 
+    # Board info for the log only: read from the on-disk cache, the enumeration itself
+    # (also on a cold start) runs in the background so it never delays the first IO
+    enumeration = EnumerationCache().start(driver, background=True)
+    board = enumeration.find(szBoard)
+    if board is None:
+        app_logger.info(f"Board {szBoard} not in the enumeration cache yet.")
+    else:
+        app_logger.info(f"Board {szBoard}: device {board['device_number']} serial {board['serial_number']}, "
+                        f"firmware {', '.join(channel['firmware'] + ' ' + channel['version'] for channel in board['channels'])}")
+
+    # Cycle metrics: Prometheus endpoint and/or snapshot file
+    registry = MetricsRegistry()
+    metrics = CycleMetrics(registry, channel=f"{szBoard}/0")
+    metrics_server = MetricsServer(registry, args.metrics_port).start() if args.metrics_port is not None else None
+    snapshot_writer = SnapshotWriter(registry, args.metrics_file, args.metrics_interval).start() if args.metrics_file else None
+
     # Perform I/O operations
 
     #images_directory = "C:/Users/tgdev01/Desktop/pijus/cifXTest_Console2/pythonDetect/pythonDetect/2024-09-18/27.09.2024"  # Path
@@ -66,14 +206,51 @@ def main():
        # print("\n--- Begin Operations ---")
 
 
-        # 1. Read operation
-        app_logger.info("\n--- Reading Data ---")
-        CIFX70E_DP.WIC_ReadIOData(hDriver, szBoard, ulIOTimeout)
-        #print("Image Context Data Read:", image_context.data_read) #TODO: Errror?
+        # The channel stays open for all operations, so every exchange only pays for the IO transfer
+        # The services registered on the stack are stopped before the channel closes, also on errors
+        with ChannelSession(driver, szBoard, ulWaitTimeout=ulIOTimeout) as session, ExitStack() as services:
+            session.metrics = metrics
+            # Summaries of repeated errors are written when the channel closes
+            session.reporter = CIFX70E_DP.error_reporter
+            notifier = services.enter_context(InputNotifier(session)) if args.notify else None
+            if notifier is not None:
+                services.callback(lambda: app_logger.info(f"Input notifications ({notifier.mode} mode): {notifier.notifications}"))
+            # In the pipeline, mailbox requests only run right after a cyclic write (write stage or
+            # keep-alive header), so they never delay the exchange. The single read below has no
+            # cyclic exchange to protect, so the mailbox is serviced freely there.
+            mailbox = services.enter_context(PacketService(session, gated=args.pipeline)) if args.mailbox else None
+            if mailbox is not None:
+                services.callback(lambda: app_logger.info(f"Mailbox statistics: {mailbox.statistics()}"))
+                # The request data is the channel to identify
+                identify = mailbox.request(RCX_FIRMWARE_IDENTIFY_REQ, struct.pack("<I", session.ulChannel))
+                identify.add_done_callback(_log_firmware_identify)
+
+            if args.pipeline:
+                keepalive = KeepAlive(session).start() if args.keepalive else None
+                pipeline = create_pipeline(session, args.queue_size, args.policy, metrics, keepalive, notifier)
+                app_logger.info("\n--- Running pipeline ---")
+                try:
+                    pipeline.start()
+                    pipeline.wait()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    try:
+                        pipeline.stop()
+                        if keepalive is not None:
+                            keepalive.stop()
+                            app_logger.info(f"Keep-alive statistics: {keepalive.statistics()}")
+                    finally:
+                        app_logger.info("Pipeline statistics:\n" + pipeline.summary())
+            else:
+                # 1. Read operation
+                app_logger.info("\n--- Reading Data ---")
+                CIFX70E_DP.WIC_ReadIOData(hDriver, szBoard, ulIOTimeout, session=session, notifier=notifier)
+                #print("Image Context Data Read:", image_context.data_read) #TODO: Errror?
 
-        # 2. Process operation
-        app_logger.info("\n--- Processing Data ---")
-        #error_context = ErrorContext(logfile="logfile.txt")
+                # 2. Process operation
+                app_logger.info("\n--- Processing Data ---")
+                #error_context = ErrorContext(logfile="logfile.txt")
 
         """
         if success and result:
@@ -88,7 +265,7 @@ def main():
         # 3. Write operation
         print("\n--- Write Data ---")
         if success and result:
-            CIFX70E_DP.WIC_SendToMaster(hDriver, szBoard, ulIOTimeout, result)
+            CIFX70E_DP.WIC_SendToMaster(hDriver, szBoard, ulIOTimeout, result, session=session)
             image_context.increment_write()
             print("Write Operation Completed.")
             # Increment overall operation ID if all steps succeed
@@ -112,9 +289,16 @@ def main():
         # Save counters to the file
         app_logger.info("Operation haved finished")
 
+        CIFX70E_DP.error_reporter.flush()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if snapshot_writer is not None:
+            snapshot_writer.stop()
+
         # Close the driver
-        if hDriver:
-            CIFX70E_DP.wic_dll.xDriverClose(hDriver)
+        enumeration.wait()
+        if driver.is_open:
+            driver.close()
             print("cifX70e driver closed.")
             app_logger.info("cifX70e driver closed.")
         print(3)
@@ -0,0 +1,274 @@
+"""
+Pipelined read -> process -> write engine.
+
+Each stage runs on its own thread and the stages are connected by bounded queues, so
+the result of cycle N is written while cycle N+1 is processed and cycle N+2 is read.
+"""
+import threading
+import time
+from collections import deque
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+POLICIES = (BLOCK, DROP_OLDEST)
+
+
+class BoundedQueue:
+    """
+    Bounded FIFO between two stages.
+
+    When the queue is full, put() either waits for space (BLOCK) or discards the oldest
+    queued item (DROP_OLDEST), so a slow consumer always gets the newest data.
+    """
+
+    def __init__(self, maxsize, policy=BLOCK):
+        if maxsize < 1:
+            raise ValueError(f"Queue size must be at least 1, got {maxsize}.")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown back-pressure policy '{policy}', expected one of {POLICIES}.")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def close(self):
+        """
+        Wakes up all waiting put() / get() calls; later calls return immediately.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def put(self, item):
+        """
+        Returns:
+            bool: False if the queue was closed before the item could be queued.
+        """
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+            if self._closed:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Returns:
+            The oldest item, or None on timeout or when the queue was closed.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout) or not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+
+class StageStats:
+    """
+    Latency counters of one pipeline stage.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_ns = 0
+
+    def record(self, duration_ns):
+        self.count += 1
+        self.total_ns += duration_ns
+        self.last_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    @property
+    def mean_us(self):
+        return self.total_ns / self.count / 1000 if self.count else 0.0
+
+    def __str__(self):
+        return f"{self.name}: count={self.count} mean={self.mean_us:.1f}us max={self.max_ns / 1000:.1f}us"
+
+
+class Pipeline:
+    """
+    Runs read, process and write as three overlapping stages.
+
+    read() must return an image the pipeline may keep (not a view into a driver buffer
+    that is overwritten by the next read), or None if nothing was read. process(image)
+    returns the result handed to write(result); None results are not written.
+
+    Besides the time spent in each stage, `latency` records the age of each result
+    when its write finishes, i.e. the delay from the arrival of the image to its response.
+
+    Usage:
+        pipeline = Pipeline(read, process, write, queue_size=2, policy=DROP_OLDEST)
+        pipeline.start()
+        ...
+        pipeline.stop()
+        print(pipeline.summary())
+    """
+
+    def __init__(self, read, process, write, queue_size=2, policy=DROP_OLDEST, clock=time.perf_counter_ns, metrics=None,
+                 read_failed=None, backoff=None):
+        """
+        Args:
+            read: Callable returning the next input image, or None.
+            process: Callable turning an input image into a result.
+            write: Callable sending a result.
+            queue_size (int): Capacity of each queue between two stages.
+            policy (str): Back-pressure policy of the queues, DROP_OLDEST or BLOCK.
+            clock: Clock in nanoseconds used for the latency counters.
+            metrics (hilscher.metrics.CycleMetrics): Also receives the stage times, and the
+                read -> write latency as cycle duration.
+            read_failed: Callable telling, after read() returned None, whether the read failed
+                rather than found no new image. Failed reads usually return at once, so
+                the read stage then waits on `backoff` instead of retrying in a tight loop.
+            backoff (hilscher.errors.Backoff): Delays between failed reads; reset by the next
+                successful read.
+        """
+        self.read = read
+        self.process = process
+        self.write = write
+        self.clock = clock
+        self.metrics = metrics
+        self.read_failed = read_failed
+        self.backoff = backoff
+        self.to_process = BoundedQueue(queue_size, policy)
+        self.to_write = BoundedQueue(queue_size, policy)
+        self.stats = {name: StageStats(name) for name in ("read", "process", "write")}
+        self.latency = StageStats("read->write")
+        self.error = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        """
+        Starts the stage threads.
+        """
+        if self.running:
+            return self
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run_stage, args=(stage,), name=f"pipeline-{stage.__name__}", daemon=True)
+            for stage in (self._read_stage, self._process_stage, self._write_stage)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stops all stages and waits for their threads.
+
+        Raises:
+            Exception: The first exception raised by a stage, if any.
+        """
+        self._stop.set()
+        self.to_process.close()
+        self.to_write.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        if self.error is not None:
+            raise self.error
+
+    def wait(self, timeout=None):
+        """
+        Waits until a stage fails or stop() is called from another thread.
+
+        Returns:
+            bool: True if the pipeline has stopped.
+        """
+        return self._stop.wait(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def _run_stage(self, stage):
+        try:
+            stage()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+            self._stop.set()
+            self.to_process.close()
+            self.to_write.close()
+
+    def _read_stage(self):
+        stats = self.stats["read"]
+        while not self._stop.is_set():
+            start = self.clock()
+            image = self.read()
+            end = self.clock()
+            if image is None:
+                if self.backoff is not None and self.read_failed is not None and self.read_failed():
+                    self.backoff.wait(self._stop)
+                continue
+            if self.backoff is not None:
+                self.backoff.reset()
+            stats.record(end - start)
+            if self.metrics is not None:
+                self.metrics.observe_stage("read", end - start)
+            self.to_process.put((end, image))
+
+    def _process_stage(self):
+        stats = self.stats["process"]
+        while not self._stop.is_set():
+            item = self.to_process.get(0.1)
+            if item is None:
+                continue
+            read_ns, image = item
+            start = self.clock()
+            result = self.process(image)
+            duration = self.clock() - start
+            stats.record(duration)
+            if self.metrics is not None:
+                self.metrics.observe_stage("process", duration)
+            if result is not None:
+                self.to_write.put((read_ns, result))
+
+    def _write_stage(self):
+        stats = self.stats["write"]
+        while not self._stop.is_set():
+            item = self.to_write.get(0.1)
+            if item is None:
+                continue
+            read_ns, result = item
+            start = self.clock()
+            self.write(result)
+            end = self.clock()
+            stats.record(end - start)
+            self.latency.record(end - read_ns)
+            if self.metrics is not None:
+                self.metrics.observe_stage("write", end - start)
+                self.metrics.cycle_done(end, end - read_ns)
+
+    def summary(self):
+        """
+        Returns:
+            str: One line per stage plus the queue drop counters.
+        """
+        lines = [str(stats) for stats in self.stats.values()]
+        lines.append(str(self.latency))
+        lines.append(f"dropped: to_process={self.to_process.dropped} to_write={self.to_write.dropped}")
+        return "\n".join(lines)
@@ -1 +1,2 @@
-from .text_logger import get_logger
\ No newline at end of file
+from .text_logger import get_logger, get_file_handler
+from .text_logger import enable_async_logging, disable_async_logging, QueueLogHandler
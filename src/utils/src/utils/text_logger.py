@@ -1,7 +1,11 @@
 import os
 import sys
-import inspect
+import gzip
+import atexit
+import shutil
 import logging
+import threading
+from collections import deque
 from pathlib import Path
 
 # --- PATH HELPERS ---
@@ -52,29 +56,88 @@ def create_logfile_name(sub_dir: str = 'log', suffix: str = '.log', alternate_fu
 
 class RotatingTextFileHandler(logging.FileHandler):
     """
-    Simple line-count based rotating file handler.
-    When the number of lines exceeds max_lines, it clears the file.
+    Line-count and size based rotating file handler.
+
+    When the file reaches max_lines lines (or max_bytes bytes) it is rotated: with
+    backup_count == 0 the file is cleared, otherwise it is renamed to <file>.1 and older
+    backups are shifted up to <file>.<backup_count>. Backups can be gzip-compressed on a
+    background thread, and max_total_bytes caps the disk space of all backups together.
+
+    Line and size counts are kept incrementally. The line count of a file that already
+    exists at startup is estimated from its size and its last block, so opening a large
+    log takes constant time.
     """
-    def __init__(self, filename, max_lines=1000, mode='a', encoding=None, delay=False):
+    def __init__(self, filename, max_lines=1000, mode='a', encoding=None, delay=False,
+                 max_bytes=0, backup_count=0, compress=False, max_total_bytes=0):
+        """
+        Parameters:
+        - max_lines: int
+            Rotate after this many lines, 0 for no line limit.
+        - max_bytes: int
+            Rotate after about this many bytes (encoded, as on disk), 0 for no size limit.
+        - backup_count: int
+            Number of numbered backups to keep, 0 to clear the file instead.
+        - compress: bool
+            Gzip backups on a background thread (<file>.1.gz, ...).
+        - max_total_bytes: int
+            Delete the oldest backups while all backups together are larger, 0 for no cap.
+        """
         super().__init__(filename, mode, encoding, delay)
         self.filename = filename
         self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.max_total_bytes = max_total_bytes
+        self.byte_count = self._get_existing_size()
         self.line_count = self._get_existing_line_count()
+        self._housekeeping = None
 
     def emit(self, record):
-        if self.line_count >= self.max_lines:
-            self._reset_file()
-        super().emit(record)
-        self.line_count += 1
+        if self._should_rotate():
+            self._rotate()
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            line = self.format(record) + self.terminator
+            self.stream.write(line)
+            self.flush()
+            self.line_count += 1
+            self.byte_count += self._encoded_size(line)
+        except Exception:
+            self.handleError(record)
+
+    def _encoded_size(self, text):
+        # Size on disk: the stream's encoding plus the newline translation of text mode
+        size = len(text.encode(self.stream.encoding or 'utf-8', errors='replace'))
+        return size + (len(os.linesep) - 1) * text.count('\n')
+
+    def _should_rotate(self):
+        return ((self.max_lines and self.line_count >= self.max_lines)
+                or (self.max_bytes and self.byte_count >= self.max_bytes))
+
+    def _get_existing_size(self):
+        try:
+            return os.path.getsize(self.filename)
+        except OSError:
+            return 0
 
-    def _get_existing_line_count(self):
-        if not os.path.exists(self.filename):
+    def _get_existing_line_count(self, block_size=4096):
+        # Estimate from the average line length of the last block instead of reading the whole file
+        if self.byte_count == 0:
             return 0
         try:
-            with open(self.filename, 'r', encoding=self.encoding or 'utf-8') as f:
-                return sum(1 for _ in f)
+            with open(self.filename, 'rb') as f:
+                f.seek(max(0, self.byte_count - block_size))
+                block = f.read(block_size)
         except Exception:
             return 0
+        if len(block) == self.byte_count:
+            return block.count(b'\n')
+        # Skip the partial line at the start of the block
+        sample = block[block.find(b'\n') + 1:]
+        lines = sample.count(b'\n')
+        return round(self.byte_count * lines / len(sample)) if lines else 0
 
     def _reset_file(self):
         try:
@@ -84,37 +147,405 @@ class RotatingTextFileHandler(logging.FileHandler):
                 f.truncate(0)
             self.stream = self._open()
             self.line_count = 0
+            self.byte_count = 0
         except Exception as e:
             print(f"Failed to reset log file: {e}")
 
+    def backup_name(self, index):
+        """
+        Returns the path of backup number index (1 is the newest). With compress, a backup
+        whose compression failed keeps its uncompressed name.
+        """
+        name = f"{self.filename}.{index}"
+        if self.compress and not os.path.exists(name):
+            return name + ".gz"
+        return name
+
+    def _remove_backup(self, index):
+        # Either kind, so a leftover of a failed compression does not outlive the backup count
+        for name in (f"{self.filename}.{index}", f"{self.filename}.{index}.gz"):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            self._reset_file()
+            return
+
+        # Backups are only shifted after the previous compression has finished
+        if self._housekeeping is not None:
+            self._housekeeping.join()
+        try:
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            for index in range(self.backup_count - 1, 0, -1):
+                source = self.backup_name(index)
+                if os.path.exists(source):
+                    self._remove_backup(index + 1)
+                    os.replace(source, f"{self.filename}.{index + 1}" + (".gz" if source.endswith(".gz") else ""))
+            rotated = f"{self.filename}.1"
+            os.replace(self.filename, rotated)
+            self.stream = self._open()
+            self.line_count = 0
+            self.byte_count = 0
+        except Exception as e:
+            print(f"Failed to rotate log file: {e}")
+            if self.stream is None:
+                self.stream = self._open()
+            return
+
+        if self.compress:
+            self._housekeeping = threading.Thread(target=self._compress_and_cap, args=(rotated,), name="log-compress", daemon=True)
+            self._housekeeping.start()
+        else:
+            self._cap_backups()
+
+    def _compress_and_cap(self, rotated):
+        try:
+            with open(rotated, 'rb') as source, gzip.open(rotated + ".gz", 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        except Exception as e:
+            # The uncompressed backup stays in the sequence (see backup_name())
+            print(f"Failed to compress log file: {e}")
+            try:
+                if os.path.exists(rotated + ".gz"):
+                    os.remove(rotated + ".gz")
+            except OSError:
+                pass
+        self._cap_backups()
+
+    def _cap_backups(self):
+        if not self.max_total_bytes:
+            return
+        total = 0
+        for index in range(1, self.backup_count + 1):
+            name = self.backup_name(index)
+            try:
+                total += os.path.getsize(name)
+            except OSError:
+                continue
+            if total > self.max_total_bytes:
+                try:
+                    os.remove(name)
+                except OSError as e:
+                    print(f"Failed to remove log backup: {e}")
+
+    def emit_batch(self, records):
+        """
+        Writes several records with one write and one flush.
+        """
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            lines = []
+            for record in records:
+                if self._should_rotate():
+                    self.stream.write("".join(lines))
+                    lines = []
+                    self._rotate()
+                line = self.format(record) + self.terminator
+                lines.append(line)
+                self.line_count += 1
+                self.byte_count += self._encoded_size(line)
+            self.stream.write("".join(lines))
+            self.flush()
+        except Exception:
+            for record in records:
+                self.handleError(record)
+
+    def close(self):
+        if self._housekeeping is not None:
+            self._housekeeping.join()
+        super().close()
+
+
+# --- ASYNCHRONOUS LOGGING ---
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class QueueLogHandler(logging.Handler):
+    """
+    Handler that only queues records; a background thread writes them to the target handlers.
+
+    emit() does not touch the disk or the console. The queue is bounded; when it is full
+    the overflow policy decides what happens:
+    - DROP_NEWEST: the new record is discarded.
+    - DROP_OLDEST: the oldest queued record is discarded.
+    - BLOCK: the caller waits for space (only use where latency does not matter).
+    Discarded records are counted in `dropped`.
+
+    The message is merged with its arguments in the writer thread, not in emit(): pass
+    copies of mutable objects that change right after the call.
+
+    The writer thread drains the queue in batches and hands each batch to the targets,
+    using emit_batch() where a target provides it (one write and flush per batch).
+    """
+    def __init__(self, targets, maxsize=10000, policy=DROP_NEWEST, batch_size=256, flush_interval=0.1):
+        """
+        Parameters:
+        - targets: list of logging.Handler
+            Handlers the records are finally written to.
+        - maxsize: int
+            Maximum number of queued records.
+        - policy: str
+            Overflow policy, DROP_NEWEST, DROP_OLDEST or BLOCK.
+        - batch_size: int
+            Maximum number of records written per batch.
+        - flush_interval: float
+            Seconds the writer waits for more records before writing a partial batch.
+        """
+        if policy not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy '{policy}'.")
+        super().__init__()
+        self.targets = list(targets)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = deque()
+        self._dropped_lock = threading.Lock()
+        self._space = threading.Condition()
+        self._wakeup = threading.Event()
+        self._flush_waiters = deque()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        queue = self._queue
+        if len(queue) >= self.maxsize:
+            if self.policy == DROP_NEWEST:
+                self._count_dropped()
+                return
+            if self.policy == DROP_OLDEST:
+                try:
+                    queue.popleft()
+                    self._count_dropped()
+                except IndexError:
+                    pass
+            else:
+                with self._space:
+                    self._space.wait_for(lambda: len(queue) < self.maxsize or self._stop)
+        queue.append(record)
+        # Only the record completing a batch wakes the writer; the rest wait for flush_interval
+        if len(queue) == self.batch_size:
+            self._wakeup.set()
+
+    def _count_dropped(self):
+        # Several threads may log at once; += on an attribute is not atomic
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def handle(self, record):
+        # Unlike logging.Handler.handle(), no handler lock is taken on the caller's side
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            # Waiters registered before the drain only wait for records queued before them
+            waiters = []
+            while self._flush_waiters:
+                waiters.append(self._flush_waiters.popleft())
+            self._drain()
+            for waiter in waiters:
+                waiter.set()
+            if self._stop:
+                self._drain()
+                while self._flush_waiters:
+                    self._flush_waiters.popleft().set()
+                return
+
+    def _drain(self):
+        queue = self._queue
+        while queue:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(queue.popleft())
+            except IndexError:
+                pass
+            if self.policy == BLOCK:
+                with self._space:
+                    self._space.notify_all()
+            self._write(batch)
+
+    def _write(self, batch):
+        for target in self.targets:
+            records = [record for record in batch if record.levelno >= target.level and target.filter(record)]
+            if not records:
+                continue
+            try:
+                emit_batch = getattr(target, "emit_batch", None)
+                if emit_batch is not None:
+                    with target.lock:
+                        emit_batch(records)
+                else:
+                    for record in records:
+                        target.handle(record)
+            except Exception:
+                # A failing target must not stop the writer thread
+                self.handleError(records[0])
+        self.written += len(batch)
+
+    def flush(self, timeout=None):
+        """
+        Waits until all records queued so far have been written.
+        """
+        if threading.current_thread() is self._thread or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._flush_waiters.append(done)
+        self._wakeup.set()
+        done.wait(timeout)
+
+    def close(self):
+        """
+        Writes the remaining records, stops the writer thread and closes the targets.
+        """
+        if not self._stop:
+            self._stop = True
+            self._wakeup.set()
+            with self._space:
+                self._space.notify_all()
+            self._thread.join()
+            for target in self.targets:
+                target.close()
+        super().close()
+
+
 # --- LOGGER SETUP ---
 
 _logger_registry = {}
+_async_handler = None
+_file_handler = None
+_setup_lock = threading.RLock()
+
+# Rotation of the shared log file: numbered, compressed backups within a total disk cap
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 10
+LOG_MAX_TOTAL_BYTES = 50 * 1024 * 1024
 
-def get_logger(level=logging.DEBUG):
+
+def _create_file_handler():
+    log_path = create_logfile_name(sub_dir='log', suffix='.log')
+    os.makedirs(log_path.parent, exist_ok=True)
+    handler = RotatingTextFileHandler(log_path, max_lines=0, encoding='utf-8', max_bytes=LOG_MAX_BYTES,
+                                      backup_count=LOG_BACKUP_COUNT, compress=True, max_total_bytes=LOG_MAX_TOTAL_BYTES)
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    handler.setFormatter(formatter)
+    return handler
+
+
+def enable_async_logging(maxsize=10000, policy=DROP_NEWEST, batch_size=256, flush_interval=0.1, console=False):
     """
-    Returns a logger named after the calling module.
-    Creates it with a RotatingTextFileHandler if not already created.
+    Switches get_logger() to asynchronous logging.
+
+    All loggers of get_logger(), existing and created afterwards, log through one shared
+    QueueLogHandler, whose writer thread writes to the log file (and to the console if
+    requested). Logging calls then only queue the record, so a slow disk or console
+    cannot delay the caller.
+
+    Parameters:
+    - maxsize, policy, batch_size, flush_interval:
+        See QueueLogHandler.
+    - console: bool
+        Also write the records to stdout from the writer thread.
+
+    Returns:
+    - handler: QueueLogHandler
+        The shared handler; its `dropped` counter tells how many records were discarded.
+    """
+    global _async_handler
+    with _setup_lock:
+        if _async_handler is None:
+            file_handler = get_file_handler()
+            targets = [file_handler]
+            if console:
+                stream_handler = logging.StreamHandler(sys.stdout)
+                stream_handler.setFormatter(file_handler.formatter)
+                targets.append(stream_handler)
+            _async_handler = QueueLogHandler(targets, maxsize, policy, batch_size, flush_interval)
+            _switch_handler(file_handler, _async_handler)
+            atexit.register(disable_async_logging)
+    return _async_handler
+
+
+def disable_async_logging():
+    """
+    Writes all queued records and stops the writer thread.
+    The loggers write to the log file directly again, so records logged afterwards
+    (e.g. by other exit handlers) are not lost.
+    """
+    global _async_handler
+    with _setup_lock:
+        if _async_handler is None:
+            return
+        handler, _async_handler = _async_handler, None
+        _switch_handler(handler, get_file_handler())
+    handler.close()
+
+
+def _switch_handler(old, new):
+    # Replaces old by new on every logger created by get_logger()
+    for logger in _logger_registry.values():
+        if old in logger.handlers:
+            logger.removeHandler(old)
+            logger.addHandler(new)
+
+
+def get_file_handler():
+    """
+    Returns the RotatingTextFileHandler shared by all loggers, creating it on first use.
+    One handler per process keeps the line count and rotation of the log file consistent.
     """
-    caller_frame = inspect.stack()[1]
-    module = inspect.getmodule(caller_frame[0])
-    module_name = module.__name__ if module else "UnknownModule"
+    global _file_handler
+    with _setup_lock:
+        if _file_handler is None:
+            _file_handler = _create_file_handler()
+    return _file_handler
 
-    if module_name in _logger_registry:
-        return _logger_registry[module_name]
 
-    logger = logging.getLogger(module_name)
-    logger.setLevel(level)
+def get_logger(level=logging.DEBUG, name=None):
+    """
+    Returns a logger named after the calling module (or the given name).
+    Creates it with the shared RotatingTextFileHandler if not already created, or with the
+    shared asynchronous handler if enable_async_logging() was called.
+
+    Parameters:
+    - level: int
+        Level of a newly created logger.
+    - name: str
+        Logger name, e.g. a component name. Defaults to the caller's module name, which is
+        read from the caller's frame without inspecting the whole stack.
+    """
+    if name is None:
+        name = sys._getframe(1).f_globals.get("__name__") or "UnknownModule"
 
-    if not logger.hasHandlers():
-        log_path = create_logfile_name(sub_dir='log', suffix='.log')
-        os.makedirs(log_path.parent, exist_ok=True)
-        handler = RotatingTextFileHandler(log_path, max_lines=1000)
-        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+    logger = _logger_registry.get(name)
+    if logger is not None:
+        return logger
 
-    _logger_registry[module_name] = logger
+    with _setup_lock:
+        logger = _logger_registry.get(name)
+        if logger is not None:
+            return logger
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        if not logger.hasHandlers():
+            logger.addHandler(_async_handler if _async_handler is not None else get_file_handler())
+        _logger_registry[name] = logger
     return logger
 
 # --- TESTING MAIN ---
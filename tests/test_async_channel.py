@@ -0,0 +1,44 @@
+import asyncio
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic, CIFX_NO_ERROR
+from profibus.hilscher.src.hilscher.async_channel import AsyncChannel
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX
+
+
+def test_images_overlap_with_other_coroutines():
+    sim = SimulatedCifX(synchronous=True)
+    channel = sim.channel("cifX0")
+
+    async def master():
+        for value in (1, 1, 2, 3):
+            await asyncio.sleep(0.02)
+            channel.deliver_input(bytes(PbBufInWic(value_16=value)))
+
+    async def run():
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        with CifXDriver(sim) as driver:
+            async with AsyncChannel(driver, "cifX0", ulWaitTimeout=5) as io:
+                tasks = [asyncio.create_task(master()), asyncio.create_task(ticker())]
+                received = []
+                async for slave in io.images():
+                    received.append(slave.value_16)
+                    assert await io.write_image(PbBufOutWic(value_16=slave.value_16)) == CIFX_NO_ERROR
+                    if len(received) == 3:
+                        break
+                for task in tasks:
+                    task.cancel()
+            assert not io.is_open
+        return received, ticks
+
+    received, ticks = asyncio.run(run())
+
+    assert received == [1, 2, 3]
+    assert PbBufOutWic.from_buffer_copy(channel.collect_output()).value_16 == 3
+    assert ticks > 10
@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+
+from src.utils.src.utils.text_logger import QueueLogHandler, RotatingTextFileHandler, DROP_NEWEST, DROP_OLDEST
+
+
+class SlowHandler(logging.Handler):
+    """
+    Target that blocks until released, like a stalled disk.
+    """
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.unblock.wait()
+        self.messages.append(record.getMessage())
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    return logger
+
+
+def test_records_are_written_in_batches(tmp_path):
+    target = RotatingTextFileHandler(tmp_path / "async.log", max_lines=1000)
+    target.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    handler = QueueLogHandler([target], batch_size=16)
+    logger = _logger("test_async_batches", handler)
+
+    for i in range(100):
+        logger.info("cycle %d", i)
+    handler.flush()
+
+    lines = (tmp_path / "async.log").read_text().splitlines()
+    assert lines[0] == "INFO cycle 0"
+    assert lines[-1] == "INFO cycle 99"
+    assert handler.written == 100
+    handler.close()
+    logger.removeHandler(handler)
+
+
+def test_slow_target_does_not_block_logging():
+    target = SlowHandler()
+    handler = QueueLogHandler([target], maxsize=10, policy=DROP_NEWEST, batch_size=1, flush_interval=0.01)
+    logger = _logger("test_async_drop_newest", handler)
+
+    start = time.perf_counter()
+    for i in range(100):
+        logger.info("record %d", i)
+    elapsed = time.perf_counter() - start
+
+    target.unblock.set()
+    handler.close()
+    logger.removeHandler(handler)
+
+    assert elapsed < 0.1
+    assert handler.dropped >= 89
+    assert handler.written + handler.dropped == 100
+    assert target.messages[0] == "record 0"
+
+
+def test_drop_oldest_keeps_latest_records():
+    target = SlowHandler()
+    handler = QueueLogHandler([target], maxsize=5, policy=DROP_OLDEST, batch_size=1, flush_interval=0.01)
+    logger = _logger("test_async_drop_oldest", handler)
+
+    logger.info("first")
+    time.sleep(0.05)    # the writer is now stuck in the target with "first"
+    for i in range(20):
+        logger.info("record %d", i)
+
+    target.unblock.set()
+    handler.close()
+    logger.removeHandler(handler)
+
+    assert handler.dropped == 15
+    assert target.messages == ["first"] + [f"record {i}" for i in range(15, 20)]
@@ -0,0 +1,43 @@
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic
+from profibus.hilscher.src.hilscher.change import Change, ChangeDetector
+
+
+def test_update_classifies_changed_groups():
+    detector = ChangeDetector()
+    slave = PbBufInWic(year=2025, value_16=1)
+
+    assert detector.update(slave) == Change.ALL
+    assert detector.update(slave) == Change.NONE
+
+    slave.value_16 = 2
+    assert detector.update(slave) == Change.WATCHDOG
+
+    slave.value_16 = 3
+    slave.seconds = 1
+    assert detector.update(slave) == Change.WATCHDOG | Change.TIMESTAMP
+
+    slave.sp4[7] = 500
+    slave.interval1 = 100
+    assert detector.update(slave) == Change.SETPOINTS | Change.INTERVALS
+
+
+def test_gate_processes_only_relevant_changes():
+    detector = ChangeDetector()
+    calls = []
+
+    def process(image):
+        calls.append(image.sp1[0])
+        return len(calls)
+
+    gated = detector.gate(process)
+    slave = PbBufInWic()
+    results = []
+    for frame in range(6):
+        slave.value_16 = frame
+        if frame == 3:
+            slave.sp1[0] = 42
+        results.append(gated(slave))
+
+    assert calls == [0, 42]
+    assert results == [1, 1, 1, 2, 2, 2]
+    assert (detector.processed, detector.skipped) == (2, 4)
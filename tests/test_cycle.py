@@ -0,0 +1,58 @@
+import time
+
+from profibus.hilscher.src.hilscher.cycle import CycleScheduler, sleep_until
+
+
+class FakeClock:
+    """
+    Monotonic clock that only advances when the scheduler sleeps or a stage does work.
+    """
+    def __init__(self):
+        self.now = 1_000_000_000
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, deadline_ns):
+        self.now = max(self.now, deadline_ns)
+
+
+def test_deadlines_do_not_drift():
+    clock = FakeClock()
+    starts = []
+
+    def read():
+        starts.append(clock.now)
+        clock.now += 3_000_000  # every cycle takes 3 ms of work
+        return "image"
+
+    scheduler = CycleScheduler(10, read, clock=clock, sleep=clock.sleep)
+    stats = scheduler.run(cycles=5)
+
+    assert [b - a for a, b in zip(starts, starts[1:])] == [10_000_000] * 4
+    assert stats.cycles == 5
+    assert stats.overruns == 0
+    assert stats.summary()["jitter_max_us"] == 0
+
+
+def test_overrun_skips_missed_deadlines():
+    clock = FakeClock()
+    written = []
+
+    def process(image):
+        clock.now += 25_000_000  # longer than two periods
+        return image + 1
+
+    scheduler = CycleScheduler(10, lambda: 1, process, written.append, clock=clock, sleep=clock.sleep)
+    stats = scheduler.run(cycles=2)
+
+    assert written == [2, 2]
+    assert stats.overruns == 2
+    assert stats.skipped == 3
+    assert stats.summary()["jitter_max_us"] == 5000
+
+
+def test_sleep_until_absolute_deadline():
+    deadline = time.monotonic_ns() + 2_000_000
+    sleep_until(deadline)
+    assert time.monotonic_ns() >= deadline
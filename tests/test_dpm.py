@@ -0,0 +1,56 @@
+import ctypes
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic, CIFX_NO_ERROR, CIFX_DEV_EXCHANGE_TIMEOUT
+from profibus.hilscher.src.hilscher.dpm import DirectChannel
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.response import PvBlock, ResponseBuilder
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX, SimulatedBoard, DPM_CHANNEL_OFFSET, DPM_IO_AREA_OFFSET, DPM_IO_AREA_SIZE
+
+
+def test_images_are_overlaid_on_the_dpm():
+    sim = SimulatedCifX()
+    channel = sim.channel("cifX0")
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=5) as session, \
+            DirectChannel(session) as dpm:
+        assert ctypes.addressof(dpm.input) == ctypes.addressof(channel.dpm) + DPM_IO_AREA_OFFSET
+
+        assert dpm.read_input() is None
+        assert dpm.lLastError == CIFX_DEV_EXCHANGE_TIMEOUT
+
+        channel.deliver_input(bytes(PbBufInWic(state1=1, value_16=10)))
+        slave = dpm.read_input()
+        assert slave is dpm.input
+        assert slave.value_16 == 10
+
+        # The card does not touch the input area until the host releases it
+        channel.deliver_input(bytes(PbBufInWic(state1=1, value_16=11)))
+        assert dpm.input.value_16 == 10
+
+        values = PvBlock()
+        values[1][0][3] = 33
+        assert dpm.write_ready()
+        ResponseBuilder().build(dpm.output_buffer, slave, values)
+        assert dpm.activate_write() == CIFX_NO_ERROR
+        master = PbBufOutWic.from_buffer_copy(channel.collect_output(timeout=1))
+        assert (master.value_16, master.pv2[3]) == (10, 33)
+
+        assert dpm.release_input() == CIFX_NO_ERROR
+        assert dpm.read_input().value_16 == 11
+        dpm.release_input()
+
+    assert not dpm.is_mapped
+    assert dpm.input is None
+
+
+def test_dpm_file_is_shared(tmp_path):
+    path = tmp_path / "cifX0.dpm"
+    sim = SimulatedCifX([SimulatedBoard("cifX0", dpm_file=path)])
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session, DirectChannel(session) as dpm:
+        dpm.output.value_16 = 0x1234
+        dpm.activate_write()
+        sim.boards[0].dpm.flush()
+
+    data = path.read_bytes()
+    output = DPM_CHANNEL_OFFSET + DPM_IO_AREA_OFFSET + DPM_IO_AREA_SIZE
+    assert PbBufOutWic.from_buffer_copy(data, output).value_16 == 0x1234
@@ -0,0 +1,50 @@
+import ctypes
+
+import pytest
+
+from benchmarks.cifx_stub import build_stub, load_stub
+from profibus.hilscher.src.hilscher.Definitions import PbBufOutWic, CIFX_NO_ERROR
+from profibus.hilscher.src.hilscher.driver import CifXDriver, CIFX_API_SIGNATURES
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.backend import load_backend
+
+
+@pytest.fixture(scope="module")
+def stub_library(tmp_path_factory):
+    library = build_stub(tmp_path_factory.mktemp("cifx_stub"))
+    if library is None:
+        pytest.skip("no C compiler available to build the cifX stub")
+    return library
+
+
+def test_signatures_are_declared(stub_library):
+    driver = CifXDriver(load_stub(stub_library))
+    restype, argtypes = CIFX_API_SIGNATURES["xChannelIORead"]
+    assert driver.dll.xChannelIORead.argtypes == argtypes
+    assert driver.dll.xChannelIORead.restype is restype
+
+
+def test_dll_backend_declares_signatures(stub_library):
+    dll = load_backend("dll", library=str(stub_library))
+    assert dll.xChannelOpen.argtypes == CIFX_API_SIGNATURES["xChannelOpen"][1]
+
+
+def test_enumeration_and_io_round_trip(stub_library):
+    with CifXDriver(load_stub(stub_library)) as driver:
+        boards = [board.abBoardName for board in driver.enum_boards()]
+        assert boards == [b"cifX0"]
+        assert len(list(driver.enum_channels(0))) == 1
+
+        with ChannelSession(driver, "cifX0") as session:
+            assert session.write_output(PbBufOutWic(value_16=7, state1=3)) == CIFX_NO_ERROR
+            slave = session.read_input()
+            assert (slave.state1, slave.value_16) == (3, 7)
+
+
+def test_bind_rejects_values_that_do_not_fit(stub_library):
+    driver = CifXDriver(load_stub(stub_library))
+    buffer = (ctypes.c_ubyte * 244)()
+    with pytest.raises(ValueError):
+        driver.bind_io("xChannelIORead", ctypes.c_void_p(1), 0, 0, 244, buffer, 2**32)
+    with pytest.raises(ValueError):
+        driver.bind_io("xChannelIORead", ctypes.c_void_p(1), 0, 0, 488, buffer, 10)
@@ -0,0 +1,105 @@
+import threading
+
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.enum_cache import EnumerationCache
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX, SimulatedBoard
+
+
+class CountingCifX(SimulatedCifX):
+    """
+    Simulator counting the channel enumeration calls.
+    """
+    enum_channel_calls = 0
+
+    def xDriverEnumChannels(self, *args):
+        self.enum_channel_calls += 1
+        return super().xDriverEnumChannels(*args)
+
+
+def _boards(serial=20000):
+    return [SimulatedBoard("cifX0", serial_number=serial), SimulatedBoard("cifX1", channel_count=2, serial_number=serial + 1)]
+
+
+def test_first_start_enumerates_and_writes_cache(tmp_path):
+    path = tmp_path / "enum.json"
+    with CifXDriver(SimulatedCifX(_boards())) as driver:
+        cache = EnumerationCache(path).start(driver)
+
+    assert path.exists()
+    assert cache.valid
+    assert cache.channel_keys() == [("cifX0", 0), ("cifX1", 0), ("cifX1", 1)]
+    assert cache.find("cifX1")["serial_number"] == 20001
+    assert [board.abBoardName for board in cache.boards()] == [b"cifX0", b"cifX1"]
+    assert cache.channels("cifX1")[1].abBoardName == b"cifX1"
+
+
+def test_valid_cache_is_used_without_enumerating_channels(tmp_path):
+    path = tmp_path / "enum.json"
+    with CifXDriver(SimulatedCifX(_boards())) as driver:
+        EnumerationCache(path).start(driver)
+    mtime = path.stat().st_mtime_ns
+
+    sim = CountingCifX(_boards())
+    with CifXDriver(sim) as driver:
+        cache = EnumerationCache(path)
+        assert cache.load()
+        assert cache.validate(driver)
+        assert sim.enum_channel_calls == 0
+        assert cache.channel_keys() == [("cifX0", 0), ("cifX1", 0), ("cifX1", 1)]
+
+        assert not cache.refresh(driver)
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_replaced_board_invalidates_cache(tmp_path):
+    path = tmp_path / "enum.json"
+    with CifXDriver(SimulatedCifX(_boards())) as driver:
+        EnumerationCache(path).start(driver)
+
+    with CifXDriver(SimulatedCifX(_boards(serial=30000))) as driver:
+        cache = EnumerationCache(path)
+        assert cache.load()
+        assert not cache.validate(driver)
+        cache.start(driver)
+        cache.wait()
+
+    assert cache.find("cifX0")["serial_number"] == 30000
+    assert EnumerationCache(path).load()
+
+
+def test_unwritable_cache_falls_back_to_live_enumeration(tmp_path, capsys):
+    # A file where the cache directory should be makes every write fail
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    path = blocker / "enum.json"
+    with CifXDriver(SimulatedCifX(_boards())) as driver:
+        cache = EnumerationCache(path).start(driver)
+
+    assert "Failed to write enumeration cache" in capsys.readouterr().out
+    assert not path.exists()
+    assert cache.valid
+    assert cache.channel_keys() == [("cifX0", 0), ("cifX1", 0), ("cifX1", 1)]
+
+
+def test_background_start_never_enumerates_on_the_calling_thread(tmp_path):
+    path = tmp_path / "enum.json"
+    release = threading.Event()
+    caller = threading.get_ident()
+    calls = []
+
+    class BlockingCifX(SimulatedCifX):
+        def xDriverEnumBoards(self, *args):
+            calls.append(threading.get_ident())
+            release.wait(5)
+            return super().xDriverEnumBoards(*args)
+
+    with CifXDriver(BlockingCifX(_boards())) as driver:
+        # Cold start: nothing cached, the walk still runs in the background
+        cache = EnumerationCache(path).start(driver, background=True)
+        assert cache.boards() == []
+        release.set()
+        cache.wait()
+
+    assert caller not in calls
+    assert cache.channel_keys() == [("cifX0", 0), ("cifX1", 0), ("cifX1", 1)]
+    assert path.exists()
@@ -0,0 +1,149 @@
+import ctypes
+
+from profibus.hilscher.src.hilscher.Definitions import CIFX_NO_ERROR, CIFX_DEV_NOT_RUNNING
+from profibus.hilscher.src.hilscher.errors import ErrorDescriptions, ErrorReporter, Backoff, format_error
+from profibus.hilscher.src.hilscher.session import ChannelSession
+
+LERROR = ctypes.c_int32(0x800C0019).value
+
+
+class DescribingDll:
+    def __init__(self):
+        self.lookups = 0
+
+    def xDriverGetErrorDescription(self, lError, szBuffer, ulBufferLen):
+        self.lookups += 1
+        szBuffer.value = f"error {lError & 0xFFFFFFFF:X}".encode("ascii")
+        return CIFX_NO_ERROR
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_descriptions_are_looked_up_once_per_code():
+    dll = DescribingDll()
+    descriptions = ErrorDescriptions(dll)
+
+    for _ in range(100):
+        assert descriptions.describe(LERROR) == "error 800C0019"
+    descriptions.describe(CIFX_DEV_NOT_RUNNING)
+
+    assert dll.lookups == 2
+    assert format_error(LERROR) == "0x800C0019"
+
+
+def test_repeated_errors_are_summarized_per_interval():
+    lines = []
+    clock = FakeClock()
+    reporter = ErrorReporter(lambda lError: "no com flag", interval=10.0, output=lines.append, clock=clock)
+
+    for _ in range(412):
+        reporter.report(LERROR, "ReadIOData()")
+        clock.now += 0.01
+    assert lines == ["ReadIOData(): Error: 0x800C0019 <no com flag>"]
+    assert reporter.suppressed == 411
+
+    clock.now = 10.0
+    reporter.report(LERROR, "ReadIOData()")
+    assert lines[-1] == "ReadIOData(): Error: 0x800C0019 <no com flag> x 412 in last 10 s"
+
+    reporter.report(CIFX_NO_ERROR)
+    reporter.report(CIFX_DEV_NOT_RUNNING, "WriteIOData()")
+    clock.now = 11.0
+    reporter.report(CIFX_DEV_NOT_RUNNING, "WriteIOData()")
+    clock.now = 13.5
+    reporter.flush()
+    assert len(lines) == 4
+    # The span runs from the first counted occurrence, the context is kept
+    assert lines[-1] == "WriteIOData(): Error: 0x800C0012 <no com flag> x 1 in last 2.5 s"
+
+
+def test_backoff_grows_to_maximum_and_resets():
+    backoff = Backoff(initial=0.1, maximum=1.0, factor=2.0, jitter=0.0)
+
+    delays = [backoff.next_delay() for _ in range(6)]
+    assert delays == [0.1, 0.2, 0.4, 0.8, 1.0, 1.0]
+
+    backoff.attempts = 10_000
+    assert backoff.next_delay() == 1.0
+
+    backoff.reset()
+    assert backoff.next_delay() == 0.1
+
+    jittered = Backoff(initial=1.0, jitter=0.1, rng=lambda: 1.0)
+    assert jittered.next_delay() == 1.1
+
+
+class FlakyCifX:
+    """
+    Fails xChannelOpen a given number of times before the channel comes back.
+    """
+    def __init__(self, failures):
+        self.failures = failures
+        self.opens = 0
+
+    def xChannelOpen(self, hDriver, szBoard, ulChannel, phChannel):
+        self.opens += 1
+        if self.failures:
+            self.failures -= 1
+            return CIFX_DEV_NOT_RUNNING
+        phChannel._obj.value = 0x1234
+        return CIFX_NO_ERROR
+
+    def xChannelClose(self, hChannel):
+        return CIFX_NO_ERROR
+
+    def xChannelHostState(self, hChannel, ulCmd, pulState, ulTimeout):
+        return CIFX_NO_ERROR
+
+    def xChannelBusState(self, hChannel, ulCmd, pulState, ulTimeout):
+        return CIFX_NO_ERROR
+
+    def xChannelIORead(self, hChannel, ulArea, ulOffset, ulDataLen, pvData, ulTimeout):
+        return CIFX_NO_ERROR
+
+    def xChannelIOWrite(self, hChannel, ulArea, ulOffset, ulDataLen, pvData, ulTimeout):
+        return CIFX_NO_ERROR
+
+    def xDriverGetErrorDescription(self, lError, szBuffer, ulBufferLen):
+        szBuffer.value = b"Device not running"
+        return CIFX_NO_ERROR
+
+
+def test_session_reopens_with_backoff():
+    dll = FlakyCifX(failures=3)
+    lines = []
+    reporter = ErrorReporter(output=lines.append)
+    backoff = Backoff(initial=0.001, maximum=0.002, jitter=0.0)
+    session = ChannelSession(ctypes.c_void_p(1), "cifX0", dll=dll)
+
+    assert session.reopen(backoff, reporter=reporter)
+
+    assert session.is_open
+    assert dll.opens == 4
+    assert backoff.attempts == 0
+    assert lines == ["cifX0 channel 0: xChannelOpen: Error: 0x800C0012"]
+    session.close()
+
+
+def test_closing_the_session_writes_pending_summaries():
+    lines = []
+    clock = FakeClock()
+    reporter = ErrorReporter(lambda lError: "no com flag", output=lines.append, clock=clock)
+    session = ChannelSession(ctypes.c_void_p(1), "cifX0", dll=FlakyCifX(failures=0))
+    session.reporter = reporter
+    session.open()
+
+    # A burst of failures followed by recovery: no further report() ever comes
+    for _ in range(5):
+        reporter.report(LERROR, "ReadIOData()")
+        clock.now += 0.5
+    assert len(lines) == 1
+
+    session.close()
+    assert lines[-1] == "ReadIOData(): Error: 0x800C0019 <no com flag> x 4 in last 2 s"
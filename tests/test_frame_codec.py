@@ -0,0 +1,52 @@
+import ctypes
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic, SIZE_BUFFER_IN
+from profibus.hilscher.src.hilscher import frame_codec
+
+
+def _slave(i):
+    slave = PbBufInWic(state1=i, year=2025, value_16=i)
+    for view in range(4):
+        getattr(slave, f"sp{view + 1}")[:] = [i * 100 + view * 10 + track for track in range(8)]
+    return slave
+
+
+def test_dtypes_mirror_struct_layout():
+    for struct_type, dtype in ((PbBufInWic, frame_codec.PB_BUF_IN_DTYPE), (PbBufOutWic, frame_codec.PB_BUF_OUT_DTYPE)):
+        assert dtype.itemsize == ctypes.sizeof(struct_type)
+        for name, _ in struct_type._fields_:
+            assert dtype.fields[name][1] == getattr(struct_type, name).offset
+
+
+def test_decode_setpoints_and_encode_round_trip():
+    raw = b"".join(bytes(_slave(i)) for i in range(3))
+    frames = frame_codec.decode_frames(raw)
+
+    assert frames["value_16"].tolist() == [0, 1, 2]
+    sp = frame_codec.setpoints(frames)
+    assert sp.shape == (3, 4, 8)
+    assert sp[2, 3].tolist() == list(_slave(2).sp4)
+    assert frame_codec.encode_frames(frames) == raw
+
+
+def test_decode_padded_frames():
+    raw = b"".join(bytes(_slave(i)).ljust(SIZE_BUFFER_IN, b"\0") for i in range(2))
+    frames = frame_codec.decode_frames(raw, itemsize=SIZE_BUFFER_IN)
+
+    assert frame_codec.setpoints(frames)[1, 0, 7] == 107
+    assert frame_codec.encode_frames(frames) == raw
+
+
+def test_process_values_view_is_writable():
+    frames = np.zeros(2, dtype=frame_codec.PB_BUF_OUT_DTYPE)
+    pv, pvq = frame_codec.process_values(frames)
+    pv[1, 2, 5] = 7
+    pvq[1, 3, 0] = 9
+
+    master = PbBufOutWic.from_buffer_copy(frame_codec.encode_frames(frames[1:]))
+    assert master.pv3[5] == 7
+    assert master.pvq4[0] == 9
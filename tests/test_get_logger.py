@@ -0,0 +1,55 @@
+import logging
+
+from src.utils.src.utils import text_logger
+from src.utils.src.utils.text_logger import RotatingTextFileHandler, get_logger
+
+
+def _shared_handler(monkeypatch, tmp_path):
+    handler = RotatingTextFileHandler(tmp_path / "shared.log", max_lines=1000)
+    handler.setFormatter(logging.Formatter("%(name)s %(message)s"))
+    monkeypatch.setattr(text_logger, "_file_handler", handler)
+    monkeypatch.setattr(text_logger, "_logger_registry", {})
+    # get_logger() leaves loggers alone that already log through an ancestor, like pytest's root handler
+    monkeypatch.setattr(logging.getLogger("isolated"), "propagate", False)
+    return handler
+
+
+def test_logger_is_named_after_the_calling_module(monkeypatch, tmp_path):
+    _shared_handler(monkeypatch, tmp_path)
+    logger = get_logger()
+    assert logger.name == __name__
+    assert get_logger() is logger
+
+
+def test_loggers_share_one_file_handler(monkeypatch, tmp_path):
+    handler = _shared_handler(monkeypatch, tmp_path)
+    first = get_logger(name="isolated.first")
+    second = get_logger(logging.INFO, name="isolated.second")
+
+    assert first.handlers == [handler]
+    assert second.handlers == [handler]
+    assert second.level == logging.INFO
+
+    first.info("one")
+    second.info("two")
+    assert handler.line_count == 2
+    handler.close()
+    assert (tmp_path / "shared.log").read_text().splitlines() == ["isolated.first one", "isolated.second two"]
+
+
+def test_async_logging_switches_existing_loggers_and_back(monkeypatch, tmp_path):
+    handler = _shared_handler(monkeypatch, tmp_path)
+    monkeypatch.setattr(text_logger, "_async_handler", None)
+    monkeypatch.setattr(text_logger.atexit, "register", lambda function: None)
+    logger = get_logger(name="isolated.switch")
+
+    async_handler = text_logger.enable_async_logging()
+    assert logger.handlers == [async_handler]
+    logger.info("queued")
+
+    text_logger.disable_async_logging()
+    assert logger.handlers == [handler]
+    # After the writer thread stopped, records still reach the file
+    logger.info("after exit")
+    handler.close()
+    assert (tmp_path / "shared.log").read_text().splitlines() == ["isolated.switch queued", "isolated.switch after exit"]
@@ -0,0 +1,44 @@
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic, CIFX_NO_ERROR
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.keepalive import KeepAlive
+from profibus.hilscher.src.hilscher.response import PvBlock
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX
+
+
+def _deliver(channel, watchdog):
+    slave = PbBufInWic(state1=3, state2=4, value_16=watchdog)
+    slave.sp1[:] = [watchdog] * 8
+    channel.deliver_input(bytes(slave))
+
+
+def test_watchdog_is_echoed_without_processing():
+    sim = SimulatedCifX(synchronous=True)
+    channel = sim.channel("cifX0")
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=20) as session, \
+            KeepAlive(session, realtime=False) as keepalive:
+        # Processing never takes an image, the master still sees its watchdog every cycle
+        for watchdog in (7, 8, 9):
+            _deliver(channel, watchdog)
+            master = PbBufOutWic.from_buffer_copy(channel.collect_output(timeout=2))
+            assert (master.value_16, master.state1, master.state2) == (watchdog, 3, 4)
+            assert list(master.pv1) == [0] * 8
+
+        frame = keepalive.next_input(timeout=1)
+        assert frame.sequence == 3
+        assert frame.image.value_16 == 9
+        assert keepalive.next_input(timeout=0.01) is None
+
+        values = PvBlock()
+        values[0][0][0] = 99
+        assert keepalive.publish(values, sequence=1) == CIFX_NO_ERROR
+        master = PbBufOutWic.from_buffer_copy(channel.collect_output(timeout=2))
+        assert master.pv1[0] == 99
+        assert master.value_16 == 9
+        assert keepalive.result_age == 2
+
+    stats = keepalive.statistics()
+    assert not stats["running"]
+    assert stats["cycles"] == 3
+    assert stats["results"] == 1
+    assert stats["header_errors"] == 0
@@ -0,0 +1,107 @@
+import gzip
+import logging
+
+from src.utils.src.utils import text_logger
+from src.utils.src.utils.text_logger import RotatingTextFileHandler
+
+
+def _record(i):
+    return logging.LogRecord("rotation", logging.INFO, __file__, 0, "line %04d", (i,), None)
+
+
+def _handler(path, **kwargs):
+    handler = RotatingTextFileHandler(path, **kwargs)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def test_existing_line_count_is_estimated_from_the_tail(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"line {i:04d}\n" for i in range(2000)))
+
+    handler = _handler(path, max_lines=10_000)
+    assert handler.byte_count == path.stat().st_size
+    assert handler.line_count == 2000
+    handler.close()
+
+
+def test_rotates_to_numbered_backups(tmp_path):
+    path = tmp_path / "app.log"
+    handler = _handler(path, max_lines=10, backup_count=2)
+    for i in range(35):
+        handler.emit(_record(i))
+    handler.close()
+
+    assert path.read_text().splitlines() == [f"line {i:04d}" for i in range(30, 35)]
+    assert (tmp_path / "app.log.1").read_text().splitlines()[0] == "line 0020"
+    assert (tmp_path / "app.log.2").read_text().splitlines()[0] == "line 0010"
+    assert not (tmp_path / "app.log.3").exists()
+
+
+def test_compressed_backups_respect_disk_cap(tmp_path):
+    path = tmp_path / "app.log"
+    handler = _handler(path, max_lines=0, max_bytes=1000, backup_count=5, compress=True, max_total_bytes=500)
+    handler.emit_batch([_record(i) for i in range(500)])
+    handler.emit(_record(500))
+    handler.close()
+
+    backups = sorted(tmp_path.glob("app.log.*"))
+    assert backups and all(name.suffix == ".gz" for name in backups)
+    assert len(backups) < 5
+    assert sum(name.stat().st_size for name in backups) <= 500
+    with gzip.open(tmp_path / "app.log.1.gz", "rt") as f:
+        assert f.readline().startswith("line ")
+
+
+def test_failed_compression_keeps_the_backup_in_the_sequence(tmp_path, monkeypatch):
+    failures = [OSError("disk full")]
+    real_open = gzip.open
+
+    def gzip_open(name, mode):
+        if failures:
+            raise failures.pop()
+        return real_open(name, mode)
+
+    monkeypatch.setattr(text_logger.gzip, "open", gzip_open)
+    path = tmp_path / "app.log"
+    handler = _handler(path, max_lines=10, backup_count=3, compress=True)
+    for i in range(35):
+        handler.emit(_record(i))
+    handler._housekeeping.join()
+
+    # The first backup stayed uncompressed and was shifted instead of overwritten
+    assert handler.backup_name(3) == f"{path}.3"
+    assert (tmp_path / "app.log.3").read_text().splitlines()[0] == "line 0000"
+    with gzip.open(tmp_path / "app.log.1.gz", "rt") as f:
+        assert f.readline() == "line 0020\n"
+    assert sorted(name.name for name in tmp_path.glob("app.log.*")) == ["app.log.1.gz", "app.log.2.gz", "app.log.3"]
+
+    # Past the backup count it is removed like any other backup
+    for i in range(35, 45):
+        handler.emit(_record(i))
+    handler.close()
+    assert sorted(name.name for name in tmp_path.glob("app.log.*")) == ["app.log.1.gz", "app.log.2.gz", "app.log.3.gz"]
+
+
+def test_without_backups_the_file_is_cleared(tmp_path):
+    path = tmp_path / "app.log"
+    handler = _handler(path, max_lines=10)
+    for i in range(15):
+        handler.emit(_record(i))
+    handler.close()
+
+    assert path.read_text().splitlines() == [f"line {i:04d}" for i in range(10, 15)]
+    assert list(tmp_path.glob("app.log.*")) == []
+
+
+def test_size_is_counted_in_encoded_bytes(tmp_path):
+    path = tmp_path / "app.log"
+    handler = _handler(path, max_lines=0, max_bytes=1000, backup_count=1, encoding="utf-8")
+    # Each line has 21 bytes but only 17 characters: 50 lines exceed the limit only in bytes
+    for i in range(50):
+        handler.emit(logging.LogRecord("rotation", logging.INFO, __file__, 0, "Störung %04d äöü", (i,), None))
+    assert handler.byte_count == path.stat().st_size
+    handler.close()
+
+    assert len((tmp_path / "app.log.1").read_text(encoding="utf-8").splitlines()) == 48
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
@@ -0,0 +1,122 @@
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from profibus.hilscher.src.hilscher.Definitions import (
+    PbBufInWic, CIFX_DEV_GET_TIMEOUT, CIFX_NO_ERROR, ERR_HIL_UNKNOWN_COMMAND, RCX_FIRMWARE_IDENTIFY_REQ, RCX_GET_COMMON_STATE_REQ,
+)
+from profibus.hilscher.src.hilscher.driver import CifXDriver, CifXError
+from profibus.hilscher.src.hilscher.keepalive import KeepAlive
+from profibus.hilscher.src.hilscher.mailbox import PacketService
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX, FIRMWARE_NAME
+
+
+class SilentCifX(SimulatedCifX):
+    """Card accepting requests without ever confirming them."""
+
+    def xChannelPutPacket(self, hChannel, ptSendPkt, ulTimeout):
+        return CIFX_NO_ERROR
+
+
+def test_firmware_identify_and_common_state():
+    sim = SimulatedCifX(synchronous=True)
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session, PacketService(session) as mailbox:
+        firmware = mailbox.firmware_identify()
+        assert firmware["version"] == "2.9.1.0"
+        assert firmware["name"] == FIRMWARE_NAME.decode("ascii")
+        assert firmware["date"] == "2024-09-18"
+
+        state = mailbox.common_state()
+        assert state["error"] == 0
+        assert mailbox.statistics()["sent"] == 2
+
+        confirmation = mailbox.transact(0x7777)
+        assert confirmation.tHeader.ulCmd == 0x7778
+        assert confirmation.tHeader.ulState == ERR_HIL_UNKNOWN_COMMAND
+
+
+def test_concurrent_requests_are_correlated_by_id():
+    sim = SimulatedCifX(synchronous=True)
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session, PacketService(session) as mailbox:
+        futures = [mailbox.request(RCX_GET_COMMON_STATE_REQ if i % 2 else RCX_FIRMWARE_IDENTIFY_REQ) for i in range(10)]
+        wait(futures, timeout=5)
+        for i, future in enumerate(futures):
+            packet = future.result()
+            expected = RCX_GET_COMMON_STATE_REQ if i % 2 else RCX_FIRMWARE_IDENTIFY_REQ
+            assert packet.tHeader.ulCmd == expected + 1
+        assert len({future.result().tHeader.ulId for future in futures}) == 10
+        assert mailbox.statistics()["outstanding"] == 0
+        assert mailbox.unsolicited == 0
+
+
+def test_gated_service_only_runs_after_cyclic_writes():
+    sim = SimulatedCifX(synchronous=True)
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session, \
+            PacketService(session, gated=True, poll_interval=0.5, idle_interval=0.5) as mailbox:
+        assert session.mailbox is mailbox
+        future = mailbox.request(RCX_FIRMWARE_IDENTIFY_REQ)
+        time.sleep(0.05)
+        assert not future.done()
+
+        # Each write opens one window: the request goes out, the next one collects it
+        deadline = time.monotonic() + 5
+        while not future.done() and time.monotonic() < deadline:
+            assert session.write_output() == CIFX_NO_ERROR
+            time.sleep(0.01)
+        assert future.result().tHeader.ulState == 0
+    assert session.mailbox is None
+
+
+def test_gated_service_sends_nothing_without_cyclic_writes():
+    sim = SimulatedCifX(synchronous=True)
+    channel = sim.channel("cifX0")
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session, \
+            PacketService(session, gated=True, poll_interval=0.01, idle_interval=0.01) as mailbox:
+        future = mailbox.request(RCX_FIRMWARE_IDENTIFY_REQ, timeout=10)
+        # Many poll intervals pass, but no cycle opens the window
+        time.sleep(0.2)
+        assert not future.done()
+        assert mailbox.sent == 0
+        assert channel.put_packet_count == 0
+
+        session.write_output()
+        deadline = time.monotonic() + 5
+        while mailbox.sent == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert channel.put_packet_count == 1
+
+
+def test_unconfirmed_request_times_out():
+    sim = SilentCifX(synchronous=True)
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session, PacketService(session) as mailbox:
+        start = time.monotonic()
+        with pytest.raises(CifXError) as excinfo:
+            mailbox.transact(RCX_FIRMWARE_IDENTIFY_REQ, timeout=0.05)
+        assert excinfo.value.lError == CIFX_DEV_GET_TIMEOUT
+        assert time.monotonic() - start < 2
+        assert mailbox.timeouts == 1
+
+        future = mailbox.request(RCX_FIRMWARE_IDENTIFY_REQ, timeout=10)
+    # Stopping fails what is still outstanding
+    with pytest.raises(CifXError):
+        future.result(timeout=1)
+    with pytest.raises(RuntimeError):
+        mailbox.request(RCX_FIRMWARE_IDENTIFY_REQ)
+
+
+def test_keepalive_header_writes_open_the_gated_mailbox():
+    sim = SimulatedCifX(synchronous=True)
+    channel = sim.channel("cifX0")
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=20) as session, \
+            KeepAlive(session, realtime=False), \
+            PacketService(session, gated=True, poll_interval=0.5, idle_interval=0.5) as mailbox:
+        future = mailbox.request(RCX_FIRMWARE_IDENTIFY_REQ, timeout=10)
+        deadline = time.monotonic() + 5
+        watchdog = 0
+        while not future.done() and time.monotonic() < deadline:
+            watchdog += 1
+            channel.deliver_input(bytes(PbBufInWic(value_16=watchdog)))
+            channel.collect_output(timeout=1)
+        assert future.result().tHeader.ulState == 0
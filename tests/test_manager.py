@@ -0,0 +1,46 @@
+import time
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufOutWic
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.manager import ChannelManager
+from profibus.hilscher.src.hilscher.response import PvBlock
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX, SimulatedBoard, LoopbackMaster
+
+
+def test_channels_run_independently():
+    sim = SimulatedCifX([SimulatedBoard("cifX0", synchronous=True), SimulatedBoard("cifX1", channel_count=2, synchronous=True)])
+    masters = {key: LoopbackMaster(sim.channel(*key), rate_hz=0).start() for key in (("cifX0", 0), ("cifX1", 0), ("cifX1", 1))}
+
+    def process(key, slave):
+        if key == ("cifX0", 0):
+            time.sleep(0.02)    # slow station
+        values = PvBlock()
+        values[0][0][0] = key[1] + 1
+        return values
+
+    try:
+        with CifXDriver(sim) as driver:
+            manager = ChannelManager(driver, process=process, ulWaitTimeout=50)
+            assert manager.discover() == [("cifX0", 0), ("cifX1", 0), ("cifX1", 1)]
+            with manager:
+                time.sleep(0.3)
+                stats = manager.statistics()
+                images = manager.images()
+                totals = manager.totals()
+    finally:
+        for master in masters.values():
+            master.stop()
+
+    assert totals["running"] == 3
+    assert stats[("cifX0", 0)]["exchanges"] < 20
+    assert stats[("cifX1", 0)]["exchanges"] > 5 * stats[("cifX0", 0)]["exchanges"]
+    assert images[("cifX1", 1)].value_16 > 0
+    assert PbBufOutWic.from_buffer_copy(sim.channel("cifX1", 1).output_area).pv1[0] == 2
+
+
+def test_unknown_channel_is_reported_as_failed():
+    sim = SimulatedCifX()
+    with CifXDriver(sim) as driver, ChannelManager(driver, channels=[("cifX0", 0), ("cifX9", 0)]) as manager:
+        assert list(manager.workers) == [("cifX0", 0)]
+        assert list(manager.failed) == [("cifX9", 0)]
+    assert manager.totals()["running"] == 0
@@ -0,0 +1,95 @@
+import json
+import urllib.request
+
+from profibus.hilscher.src.hilscher.Definitions import CIFX_DEV_NO_COM_FLAG
+from profibus.hilscher.src.hilscher.cycle import CycleScheduler
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.metrics import CycleMetrics, MetricsRegistry, MetricsServer, SnapshotWriter
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000_000
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, deadline_ns):
+        self.now = max(self.now, deadline_ns)
+
+
+def _sample(registry, name, **labels):
+    for sample_name, sample_labels, value in registry.samples():
+        if sample_name == name and all(sample_labels.get(k) == v for k, v in labels.items()):
+            return value
+    raise KeyError(name)
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs done.").labels().inc(3)
+    histogram = registry.histogram("wait_seconds", "Wait time.", ("queue",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.labels('a"b').observe(value)
+
+    text = registry.render()
+    assert "# TYPE jobs_total counter\njobs_total 3\n" in text
+    assert '# TYPE wait_seconds histogram' in text
+    assert 'wait_seconds_bucket{queue="a\\"b",le="0.1"} 1' in text
+    assert 'wait_seconds_bucket{queue="a\\"b",le="1"} 3' in text
+    assert 'wait_seconds_bucket{queue="a\\"b",le="+Inf"} 4' in text
+    assert 'wait_seconds_count{queue="a\\"b"} 4' in text
+
+
+def test_scheduler_reports_stage_times_and_overruns():
+    clock = FakeClock()
+    registry = MetricsRegistry()
+    metrics = CycleMetrics(registry, channel="cifX0/0")
+
+    def read():
+        clock.now += 1_000_000
+        return 1
+
+    def process(image):
+        clock.now += 2_000_000 if metrics.cycles.value != 3 else 25_000_000
+        return image
+
+    scheduler = CycleScheduler(10, read, process, lambda result: None, clock=clock, sleep=clock.sleep, metrics=metrics)
+    scheduler.run(cycles=200)
+
+    assert _sample(registry, "cifx_cycles_total") == 200
+    assert _sample(registry, "cifx_overruns_total") == 1
+    assert _sample(registry, "cifx_skipped_cycles_total") == scheduler.stats.skipped
+    assert _sample(registry, "cifx_stage_duration_seconds_count", stage="read") == 200
+    assert _sample(registry, "cifx_stage_duration_seconds_bucket", stage="process", le="0.002") == 199
+    assert _sample(registry, "cifx_cycle_duration_seconds_sum") > 0.6
+    assert 99 < _sample(registry, "cifx_cycles_per_second") < 101
+
+
+def test_session_counts_errors_per_code():
+    registry = MetricsRegistry()
+    with CifXDriver(SimulatedCifX()) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=1) as session:
+        session.metrics = CycleMetrics(registry)
+        assert session.read_input() is None
+        assert session.read_input() is None
+    code = f"0x{CIFX_DEV_NO_COM_FLAG & 0xFFFFFFFF:08X}"
+    assert _sample(registry, "cifx_errors_total", function="xChannelIORead", code=code) == 2
+
+
+def test_http_endpoint_and_snapshot(tmp_path):
+    registry = MetricsRegistry()
+    CycleMetrics(registry).cycle_done(1_000_000_000, 500_000)
+
+    with MetricsServer(registry, port=0) as server:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode()
+    assert 'cifx_cycles_total{channel="cifX0/0"} 1' in body
+
+    path = tmp_path / "metrics.json"
+    with SnapshotWriter(registry, path, interval=60):
+        pass
+    samples = json.loads(path.read_text())["samples"]
+    assert {"name": "cifx_cycles_total", "labels": {"channel": "cifX0/0"}, "value": 1} in samples
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, CIFX_DEV_EXCHANGE_TIMEOUT
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.notify import InputNotifier, NOTIFY, POLL
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX
+
+
+def _deliver_later(channel, watchdog, delay=0.05):
+    timer = threading.Timer(delay, channel.deliver_input, (bytes(PbBufInWic(state1=1, value_16=watchdog)),))
+    timer.start()
+    return timer
+
+
+def test_notification_wakes_the_reader():
+    sim = SimulatedCifX(synchronous=True)
+    channel = sim.channel("cifX0")
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=1) as session, \
+            InputNotifier(session) as notifier:
+        assert notifier.mode == NOTIFY
+        assert notifier.com_state is None
+        assert notifier.bus_running()
+
+        assert notifier.next_input(timeout=0.02) is None
+        assert notifier.lLastError == CIFX_DEV_EXCHANGE_TIMEOUT
+
+        # Much longer than the IO timeout: only the notification ends the wait
+        timer = _deliver_later(channel, 5)
+        start = time.monotonic()
+        slave = notifier.next_input(timeout=5)
+        assert slave.value_16 == 5
+        assert time.monotonic() - start < 2
+        timer.join()
+        assert notifier.notifications == 1
+        assert notifier.com_state
+
+    assert channel.notifications == {}
+
+
+def test_polling_fallback_without_notification_support(capsys):
+    sim = SimulatedCifX(synchronous=True, notifications=False)
+    channel = sim.channel("cifX0")
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=1) as session, \
+            InputNotifier(session) as notifier:
+        assert notifier.mode == POLL
+        assert "polling" in capsys.readouterr().out
+
+        _deliver_later(channel, 6)
+        assert notifier.next_input(timeout=5).value_16 == 6
+        assert notifier.notifications == 0
@@ -0,0 +1,74 @@
+import ctypes
+
+import pytest
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic, CIFX_NO_ERROR
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.partial_io import PartialIO, coalesce, field_region
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX
+
+
+class TracingCifX(SimulatedCifX):
+    """
+    Records offset and length of every IO transfer.
+    """
+    def __init__(self):
+        super().__init__()
+        self.reads = []
+        self.writes = []
+
+    def xChannelIORead(self, hChannel, ulAreaNumber, ulOffset, ulDataLen, pvData, ulTimeout):
+        self.reads.append((ulOffset, ulDataLen))
+        return super().xChannelIORead(hChannel, ulAreaNumber, ulOffset, ulDataLen, pvData, ulTimeout)
+
+    def xChannelIOWrite(self, hChannel, ulAreaNumber, ulOffset, ulDataLen, pvData, ulTimeout):
+        self.writes.append((ulOffset, ulDataLen))
+        return super().xChannelIOWrite(hChannel, ulAreaNumber, ulOffset, ulDataLen, pvData, ulTimeout)
+
+
+def test_coalesce_merges_adjacent_and_close_regions():
+    assert coalesce([(10, 2), (0, 4), (4, 2)]) == ((0, 6), (10, 2))
+    assert coalesce([(10, 2), (0, 4), (4, 2)], max_gap=4) == ((0, 12),)
+    assert coalesce([(0, 8), (2, 2)]) == ((0, 8),)
+    assert field_region(PbBufOutWic, "value_16") == (30, 2)
+    with pytest.raises(ValueError):
+        field_region(PbBufOutWic, "sp1")
+
+
+def test_only_dirty_regions_are_transferred():
+    sim = TracingCifX()
+    channel = sim.channel("cifX0")
+    channel.deliver_input(bytes(PbBufInWic(state1=1, state2=2, value_16=5, sp2=(9,) * 8)))
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session:
+        io = PartialIO(session)
+
+        slave = io.read("state1", "state2", "value_16")
+        assert (slave.state1, slave.state2, slave.value_16) == (1, 2, 5)
+        assert list(slave.sp2) == [0] * 8
+        assert sim.reads == [(0, 4), (30, 2)]
+
+        io.output.value_16 = slave.value_16
+        io.mark("value_16")
+        assert io.flush() == CIFX_NO_ERROR
+        assert sim.writes == [(30, 2)]
+        assert PbBufOutWic.from_buffer_copy(channel.output_area).value_16 == 5
+
+        # Nothing dirty: no transfer
+        assert io.flush(detect=True) == CIFX_NO_ERROR
+        assert len(sim.writes) == 1
+
+        # pv2 and pvq2 are adjacent and written in one transfer
+        io.output.pv2[0] = 7
+        io.output.pvq2[7] = 8
+        assert io.changed() == ["pv2", "pvq2"]
+        io.flush(detect=True)
+        pv2_offset = PbBufOutWic.pv2.offset
+        assert sim.writes[-1] == (pv2_offset, 32)
+        master = PbBufOutWic.from_buffer_copy(channel.output_area)
+        assert (master.pv2[0], master.pvq2[7], master.value_16) == (7, 8, 5)
+
+        assert io.sync() == CIFX_NO_ERROR
+        assert sim.reads[-1] == (0, ctypes.sizeof(PbBufInWic))
+        assert sim.writes[-1] == (0, ctypes.sizeof(PbBufOutWic))
+        assert list(io.input.sp2) == [9] * 8
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from profibus.hilscher.src.hilscher.errors import Backoff
+from src.fls_cli.src.fls_cli.pipeline import Pipeline, BoundedQueue, BLOCK, DROP_OLDEST
+
+
+def test_drop_oldest_keeps_newest_items():
+    queue = BoundedQueue(2, DROP_OLDEST)
+    for item in range(5):
+        assert queue.put(item)
+
+    assert [queue.get(0), queue.get(0), queue.get(0)] == [3, 4, None]
+    assert queue.dropped == 3
+
+
+def test_block_waits_for_space_until_closed():
+    queue = BoundedQueue(1, BLOCK)
+    queue.put(1)
+    results = []
+    producer = threading.Thread(target=lambda: results.append(queue.put(2)))
+    producer.start()
+    producer.join(0.05)
+    assert producer.is_alive()
+
+    assert queue.get(0) == 1
+    producer.join(1)
+    assert results == [True]
+    assert queue.get(0) == 2
+
+    queue.put(3)
+    producer = threading.Thread(target=lambda: results.append(queue.put(4)))
+    producer.start()
+    queue.close()
+    producer.join(1)
+    assert results == [True, False]
+
+
+def test_stages_overlap():
+    images = iter(range(10))
+    written = []
+    done = threading.Event()
+
+    def read():
+        time.sleep(0.01)
+        return next(images, None)
+
+    def process(image):
+        time.sleep(0.01)
+        return image * 2
+
+    def write(result):
+        time.sleep(0.01)
+        written.append(result)
+        if len(written) == 10:
+            done.set()
+
+    pipeline = Pipeline(read, process, write, queue_size=2, policy=BLOCK)
+    start = time.perf_counter()
+    with pipeline:
+        assert done.wait(2)
+    elapsed = time.perf_counter() - start
+
+    assert written == [2 * i for i in range(10)]
+    assert elapsed < 0.25   # sequential stages would need 0.3 s
+    assert pipeline.stats["process"].count == 10
+    assert pipeline.latency.count == 10
+    assert pipeline.latency.max_ns >= 20_000_000
+
+
+def test_stage_error_stops_pipeline():
+    def process(image):
+        raise RuntimeError("processing failed")
+
+    pipeline = Pipeline(lambda: 1, process, lambda result: None).start()
+    assert pipeline.wait(1)
+
+    with pytest.raises(RuntimeError, match="processing failed"):
+        pipeline.stop()
+    assert not pipeline.running
+
+
+def test_failed_reads_back_off_instead_of_spinning():
+    reads = []
+
+    def read():
+        reads.append(time.perf_counter())
+        return None
+
+    backoff = Backoff(initial=0.05, maximum=1.0, jitter=0)
+    pipeline = Pipeline(read, lambda image: image, lambda result: None, read_failed=lambda: True, backoff=backoff).start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    pipeline.stop()
+
+    # Reads after 0, 0.05 and 0.15 s instead of thousands of them
+    assert 2 <= len(reads) <= 5
+    assert backoff.attempts == len(reads)
+    # The stop ends the current wait of 0.2 s or longer
+    assert time.perf_counter() - start < 0.15
+
+
+def test_no_data_reads_do_not_back_off():
+    backoff = Backoff(initial=10, jitter=0)
+    pipeline = Pipeline(lambda: None, lambda image: image, lambda result: None, read_failed=lambda: False, backoff=backoff).start()
+    time.sleep(0.05)
+    pipeline.stop()
+    assert backoff.attempts == 0
@@ -0,0 +1,50 @@
+import ctypes
+
+import pytest
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic, SIZE_BUFFER_IN
+from profibus.hilscher.src.hilscher.process_image import ProcessImage
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from test_session import FakeCifX
+
+
+def test_previous_image_stays_readable_while_next_is_filled():
+    image = ProcessImage(PbBufInWic, SIZE_BUFFER_IN)
+
+    image.back_buffer[30] = 7  # value_16, low byte
+    image.swap()
+    first = image.current
+    assert first.value_16 == 7
+
+    image.back_buffer[30] = 8
+    assert first.value_16 == 7
+    assert image.back.value_16 == 8
+
+    image.swap()
+    assert image.current.value_16 == 8
+
+
+def test_structure_views_share_memory_with_driver_buffers():
+    image = ProcessImage(PbBufOutWic, 244)
+    image.back.pv1[0] = 0x1234
+    assert ctypes.addressof(image.back) == ctypes.addressof(image.back_buffer)
+    assert bytes(image.back_buffer[32:34]) == b"\x34\x12"
+
+
+def test_structure_must_fit_into_buffer():
+    with pytest.raises(ValueError):
+        ProcessImage(PbBufOutWic, 100)
+
+
+def test_session_reuses_images_without_copying():
+    dll = FakeCifX()
+    with ChannelSession(ctypes.c_void_p(1), "cifX0", dll=dll) as session:
+        images = [session.read_input() for _ in range(3)]
+        assert images[0] is images[2]
+        assert images[0] is not images[1]
+
+        master = session.output_image.back
+        master.value_16 = images[2].value_16
+        session.write_output(master)
+        assert session.output_image.current is master
+    assert dll.written.value_16 == 42
@@ -0,0 +1,131 @@
+import itertools
+
+import pytest
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.recorder import (
+    INPUT, OUTPUT, RECORD, Recorder, RecordingReader,
+)
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX
+
+
+def _slave(setpoint, watchdog):
+    slave = PbBufInWic(state1=1, year=2025, seconds=watchdog % 60, value_16=watchdog)
+    slave.sp1[:] = [setpoint] * 8
+    return slave
+
+
+def _clock():
+    counter = itertools.count(1000, 1000)
+    return lambda: next(counter)
+
+
+def test_round_trip_with_delta_records(tmp_path):
+    path = tmp_path / "line.pbrec"
+    slaves = [_slave(setpoint=i // 4, watchdog=i) for i in range(12)]
+    master = PbBufOutWic(state1=1, value_16=7)
+    master.pv1[:] = range(8)
+
+    with Recorder(path, size=64 * 1024, clock=_clock()) as recorder:
+        for slave in slaves:
+            recorder.record_input(slave)
+        recorder.record_output(master)
+        assert recorder.full_records == 4
+        assert recorder.delta_records == 9
+
+    with RecordingReader(path) as reader:
+        assert len(reader) == 13
+        images = list(reader.images(INPUT))
+        assert [bytes(image) for _, image in images] == [bytes(slave) for slave in slaves]
+        assert [timestamp for timestamp, _ in images] == list(range(1000, 13000, 1000))
+        [(timestamp, written)] = reader.images(OUTPUT)
+        assert timestamp == 13000 and list(written.pv1) == list(range(8))
+
+
+def test_time_range(tmp_path):
+    path = tmp_path / "line.pbrec"
+    with Recorder(path, size=64 * 1024, clock=_clock()) as recorder:
+        for i in range(10):
+            recorder.record_input(_slave(0, i))
+
+    with RecordingReader(path) as reader:
+        frames = list(reader.frames(start_ns=3000, end_ns=5000))
+    assert [frame.timestamp_ns for frame in frames] == [3000, 4000, 5000]
+    assert [PbBufInWic.from_buffer_copy(frame.data).value_16 for frame in frames] == [2, 3, 4]
+
+
+def test_ring_keeps_newest_records(tmp_path):
+    path = tmp_path / "line.pbrec"
+    size = 20 * (RECORD.size + 96)
+    with Recorder(path, size=size, keyframe_interval=0, clock=_clock()) as recorder:
+        for i in range(100):
+            recorder.record_input(_slave(i, i))
+        assert recorder.written == 100
+
+    with RecordingReader(path) as reader:
+        values = [image.value_16 for _, image in reader.images(INPUT)]
+    assert 0 < len(values) <= 20
+    assert values == list(range(100 - len(values), 100))
+
+
+def test_deltas_without_keyframe_are_skipped_after_wrap(tmp_path):
+    path = tmp_path / "line.pbrec"
+    size = 4 * (RECORD.size + 96)
+    with Recorder(path, size=size, keyframe_interval=5, clock=_clock()) as recorder:
+        for i in range(200):
+            recorder.record_input(_slave(0, i))
+
+    with RecordingReader(path) as reader:
+        values = [image.value_16 for _, image in reader.images(INPUT)]
+    # Everything after the last surviving keyframe is readable and in order
+    assert values and values == list(range(values[0], 200))
+
+
+def test_recording_is_continued(tmp_path):
+    path = tmp_path / "line.pbrec"
+    with Recorder(path, size=64 * 1024) as recorder:
+        recorder.record_input(_slave(1, 1))
+    with Recorder(path, size=64 * 1024) as recorder:
+        recorder.record_input(_slave(1, 2))
+    with RecordingReader(path) as reader:
+        assert [image.value_16 for _, image in reader.images(INPUT)] == [1, 2]
+
+
+def test_bulk_load(tmp_path):
+    pytest.importorskip("numpy")
+    path = tmp_path / "line.pbrec"
+    with Recorder(path, size=64 * 1024, clock=_clock()) as recorder:
+        for i in range(5):
+            recorder.record_input(_slave(i, i))
+
+    with RecordingReader(path) as reader:
+        timestamps, frames = reader.load(INPUT, start_ns=2000)
+    assert timestamps.tolist() == [2000, 3000, 4000, 5000]
+    assert frames["value_16"].tolist() == [1, 2, 3, 4]
+    assert frames["sp1"][:, 0].tolist() == [1, 2, 3, 4]
+
+
+def test_session_records_transferred_images(tmp_path):
+    path = tmp_path / "line.pbrec"
+    sim = SimulatedCifX()
+    with Recorder(path, size=64 * 1024) as recorder:
+        with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0") as session:
+            session.recorder = recorder
+            sim.channel("cifX0").deliver_input(bytes(_slave(3, 1)))
+            slave = session.read_input()
+            session.write_output(PbBufOutWic(value_16=slave.value_16))
+
+    with RecordingReader(path) as reader:
+        frames = list(reader.frames())
+    assert [frame.direction for frame in frames] == [INPUT, OUTPUT]
+    assert PbBufInWic.from_buffer_copy(frames[0].data).sp1[0] == 3
+    assert PbBufOutWic.from_buffer_copy(frames[1].data).value_16 == 1
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        RecordingReader(path)
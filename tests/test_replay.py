@@ -0,0 +1,81 @@
+import time
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic
+from profibus.hilscher.src.hilscher.driver import CifXDriver
+from profibus.hilscher.src.hilscher.recorder import INPUT, OUTPUT, Recorder
+from profibus.hilscher.src.hilscher.replay import ReplayCifX, ReplayFrame, load_recording
+from profibus.hilscher.src.hilscher.response import PvBlock, ResponseBuilder
+from profibus.hilscher.src.hilscher.session import ChannelSession
+
+builder = ResponseBuilder()
+
+
+def _slave(i):
+    slave = PbBufInWic(state1=1, value_16=i + 1)
+    slave.sp1[:] = [i] * 8
+    return slave
+
+
+def _answer(slave, offset=0):
+    # Processing under test: pv1 of view 1 = setpoint + offset
+    values = PvBlock()
+    values[0][0][0] = slave.sp1[0] + offset
+    master = PbBufOutWic()
+    builder.build(master, slave, values)
+    return master
+
+
+def _record(path, count, period_ns):
+    with Recorder(path, size=64 * 1024) as recorder:
+        for i in range(count):
+            slave = _slave(i)
+            recorder.record(INPUT, slave, i * period_ns)
+            recorder.record(OUTPUT, _answer(slave), i * period_ns + 1)
+
+
+def _serve(sim, count, offset=0, deadline=5.0):
+    with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=50) as session:
+        end = time.monotonic() + deadline
+        while not sim.master.finished.is_set() and time.monotonic() < end:
+            slave = session.read_input()
+            if slave is not None:
+                session.write_output(_answer(slave, offset if slave.sp1[0] == count // 2 else 0))
+    sim.master.stop()
+    return sim.master.report()
+
+
+def test_load_recording_pairs_outputs(tmp_path):
+    path = tmp_path / "line.pbrec"
+    _record(path, 5, 1_000_000)
+    frames = load_recording(path)
+    assert len(frames) == 5
+    assert all(frame.expected is not None for frame in frames)
+    assert PbBufOutWic.from_buffer_copy(frames[3].expected).pv1[0] == 3
+
+
+def test_as_fast_as_possible_matches_recording(tmp_path):
+    path = tmp_path / "line.pbrec"
+    _record(path, 50, 10_000_000)
+    report = _serve(ReplayCifX(str(path), speed=0), 50)
+    assert report["frames_sent"] == report["round_trips"] == report["compared"] == 50
+    assert report["mismatches"] == 0
+    assert report["throughput_hz"] > 0
+
+
+def test_differences_are_reported(tmp_path):
+    path = tmp_path / "line.pbrec"
+    _record(path, 20, 1_000_000)
+    report = _serve(ReplayCifX(path, speed=0), 20, offset=7)
+    assert report["mismatches"] == 1
+    assert report["field_mismatches"] == {"pv1": 1}
+    index, field, expected, actual = report["differences"][0]
+    assert (index, field, expected[0], actual[0]) == (10, "pv1", 10, 17)
+
+
+def test_recorded_timing_is_scaled():
+    frames = [ReplayFrame(i * 20_000_000, bytes(_slave(i)), None) for i in range(6)]
+    sim = ReplayCifX(frames, speed=2.0)
+    report = _serve(sim, 6)
+    assert report["round_trips"] == 6
+    # 100 ms of recording at double speed
+    assert 0.045 < report["elapsed"] < 1.0
@@ -0,0 +1,41 @@
+import ctypes
+from ctypes import Structure, c_uint16, c_uint32
+
+import pytest
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic, SIZE_BUFFER_OUT
+from profibus.hilscher.src.hilscher.response import ResponseBuilder, PvBlock
+
+
+def test_build_echoes_header_and_writes_values():
+    slave = PbBufInWic(state1=3, year=2025, seconds=59, interval4=7, value_16=42)
+    slave.sp1[0] = 999
+    values = PvBlock()
+    values[2][0][5] = 11    # pv3[5]
+    values[3][1][7] = 22    # pvq4[7]
+    buffer = (ctypes.c_ubyte * SIZE_BUFFER_OUT)(*([0xFF] * SIZE_BUFFER_OUT))
+
+    ResponseBuilder().build(buffer, slave, values)
+
+    master = PbBufOutWic.from_buffer(buffer)
+    assert (master.state1, master.year, master.seconds, master.interval4, master.value_16) == (3, 2025, 59, 7, 42)
+    assert master.pv3[5] == 11
+    assert master.pvq4[7] == 22
+    assert master.pv1[0] == 0
+
+    ResponseBuilder().build(buffer, slave)
+    assert sum(master.pv3) == 0 and sum(master.pvq4) == 0
+
+
+def test_incompatible_layout_or_values_are_rejected():
+    class WideIn(Structure):
+        _fields_ = [("state1", c_uint32)]
+
+    with pytest.raises(ValueError):
+        ResponseBuilder(in_type=WideIn)
+
+    with pytest.raises(ValueError):
+        ResponseBuilder(processed=("pv1", "pv2"))
+
+    with pytest.raises(ValueError):
+        ResponseBuilder().build((ctypes.c_ubyte * SIZE_BUFFER_OUT)(), PbBufInWic(), bytes(10))
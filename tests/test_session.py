@@ -0,0 +1,78 @@
+import ctypes
+
+import pytest
+
+from profibus.hilscher.src.hilscher.Definitions import PbBufInWic, PbBufOutWic, CIFX_NO_ERROR, CIFX_DEV_NOT_RUNNING
+from profibus.hilscher.src.hilscher.session import ChannelSession, CifXError
+
+
+class FakeCifX:
+    """
+    Records the cifX calls made by a ChannelSession.
+    """
+    def __init__(self, host_state_ret=CIFX_NO_ERROR):
+        self.calls = []
+        self.host_state_ret = host_state_ret
+        self.input = PbBufInWic(state1=1, value_16=42)
+        self.written = None
+
+    def xChannelOpen(self, hDriver, szBoard, ulChannel, phChannel):
+        self.calls.append("xChannelOpen")
+        phChannel._obj.value = 0x1234
+        return CIFX_NO_ERROR
+
+    def xChannelClose(self, hChannel):
+        self.calls.append("xChannelClose")
+        return CIFX_NO_ERROR
+
+    def xChannelHostState(self, hChannel, ulCmd, pulState, ulTimeout):
+        self.calls.append("xChannelHostState")
+        return self.host_state_ret
+
+    def xChannelBusState(self, hChannel, ulCmd, pulState, ulTimeout):
+        self.calls.append("xChannelBusState")
+        return CIFX_NO_ERROR
+
+    def xChannelIORead(self, hChannel, ulArea, ulOffset, ulDataLen, pvData, ulTimeout):
+        self.calls.append("xChannelIORead")
+        ctypes.memmove(pvData, ctypes.byref(self.input), ctypes.sizeof(self.input))
+        return CIFX_NO_ERROR
+
+    def xChannelIOWrite(self, hChannel, ulArea, ulOffset, ulDataLen, pvData, ulTimeout):
+        self.calls.append("xChannelIOWrite")
+        self.written = PbBufOutWic.from_buffer_copy(pvData)
+        return CIFX_NO_ERROR
+
+    def xDriverGetErrorDescription(self, lError, szBuffer, ulBufferLen):
+        szBuffer.value = b"Device not running"
+        return CIFX_NO_ERROR
+
+
+def test_channel_is_set_up_once_for_many_exchanges():
+    dll = FakeCifX()
+    with ChannelSession(ctypes.c_void_p(1), "cifX0", dll=dll) as session:
+        for _ in range(3):
+            slave = session.read_input()
+            assert slave.value_16 == 42
+            assert session.write_output(PbBufOutWic(value_16=slave.value_16)) == CIFX_NO_ERROR
+
+    assert dll.calls.count("xChannelOpen") == 1
+    assert dll.calls.count("xChannelHostState") == 1
+    assert dll.calls.count("xChannelBusState") == 1
+    assert dll.calls.count("xChannelIORead") == 3
+    assert dll.calls[-1] == "xChannelClose"
+    assert dll.written.value_16 == 42
+    assert not session.is_open
+
+
+def test_failed_state_handshake_closes_channel():
+    dll = FakeCifX(host_state_ret=CIFX_DEV_NOT_RUNNING)
+    session = ChannelSession(ctypes.c_void_p(1), "cifX0", dll=dll)
+
+    with pytest.raises(CifXError) as excinfo:
+        session.open()
+
+    assert excinfo.value.function == "xChannelHostState"
+    assert excinfo.value.description == "Device not running"
+    assert dll.calls == ["xChannelOpen", "xChannelHostState", "xChannelClose"]
+    assert not session.is_open
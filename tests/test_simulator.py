@@ -0,0 +1,77 @@
+import sys
+import time
+
+import pytest
+
+from profibus.hilscher.src.hilscher.Definitions import (
+    PbBufInWic, CIFX_NO_ERROR, CIFX_DEV_NOT_RUNNING, CIFX_DEV_NO_COM_FLAG, CIFX_INVALID_BOARD,
+)
+from profibus.hilscher.src.hilscher.driver import CifXDriver, CifXError
+from profibus.hilscher.src.hilscher.session import ChannelSession
+from profibus.hilscher.src.hilscher.simulator import SimulatedCifX, SimulatedBoard, LoopbackMaster
+from profibus.hilscher.src.hilscher.backend import load_backend
+
+
+def test_enumeration_matches_configured_boards():
+    sim = SimulatedCifX([SimulatedBoard("cifX0", serial_number=1), SimulatedBoard("cifX1", channel_count=2, serial_number=2)])
+    with CifXDriver(sim) as driver:
+        assert driver.get_information().ulBoardCnt == 2
+        boards = list(driver.enum_boards())
+        assert [b.abBoardName for b in boards] == [b"cifX0", b"cifX1"]
+        assert [b.tSystemInfo.ulSerialNumber for b in boards] == [1, 2]
+        assert len(list(driver.enum_channels(1))) == 2
+
+
+def test_io_requires_bus_on_and_a_master():
+    sim = SimulatedCifX()
+    with CifXDriver(sim) as driver:
+        session = ChannelSession(driver, "cifX0", ulWaitTimeout=1).open()
+        assert session.read_input() is None
+        assert session.lLastError == CIFX_DEV_NO_COM_FLAG
+
+        sim.channel("cifX0").bus_state = 0
+        assert session.write_output() == CIFX_DEV_NOT_RUNNING
+        session.close()
+
+        try:
+            ChannelSession(driver, "cifX9").open()
+        except CifXError as e:
+            assert e.lError == CIFX_INVALID_BOARD
+        else:
+            raise AssertionError("opening an unknown board must fail")
+
+
+def test_loopback_master_frames():
+    sim = SimulatedCifX()
+    master = LoopbackMaster(sim.channel("cifX0"), rate_hz=100, setpoint_period=2)
+    first = PbBufInWic.from_buffer_copy(master.next_frame())
+    second = PbBufInWic.from_buffer_copy(master.next_frame())
+    third = master.next_frame()
+
+    assert (first.value_16, second.value_16, third.value_16) == (1, 2, 3)
+    assert first.year >= 2025
+    assert list(first.sp1) == list(second.sp1)
+    assert list(third.sp1) != list(second.sp1)
+
+
+def test_round_trips_through_the_stack():
+    sim = SimulatedCifX(synchronous=True)
+    master = LoopbackMaster(sim.channel("cifX0"), rate_hz=1000).start()
+    try:
+        with CifXDriver(sim) as driver, ChannelSession(driver, "cifX0", ulWaitTimeout=100) as session:
+            for _ in range(20):
+                slave = session.read_input()
+                assert slave is not None
+                output = session.output_image.back
+                output.value_16 = slave.value_16
+                assert session.write_output(output) == CIFX_NO_ERROR
+        time.sleep(0.05)
+    finally:
+        master.stop()
+    assert master.round_trips >= 15
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the real driver is the default on Windows")
+def test_sim_is_the_default_backend_off_windows(monkeypatch):
+    monkeypatch.delenv("CIFX_BACKEND", raising=False)
+    assert isinstance(load_backend(), SimulatedCifX)